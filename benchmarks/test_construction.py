@@ -0,0 +1,52 @@
+# -*- coding: UTF-8 -*-
+import pytest
+
+from frc_rekt import motor as motor_module
+from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.motor import MOTOR_CACHE, Motor
+
+
+@pytest.fixture(params=['cim', 'mini-cim', '775pro', 'bag'])
+def motor_type(request):
+    return request.param
+
+
+def test_motor_from_csv(benchmark, motor_type, monkeypatch):
+    """Parse the csv's and fit, as with no compiled profile."""
+    monkeypatch.setattr(motor_module, 'is_fresh', lambda *args: False)
+    benchmark.pedantic(
+        Motor, args=(motor_type, ), setup=MOTOR_CACHE.invalidate, rounds=10)
+
+
+def test_motor_from_profile(benchmark, motor_type, tmpdir, monkeypatch):
+    # Compiled into tmpdir, so the data folder is untouched
+    path = str(tmpdir.join('{0}-profile.npz'.format(motor_type)))
+    monkeypatch.setattr(motor_module, 'profile_path',
+                        lambda motor_type, data_folder: path)
+    Motor(motor_type).compile_profile()
+    benchmark.pedantic(
+        Motor, args=(motor_type, ), setup=MOTOR_CACHE.invalidate, rounds=50)
+
+
+def test_motor_cached(benchmark, motor_type):
+    Motor(motor_type)
+    benchmark(Motor, motor_type)
+
+
+def test_main_breaker_fit(benchmark, tmpdir, monkeypatch):
+    """Curve fit, as with no fit cache."""
+    path = tmpdir.join('fit.json')
+    monkeypatch.setattr(MainBreaker, 'fit_cache_path', str(path))
+
+    def setup():
+        if path.check():
+            path.remove()
+
+    benchmark.pedantic(MainBreaker, setup=setup, rounds=10)
+
+
+def test_main_breaker_fit_cache(benchmark, tmpdir, monkeypatch):
+    monkeypatch.setattr(MainBreaker, 'fit_cache_path',
+                        str(tmpdir.join('fit.json')))
+    MainBreaker()
+    benchmark(MainBreaker)
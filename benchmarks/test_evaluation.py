@@ -0,0 +1,88 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+import pytest
+
+from frc_rekt.battery import Battery
+from frc_rekt.envelope import PwmEnvelope
+from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.motor import Motor, horner, motor_current
+
+SIZE = 10**6
+
+
+@pytest.fixture(scope='module')
+def fit_cache_path(tmpdir_factory):
+    # Fit into a tmpdir, so the data folder is untouched
+    path = str(tmpdir_factory.mktemp('main_breaker').join('fit.json'))
+    original, MainBreaker.fit_cache_path = MainBreaker.fit_cache_path, path
+    yield path
+    MainBreaker.fit_cache_path = original
+
+
+@pytest.fixture(scope='module')
+def main_breaker(fit_cache_path):
+    return MainBreaker()
+
+
+@pytest.fixture(scope='module')
+def motor():
+    return Motor('cim')
+
+
+@pytest.fixture(scope='module')
+def currents():
+    return np.linspace(150.0, 700.0, SIZE)
+
+
+@pytest.fixture(scope='module')
+def operating_points(motor):
+    speed = np.random.RandomState(0).uniform(
+        0.0, motor.curve_frame['speed'].max(), SIZE)
+    voltage = np.random.RandomState(1).uniform(0.0, 12.0, SIZE)
+    return speed, voltage
+
+
+def test_trip_time_scalar(benchmark, main_breaker):
+    benchmark(main_breaker.trip_time, 240.0)
+
+
+def test_trip_time_array(benchmark, main_breaker, currents):
+    benchmark(main_breaker.trip_time, currents)
+
+
+def test_temperature_derate_scalar(benchmark, main_breaker):
+    benchmark(main_breaker.temperature_derate, 78.0)
+
+
+def test_temperature_derate_array(benchmark, main_breaker):
+    benchmark(main_breaker.temperature_derate, np.linspace(-40, 180, SIZE))
+
+
+def test_polynomial_scalar(benchmark, motor):
+    benchmark(motor.voltage_scaled_current, 6.5)
+
+
+def test_tabulated_scalar(benchmark):
+    benchmark(Motor('cim', tabulated=True).voltage_scaled_current, 6.5)
+
+
+def test_horner_scalar(benchmark, motor):
+    benchmark(horner, motor.coefficients.voltage_scaled_current, 6.5)
+
+
+def test_horner_array(benchmark, motor):
+    voltage = np.linspace(0.0, 12.0, SIZE)
+    benchmark(horner, motor.coefficients.voltage_scaled_current, voltage)
+
+
+def test_motor_current_scalar(benchmark, motor):
+    benchmark(motor_current, motor.coefficients, 50.0, 9.0)
+
+
+def test_motor_evaluate(benchmark, motor, operating_points):
+    benchmark(motor.evaluate, *operating_points)
+
+
+def test_pwm_envelope_solve(benchmark):
+    envelope = PwmEnvelope(battery=Battery(internal_resistance=0.02))
+    benchmark(envelope.solve, 7.0)
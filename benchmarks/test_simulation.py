@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+import os
+
+import numpy as np
+
+from frc_rekt.battery import Battery, DynamicBattery, fit_dynamic_battery
+from frc_rekt.electrical import solve_bus
+from frc_rekt.gearing import DriveTimeScore, GearSearch
+from frc_rekt.main_breaker import TripAccumulator
+from frc_rekt.motion import MotionProfiler
+from frc_rekt.motor import Motor
+from frc_rekt.replay import replay, write_columns
+from frc_rekt.simulation import DrivetrainSimulation
+from frc_rekt.sweep import sweep
+from frc_rekt.turning import SkidSteerSimulation
+
+
+def test_simulation_run(benchmark):
+    simulation = DrivetrainSimulation()
+    benchmark(simulation.run, np.ones(15000))
+
+
+def test_motion_profiles(benchmark):
+    profiler = MotionProfiler()
+    benchmark(profiler.generate, np.linspace(0.5, 8.0, 1000), 100)
+
+
+def test_turn_feasibility(benchmark):
+    plant = SkidSteerSimulation().turning
+    velocity = np.linspace(0.0, 2.5, 100)[:, np.newaxis]
+    benchmark(plant.turn, velocity, np.linspace(-6.0, 6.0, 100))
+
+
+def test_solve_bus(benchmark):
+    motor = Motor('cim')
+    speed = np.random.RandomState(0).uniform(0.0, 80.0, (10**5, 6))
+    benchmark(solve_bus, Battery(), motor.coefficients, speed, np.ones(6))
+
+
+def test_sweep(benchmark):
+    gears = [[(12, 50), (teeth, 48)] for teeth in range(14, 30)]
+    benchmark.pedantic(
+        sweep,
+        kwargs={
+            'gears': gears,
+            'wheel_diameters': (4, 5, 6),
+            'masses': (100, 125, 154),
+            'motor_types': ('cim', 'mini-cim')
+        },
+        rounds=3)
+
+
+def test_trip_accumulator(benchmark):
+    current = np.abs(np.random.RandomState(0).normal(150.0, 60.0, 10**6))
+    accumulator = TripAccumulator(dt=0.005)
+    benchmark(lambda: accumulator.reset() or accumulator.update(current))
+
+
+def test_log_replay(benchmark, tmpdir):
+    # About an event of matches, 8 channels logged at 50 Hz
+    samples = 10**6
+    state = np.random.RandomState(0)
+    window = {'time': np.arange(samples) * 0.02}
+    for channel in range(8):
+        window['motor{0}_current'.format(channel)] = np.abs(
+            state.normal(20.0, 15.0, samples))
+    window['battery_voltage'] = 12.5 - 0.012 * sum(
+        values for name, values in window.items() if name != 'time')
+    path = os.path.join(str(tmpdir), 'log')
+    write_columns([window], path)
+    benchmark.pedantic(replay, args=(path, ), rounds=3)
+
+
+def test_dynamic_battery(benchmark):
+    current = np.abs(np.random.RandomState(0).normal(80.0, 60.0, 10**6))
+    battery = DynamicBattery(branches=((0.004, 2.0), (0.008, 60.0)))
+    benchmark(lambda: battery.reset() or battery.update(current))
+
+
+def test_fit_dynamic_battery(benchmark):
+    current = np.abs(np.random.RandomState(0).normal(80.0, 60.0, 10**6))
+    battery = DynamicBattery(branches=((0.004, 2.0), (0.008, 60.0)))
+    voltage = battery.update(current)
+    benchmark(fit_dynamic_battery, current, voltage, taus=(2.0, 60.0))
+
+
+def test_gear_search(benchmark):
+    # Every pinion and gear from 8 to 100 teeth, up to 3 stages
+    catalog = [(range(8, 31), range(20, 101))] * 3
+    search = GearSearch(6.0, 14.0, catalog, score=DriveTimeScore(6.0, 14.0))
+    benchmark.pedantic(search.search, args=(20, ), rounds=3)
@@ -1,15 +1,29 @@
 #!/usr/bin/env python3
 # -*- coding: UTF-8 -*-
+"""Download the vex motor curves.
 
+Every file is fetched at once on a thread pool sharing one pooled session,
+and streamed to disk in chunks. Files whose sha256 matches the one recorded
+in downloads.json are skipped, interrupted downloads resume from their .part
+file, and locked rotor archives are unzipped as soon as they arrive.
+
+"""
+
+import concurrent.futures
+import hashlib
+import json
 import logging
 import os
-import re
-import requests
+import threading
 import zipfile
 
 from pathlib import Path
 from urllib.parse import urlparse
 
+import requests
+
+from requests.adapters import HTTPAdapter
+
 # yapf: disable
 files = {'cim':      ['https://content.vexrobotics.com/motors/217-2000-cim/cim-motor-curve-data-20151104.csv',
                       'https://content.vexrobotics.com/motors/217-2000-cim/cim-peak-power-data-20151104.csv',
@@ -25,17 +39,56 @@ files = {'cim':      ['https://content.vexrobotics.com/motors/217-2000-cim/cim-m
                       'https://content.vexrobotics.com/motors/217-3351-bag/bag-locked-rotor-data-20151207.zip']}
 # yapf: enable
 
+RECORD_NAME = 'downloads.json'
+CHUNK_SIZE = 64 * 1024
+TIMEOUT = 30
+
+
+class DownloadError(Exception):
+    """A download did not arrive intact."""
+
+
+def file_sha256(path):
+    """Return the sha256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(str(path), 'rb') as data_file:
+        for chunk in iter(lambda: data_file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
-def file_exists(file_path):
+def load_record(directory):
+    """Return {relative path: sha256} of previously downloaded files."""
     try:
-        if os.stat("file").st_size != 0:
-            return True
-    except FileNotFoundError:
-        pass
-    return False
+        with open(str(Path(directory) / RECORD_NAME)) as record_file:
+            return json.load(record_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_record(directory, record):
+    """Write {relative path: sha256} of downloaded files."""
+    with open(str(Path(directory) / RECORD_NAME), 'w') as record_file:
+        json.dump(record, record_file, indent=2, sort_keys=True)
+
+
+def is_current(path, sha256):
+    """Whether path exists and has the recorded sha256."""
+    return bool(sha256) and path.is_file() and file_sha256(path) == sha256
+
+
+def is_extracted(path):
+    """Whether every member of a zip is next to it, true for other files."""
+    path = Path(path)
+    if path.suffix != '.zip':
+        return True
+    with zipfile.ZipFile(str(path), 'r') as zip_ref:
+        return all((path.parent / name).exists()
+                   for name in zip_ref.namelist())
 
 
 def unzip_file(path):
+    """Extract a zip next to itself, other files are left alone."""
     path = Path(path)
     if path.suffix == '.zip':
         logging.info('Unzipping %s to %s', path, path.parent)
@@ -43,35 +96,125 @@ def unzip_file(path):
             zip_ref.extractall(str(path.parent))
 
 
-def download_file(motor, url):
+def fetch(session, url, path):
+    """Stream url to path, resuming from path.part if a download was cut off.
+
+    :returns: sha256 of the downloaded file
+    :rtype: str
+
+    """
+    part = path.with_name(path.name + '.part')
+    offset = part.stat().st_size if part.is_file() else 0
+    # Lengths and ranges count bytes on the wire, so ask for them unencoded
+    headers = {'Accept-Encoding': 'identity'}
+    if offset:
+        headers['Range'] = 'bytes={0}-'.format(offset)
+    with session.get(
+            url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.status_code == 416:
+            # The part file is already complete (or bogus), start over
+            part.unlink()
+            return fetch(session, url, path)
+        response.raise_for_status()
+        encoded = response.headers.get('Content-Encoding',
+                                       'identity') != 'identity'
+        if encoded and response.status_code == 206:
+            # The range is of encoded bytes, the part file holds decoded ones
+            part.unlink()
+            return fetch(session, url, path)
+        if response.status_code != 206:
+            # The server ignored the range, it is sending the whole file
+            offset = 0
+        length = response.headers.get('Content-Length')
+        expected = None
+        if length is not None and not encoded:
+            expected = offset + int(length)
+        logging.info('Downloading %s to %s from byte %s', url, path, offset)
+        with open(str(part), 'ab' if offset else 'wb') as part_file:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                part_file.write(chunk)
+    size = part.stat().st_size
+    if expected is not None and size != expected:
+        raise DownloadError('{0} is {1} bytes, expected {2}'.format(
+            part, size, expected))
+    os.replace(str(part), str(path))
+    return file_sha256(path)
+
+
+def relative_path(motor, url):
+    """Path of url's file, relative to the download directory."""
     # Gets just the '*.csv' part
-    fname = Path(urlparse(url).path).name
-    fpath = '{0}/{1}'.format(motor, fname)
-
-    logging.info('Downloading %s to %s', url, fpath)
-
-    if not file_exists(fname):
-        r = requests.get(url)
-        with open(fpath, 'wb') as dfile:
-            dfile.write(r.content)
-    return fpath
+    return '{0}/{1}'.format(motor, Path(urlparse(url).path).name)
+
+
+def download_file(session, directory, relative, url, sha256=None):
+    """Download and unzip one file, unless it is already current.
+
+    :returns: sha256 of the file
+    :rtype: str
+
+    """
+    path = Path(directory) / relative
+    if is_current(path, sha256):
+        logging.info('%s is up to date', path)
+    else:
+        sha256 = fetch(session, url, path)
+    if not is_extracted(path):
+        unzip_file(path)
+    return sha256
+
+
+def make_session(workers):
+    """A session whose connection pool fits every worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=workers, pool_maxsize=workers, max_retries=3)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def download_files(directory='data/vex', urls=None, workers=None):
+    """Download every motor's files concurrently.
+
+    :param directory: The folder holding the per motor folders
+    :param urls: Lists of urls by motor, defaults to files
+    :param workers: Concurrent downloads, defaults to one per file
+    :returns: {relative path: sha256} of every file
+    :rtype: dict
+
+    """
+    if urls is None:
+        urls = files
+    tasks = [(relative_path(motor, url), url)
+             for motor in sorted(urls) for url in urls[motor]]
+    workers = workers or len(tasks) or 1
+    for motor in urls:
+        os.makedirs(str(Path(directory) / motor), exist_ok=True)
+    record = load_record(directory)
+    lock = threading.Lock()
+    session = make_session(workers)
+
+    def task(relative_url):
+        relative, url = relative_url
+        sha256 = download_file(session, directory, relative, url,
+                               record.get(relative))
+        # Record each file as it lands, so an interrupted run keeps them
+        with lock:
+            record[relative] = sha256
+            save_record(directory, record)
+        return relative, sha256
 
-
-def download_files():
-    directory = 'data/vex/'
-    for motor in files.keys():
-        mpath = directory + motor
-        try:
-            logging.info('Creating direcotry %s', str(mpath))
-            os.makedirs(mpath)
-        except FileExistsError:
-            logging.info('Directory %s already exists', str(mpath))
-        for url in files[motor]:
-            fpath = download_file(mpath, url)
-            unzip_file(fpath)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            results = dict(pool.map(task, tasks))
+    finally:
+        session.close()
+    return results
 
 
 def main():
+    logging.basicConfig(level=logging.INFO)
     download_files()
 
 
@@ -2,7 +2,9 @@
 # -*- coding: UTF-8 -*-
 """Battery model.
 
-Models a battery on an frc robot.
+Models a battery on an frc robot. Battery is a fixed voltage behind an
+internal resistance, DynamicBattery also drains over a match and sags and
+recovers with the load.
 
 """
 
@@ -40,10 +42,208 @@ class Battery(object):  # pylint: disable=too-few-public-methods
         self._voltage = float(starting_voltage)
         self.load = float(load)
         self.internal_resistance = internal_resistance
-        self._logger.debug('%s created', str(self))
+        self._logger.debug('%s created', self)
 
-    def voltage(self):
-        """Voltage of battery."""
+    def voltage(self, load=None):
+        """Voltage of battery.
+
+        :param load: The load in amps to find the voltage at, defaults to the
+            current battery load. Can be a numpy array of loads.
+        :type load: float numpy.ndarray
+
+        """
+        if load is None:
+            load = self.load
         # V = I*R
         # internal resistance is "in series" w_ith the voltage source
-        return self._voltage - (self.load * self.internal_resistance)
+        return self._voltage - (load * self.internal_resistance)
+
+
+def _rc_response(current, decay, state):
+    # Exact zero order hold update of one RC branch per column,
+    # state[k + 1] = decay * state[k] + (1 - decay) * current[k], with state
+    # in amps (branch voltage over branch resistance). Returns the state at
+    # the start of each sample, and after the last one.
+    from scipy import signal
+
+    starts = np.empty((len(current), len(decay)))
+    ends = np.empty(len(decay))
+    for branch, (factor, initial) in enumerate(zip(decay, state)):
+        after = signal.lfilter([1.0 - factor], [1.0, -factor],
+                               current,
+                               zi=[factor * initial])[0]
+        starts[0, branch] = initial
+        starts[1:, branch] = after[:-1]
+        ends[branch] = after[-1]
+    return starts, ends
+
+
+class DynamicBattery(Battery):
+    """Model of a Battery that drains and sags.
+
+    The open circuit voltage is a polynomial of the state of charge, in
+    series with internal_resistance and RC branches. Each branch is a
+    resistance in parallel with a capacitance, given by its time constant,
+    so the voltage sags under a load and recovers after it.
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            ocv_coefs=(11.9, 1.3),
+            capacity=18.0,
+            state_of_charge=1.0,
+            load=0,
+            internal_resistance=0.012,
+            branches=((0.008, 30.0), )):
+        """DynamicBattery.
+
+        :param ocv_coefs: Open circuit voltage as a polynomial of the state of
+            charge, lowest order first
+        :type ocv_coefs: tuple
+        :param capacity: Capacity in amp hours
+        :type capacity: float
+        :param state_of_charge: The starting state of charge, 0 to 1
+        :type state_of_charge: float
+        :param load: The current battery load
+        :type load: float
+        :param internal_resistance: The internal resistance of the battery in ohms
+        :type internal_resistance: float
+        :param branches: Resistance in ohms and time constant in seconds of
+            each RC branch
+        :type branches: tuple
+
+        """
+        self.ocv_coefs = tuple(float(coef) for coef in ocv_coefs)
+        self.capacity = float(capacity)
+        self.branches = tuple(
+            (float(resistance), float(tau)) for resistance, tau in branches)
+        self.reset(state_of_charge)
+        super(DynamicBattery, self).__init__(
+            self.open_circuit_voltage(), load, internal_resistance)
+
+    def reset(self, state_of_charge=1.0):
+        """Start again from a rested battery.
+
+        :param state_of_charge: The state of charge, 0 to 1
+        :type state_of_charge: float
+
+        """
+        self.state_of_charge = float(state_of_charge)
+        # Current through each branch's resistance, in amps
+        self._branch_current = np.zeros(len(self.branches))
+
+    @property
+    def branch_voltages(self):
+        """Voltage across each RC branch."""
+        return self._branch_current * np.array(
+            [resistance for resistance, _ in self.branches])
+
+    def open_circuit_voltage(self, state_of_charge=None):
+        """Voltage of the battery at rest.
+
+        :param state_of_charge: The state of charge to find the voltage at,
+            defaults to the battery's. Can be a numpy array.
+        :type state_of_charge: float numpy.ndarray
+
+        """
+        if state_of_charge is None:
+            state_of_charge = self.state_of_charge
+        return POLY.polyval(state_of_charge, self.ocv_coefs)
+
+    def voltage(self, load=None):
+        """Voltage of battery, if load were drawn now.
+
+        :param load: The load in amps to find the voltage at, defaults to the
+            current battery load. Can be a numpy array of loads.
+        :type load: float numpy.ndarray
+
+        """
+        if load is None:
+            load = self.load
+        return (self.open_circuit_voltage() - self.branch_voltages.sum() -
+                load * self.internal_resistance)
+
+    def update(self, current, dt=0.02):
+        """Draw current from the battery, advancing its state.
+
+        Current is held over each sample, and the RC branches are stepped
+        exactly for that, so any dt gives the same answer as a finer one.
+
+        :param current: Current in amps, one sample every dt seconds
+        :type current: float numpy.ndarray
+        :param dt: The time between current samples in seconds
+        :type dt: float
+        :returns: the battery voltage during each sample
+        :rtype: numpy.ndarray
+
+        """
+        current = np.atleast_1d(np.asarray(current, dtype=float))
+        drawn = np.cumsum(current) * dt / (3600.0 * self.capacity)
+        state_of_charge = self.state_of_charge - np.concatenate(
+            [[0.0], drawn[:-1]])
+        decay = np.exp(-dt / np.array([tau for _, tau in self.branches]))
+        branch_current, self._branch_current = _rc_response(
+            current, decay, self._branch_current)
+        resistance = np.array([resistance for resistance, _ in self.branches])
+        voltage = (self.open_circuit_voltage(state_of_charge) -
+                   np.dot(branch_current, resistance) -
+                   current * self.internal_resistance)
+        self.state_of_charge -= float(drawn[-1])
+        self.load = float(current[-1])
+        return voltage
+
+
+def fit_dynamic_battery(  # pylint: disable=too-many-arguments
+        current,
+        voltage,
+        dt=0.02,
+        taus=(30.0, ),
+        capacity=18.0,
+        state_of_charge=1.0,
+        deg=1):
+    """Fit a DynamicBattery to a logged trace.
+
+    With the time constants and capacity fixed, the voltage is linear in the
+    open circuit voltage coefficients and the resistances, so they are found
+    in one least squares solve. The battery is taken to be rested at the
+    start of the trace.
+
+    :param current: Current drawn in amps, one sample every dt seconds
+    :type current: numpy.ndarray
+    :param voltage: Battery voltage at each sample
+    :type voltage: numpy.ndarray
+    :param dt: The time between samples in seconds
+    :type dt: float
+    :param taus: Time constant of each RC branch in seconds
+    :type taus: tuple
+    :param capacity: Capacity in amp hours
+    :type capacity: float
+    :param state_of_charge: State of charge at the start, 0 to 1
+    :type state_of_charge: float
+    :param deg: Degree of the open circuit voltage polynomial
+    :type deg: int
+    :returns: the fitted battery, in the state it started the trace in
+    :rtype: `frc_rekt.battery.DynamicBattery`
+
+    """
+    current = np.asarray(current, dtype=float)
+    voltage = np.asarray(voltage, dtype=float)
+    drawn = np.cumsum(current) * dt / (3600.0 * capacity)
+    charge = state_of_charge - np.concatenate([[0.0], drawn[:-1]])
+    decay = np.exp(-dt / np.asarray(taus, dtype=float))
+    branch_current = _rc_response(current, decay, np.zeros(len(decay)))[0]
+    # voltage = ocv(charge) - R0 * current - sum(R * branch_current)
+    design = np.column_stack(
+        [POLY.polyvander(charge, deg), -current[:, np.newaxis],
+         -branch_current])
+    params, residuals = np.linalg.lstsq(design, voltage, rcond=None)[:2]
+    logging.getLogger(__name__).debug(
+        'Battery fit rms error %s V',
+        np.sqrt(residuals[0] / len(voltage)) if len(residuals) else 0.0)
+    return DynamicBattery(
+        ocv_coefs=params[:deg + 1],
+        capacity=capacity,
+        state_of_charge=state_of_charge,
+        internal_resistance=float(params[deg + 1]),
+        branches=tuple(zip(params[deg + 2:], taus)))
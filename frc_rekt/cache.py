@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Characterization cache.
+
+Holds expensive model characterizations (parsed data and fitted functions)
+so they can be shared between model instances in the same process.
+
+"""
+
+import collections
+import logging
+import os
+
+
+def file_stamps(file_paths):
+    """Return (path, modification time) pairs for a list of files.
+
+    :param file_paths: Paths to the data files a characterization depends on
+    :type file_paths: list
+    :returns: path, modification time in nanoseconds pairs
+    :rtype: tuple
+
+    """
+    return tuple((path, os.stat(path).st_mtime_ns) for path in file_paths)
+
+
+class CharacterizationCache(object):
+    """Least recently used cache of model characterizations.
+
+    Keys are tuples whose first element is the name of the thing being
+    characterized (e.g. the motor type), then any settings that pick a
+    variant of it (e.g. the stall window), and last anything that should
+    invalidate the entry when it changes (e.g. data file modification times).
+
+    """
+
+    def __init__(self, max_size=8):
+        """CharacterizationCache.
+
+        :param max_size: The maximum number of characterizations to hold
+        :type max_size: int
+
+        """
+        self._logger = logging.getLogger(__name__)
+        self._entries = collections.OrderedDict()
+        self.max_size = int(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """Count the cached characterizations."""
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Whether a characterization is cached for key."""
+        return key in self._entries
+
+    def get(self, key, factory):
+        """Return the characterization for key, building it if needed.
+
+        :param key: The cache key, the first element is the entry name
+        :type key: tuple
+        :param factory: Called with no arguments to build a missing entry
+        :type factory: types.FunctionType
+        :returns: the cached characterization
+
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = factory()
+            self._put(key, value)
+            return value
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value):
+        # A new key for a name and settings means the data changed, the old
+        # ones are stale
+        for stale in [old for old in self._entries if old[:-1] == key[:-1]]:
+            del self._entries[stale]
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._logger.debug('Evicted %s', evicted[0])
+
+    def invalidate(self, name=None):
+        """Drop cached characterizations.
+
+        :param name: Only drop entries for this name, drop everything if None
+        :type name: str
+
+        """
+        if name is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == name]:
+            del self._entries[key]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Motor catalog.
+
+A registry of the motors we have data for, indexed by name. Motors are read
+from the catalog file, then any other motor folders in the data folder are
+discovered from their file names. Nothing is read until the catalog is first
+used, and a motor is only characterized when it is first asked for.
+
+"""
+
+import collections
+import json
+import logging
+import os
+import re
+
+CATALOG_PATH = 'data/vex/catalog.json'
+
+MotorSpec = collections.namedtuple(
+    'MotorSpec',
+    ['name', 'curve_date', 'stall_date', 'stall_voltages', 'curve_voltage'])
+
+_CURVE_FILE = re.compile(r'^(?P<name>.+)-motor-curve-data-(?P<date>\d+)\.csv$')
+_STALL_FILE = re.compile(
+    r'^(?P<name>.+)-locked-rotor-data-(?P<voltage>\d+)v-(?P<date>\d+)\.csv$')
+
+
+def discover_spec(folder, name):
+    """Describe a motor from the names of the files in its data folder.
+
+    :param folder: The motor's data folder, e.g. data/vex/cim
+    :type folder: str
+    :param name: The motor's name, the prefix of its file names
+    :type name: str
+    :returns: the motor, or None if folder has no motor curve for name
+    :rtype: `frc_rekt.catalog.MotorSpec`
+
+    """
+    curve_date = None
+    stall_date = None
+    stall_voltages = []
+    for file_name in sorted(os.listdir(folder)):
+        curve = _CURVE_FILE.match(file_name)
+        stall = _STALL_FILE.match(file_name)
+        if curve and curve.group('name') == name:
+            curve_date = curve.group('date')
+        elif stall and stall.group('name') == name:
+            stall_date = stall.group('date')
+            stall_voltages.append(int(stall.group('voltage')))
+    if not curve_date:
+        return None
+    return MotorSpec(name, curve_date, stall_date, sorted(stall_voltages),
+                     12.0)
+
+
+class MotorCatalog(object):
+    """Registry of motors, by name."""
+
+    def __init__(self, path=CATALOG_PATH, data_folder='data/vex'):
+        """MotorCatalog.
+
+        :param path: The catalog file
+        :type path: str
+        :param data_folder: The folder holding the per motor data folders,
+            searched for motors missing from the catalog file
+        :type data_folder: str
+
+        """
+        self._logger = logging.getLogger(__name__)
+        self.path = path
+        self.data_folder = data_folder
+        self._specs = None
+        self._motors = {}
+
+    def _load(self):
+        specs = collections.OrderedDict()
+        try:
+            with open(self.path) as catalog_file:
+                entries = json.load(catalog_file)['motors']
+        except (OSError, ValueError, KeyError):
+            self._logger.warning('Could not read motor catalog %s', self.path)
+            entries = []
+        for entry in entries:
+            specs[entry['name']] = MotorSpec(
+                entry['name'], entry['curve_date'], entry['stall_date'],
+                list(entry.get('stall_voltages', [2, 4, 6, 8, 10, 12])),
+                float(entry.get('curve_voltage', 12.0)))
+        try:
+            folders = sorted(os.listdir(self.data_folder))
+        except OSError:
+            folders = []
+        for name in folders:
+            folder = os.path.join(self.data_folder, name)
+            if name not in specs and os.path.isdir(folder):
+                spec = discover_spec(folder, name)
+                if spec:
+                    self._logger.debug('Discovered motor %s', name)
+                    specs[name] = spec
+        return specs
+
+    @property
+    def specs(self):
+        """Every motor's spec, by name, read on first use."""
+        if self._specs is None:
+            self._specs = self._load()
+        return self._specs
+
+    @property
+    def names(self):
+        """Motor names, catalog file order then discovered ones."""
+        return list(self.specs)
+
+    def __len__(self):
+        """Count the motors."""
+        return len(self.specs)
+
+    def __contains__(self, name):
+        """Whether the catalog has a motor."""
+        return name in self.specs
+
+    def __iter__(self):
+        """Iterate over motor names."""
+        return iter(self.names)
+
+    def __getitem__(self, name):
+        """Look up the spec of a motor.
+
+        :param name: The motor's name
+        :type name: str
+        :rtype: `frc_rekt.catalog.MotorSpec`
+
+        """
+        try:
+            return self.specs[name]
+        except KeyError:
+            raise KeyError('Unknown motor {0}, expected one of {1}'.format(
+                name, self.names)) from None
+
+    def motor(self, name):
+        """Get the Motor for a name, characterized on first use and then held.
+
+        :param name: The motor's name
+        :type name: str
+        :rtype: `frc_rekt.motor.Motor`
+
+        """
+        if name not in self._motors:
+            from frc_rekt.motor import Motor
+            self._motors[name] = Motor(self[name].name, catalog=self)
+        return self._motors[name]
+
+    def reload(self):
+        """Forget every spec and motor, they are read again on next use."""
+        self._specs = None
+        self._motors.clear()
+
+
+# The catalog Motor looks motor types up in
+MOTOR_CATALOG = MotorCatalog()
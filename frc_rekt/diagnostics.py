@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Fit diagnostics.
+
+Plots of fitted functions against the data they were fitted to. A plot is
+first captured as a PlotJob, plain arrays that can be shipped to another
+process, then rendered on its own matplotlib Figure that is dropped as soon
+as it is saved. Nothing goes through pyplot's global figure registry, so
+memory stays flat however many plots are rendered. report() renders every
+motor and the main breaker in one batch on a process pool.
+
+"""
+
+import collections
+import datetime
+import logging
+import os
+import numpy as np
+
+from frc_rekt.instrument import timed
+
+PlotJob = collections.namedtuple(
+    'PlotJob', ['name', 'x_label', 'y_label', 'x', 'y', 'fit_x', 'fit_y'])
+
+# Points the fit is drawn with, between the smallest and largest x
+FIT_POINTS = 200
+
+
+def plot_job(dataframe, func, x_label=None, y_label=None, title=None):
+    """Capture a plot of func against the data in dataframe.
+
+    Neither dataframe nor func are kept, so jobs are cheap to hold and can be
+    rendered in another process.
+
+    :param dataframe: the dataframe of original data
+    :type dataframe: pandas.DataFrame
+    :param func: the fitted function
+    :type func: types.FunctionType
+    :param x_label: the x column, defaults to the first column
+    :type x_label: str
+    :param y_label: the y column, defaults to the second column
+    :type y_label: str
+    :param title: what was fitted, e.g. the motor type
+    :type title: str
+    :rtype: `frc_rekt.diagnostics.PlotJob`
+
+    """
+    if not x_label:
+        x_label = str(dataframe.columns[0])
+    if not y_label:
+        y_label = str(dataframe.columns[1])
+    if title:
+        name = '{cls}_{x_label}_vs_{y_label}_fit'.format(
+            cls=title, x_label=x_label, y_label=y_label)
+    else:
+        name = datetime.datetime.now().isoformat()
+    x = np.asarray(dataframe[x_label], dtype=float)
+    y = np.asarray(dataframe[y_label], dtype=float)
+    fit_x = np.linspace(np.nanmin(x), np.nanmax(x), FIT_POINTS)
+    with np.errstate(invalid='ignore'):
+        fit_y = np.asarray(func(fit_x), dtype=float)
+    return PlotJob(name, x_label, y_label, x, y, fit_x, fit_y)
+
+
+@timed()
+def render(job, folder='artifacts', formats=('png', )):
+    """Draw a plot job and save it.
+
+    :param job: The plot to draw
+    :type job: `frc_rekt.diagnostics.PlotJob`
+    :param folder: The folder to save to
+    :type folder: str
+    :param formats: File formats to save, e.g. png and svg
+    :type formats: tuple
+    :returns: the paths written
+    :rtype: list
+
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1)
+    axes.plot(job.x, job.y, 'o', label=job.y_label)
+    axes.plot(job.fit_x, job.fit_y, label='fit')
+    axes.set_xlabel(job.x_label)
+    axes.set_title(job.name)
+    axes.legend()
+    paths = []
+    for file_format in formats:
+        path = os.path.join(folder, '{0}.{1}'.format(job.name, file_format))
+        figure.savefig(path)
+        paths.append(path)
+    figure.clear()
+    return paths
+
+
+def _render_task(task):
+    return render(*task)
+
+
+def motor_jobs(motor):
+    """Plot jobs of every fit of a motor.
+
+    :param motor: The motor
+    :type motor: `frc_rekt.motor.Motor`
+    :rtype: list
+
+    """
+    jobs = [
+        plot_job(motor.curve_frame, func, 'speed', y_label, motor.motor_type)
+        for func, y_label in [(motor.current_func, 'current'),
+                              (motor.torque_func, 'torque')]
+    ]
+    for func, y_label in [(motor.voltage_scaled_current, 'current'),
+                          (motor.voltage_scaled_torque, 'torque')]:
+        stall_df, percent_label = motor.voltage_scaled_frame(
+            y_label, predict=True)
+        jobs.append(
+            plot_job(stall_df, func, 'voltage', percent_label,
+                     motor.motor_type))
+    return jobs
+
+
+def breaker_jobs(breaker):
+    """Plot jobs of every fit of a main breaker.
+
+    :param breaker: The breaker
+    :type breaker: `frc_rekt.main_breaker.MainBreaker`
+    :rtype: list
+
+    """
+    frames = breaker.trip_time_frames
+    derate_frames = breaker.temp_derate_frames
+    return [
+        plot_job(frames['min'], breaker.trip_time_min, title='main_breaker'),
+        plot_job(frames['max'], breaker.trip_time_max, title='main_breaker'),
+        plot_job(
+            derate_frames['min'],
+            breaker.temp_derate_min,
+            title='main_breaker'),
+        plot_job(
+            derate_frames['max'],
+            breaker.temp_derate_max,
+            title='main_breaker')
+    ]
+
+
+def render_jobs(jobs,
+                folder='artifacts',
+                formats=('png', 'svg'),
+                backend='process',
+                workers=None):
+    """Render plot jobs in a batch.
+
+    :param jobs: The plots to draw
+    :type jobs: list
+    :param folder: The folder to save to, created if missing
+    :type folder: str
+    :param formats: File formats to save each plot in
+    :type formats: tuple
+    :param backend: How to run the renders, see `frc_rekt.executor.Executor`
+    :type backend: str
+    :param workers: Number of workers for the thread and process backends
+    :type workers: int
+    :returns: the paths written, per job
+    :rtype: list
+
+    """
+    from frc_rekt.executor import Executor
+
+    os.makedirs(folder, exist_ok=True)
+    tasks = [(job, folder, tuple(formats)) for job in jobs]
+    paths = Executor(backend=backend, workers=workers).map(_render_task, tasks)
+    logging.getLogger(__name__).info('Rendered %s plots to %s', len(tasks),
+                                     folder)
+    return paths
+
+
+def report(motor_types=None,  # pylint: disable=too-many-arguments
+           breaker=True,
+           folder='artifacts',
+           formats=('png', 'svg'),
+           backend='process',
+           workers=None):
+    """Render the fit diagnostics of motors and the main breaker.
+
+    The models are characterized here, then every plot is rendered in one
+    batch.
+
+    :param motor_types: Motor types to plot, defaults to every motor in
+        `frc_rekt.catalog.MOTOR_CATALOG`
+    :type motor_types: list
+    :param breaker: Whether to plot the main breaker's fits
+    :type breaker: bool
+    :param folder: The folder to save to, created if missing
+    :type folder: str
+    :param formats: File formats to save each plot in
+    :type formats: tuple
+    :param backend: How to run the renders, see `frc_rekt.executor.Executor`
+    :type backend: str
+    :param workers: Number of workers for the thread and process backends
+    :type workers: int
+    :returns: the paths written, per plot
+    :rtype: list
+
+    """
+    from frc_rekt.catalog import MOTOR_CATALOG
+    from frc_rekt.main_breaker import MainBreaker
+
+    if motor_types is None:
+        motor_types = MOTOR_CATALOG.names
+    jobs = []
+    for motor_type in motor_types:
+        jobs.extend(motor_jobs(MOTOR_CATALOG.motor(motor_type)))
+    if breaker:
+        jobs.extend(breaker_jobs(MainBreaker()))
+    return render_jobs(jobs, folder, formats, backend, workers)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    logging.basicConfig(level=logging.INFO)
+    report()
@@ -10,6 +10,7 @@ import logging
 import pandas as pd
 import numpy as np
 
+from frc_rekt.gearbox import Gearbox
 from frc_rekt.motor import Motor
 from frc_rekt.wheel import Wheel
 
@@ -25,7 +26,12 @@ POLY = np.polynomial.polynomial
 class Drivetrain(object):
     """Model of a Drivetrain."""
 
-    def __init__(self, wheel=None, motor=None, length=34, width=28):
+    def __init__(self,
+                 wheel=None,
+                 motor=None,
+                 length=34,
+                 width=28,
+                 gearbox=None):
         """Drivetrain.
 
         :param wheel: what wheel is used on the wheelbase
@@ -36,6 +42,8 @@ class Drivetrain(object):
         :type length: int float
         :param width: the width of the wheelbase, from wheel center to wheel center in inches
         :type width: int float
+        :param gearbox: The gearbox driving each side, defaults to 3 of motor
+        :type gearbox: `frc_rekt.gearbox.Gearbox`
 
         """
         self._logger = logging.getLogger(__name__)
@@ -48,7 +56,10 @@ class Drivetrain(object):
         if not motor:
             motor = Motor()
         self.motor = motor
-        self._logger.debug('%s created', str(self))
+        if not gearbox:
+            gearbox = Gearbox(motors=[motor, motor, motor])
+        self.gearbox = gearbox
+        self._logger.debug('%s created', self)
 
     def __str__(self):
         """Represent a Drivetrain."""
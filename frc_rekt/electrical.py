@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Electrical system solver.
+
+Finds the battery voltage and motor currents that agree with each other
+when several motors share one battery: the motors draw current based on the
+voltage they receive, and the battery sags based on the current drawn.
+
+"""
+
+import collections
+import logging
+import numpy as np
+
+from frc_rekt.motor import current_slopes, motor_current_slope
+
+BusSolution = collections.namedtuple(
+    'BusSolution', ['voltage', 'motor_current', 'total_current', 'iterations'])
+
+
+def solve_bus(  # pylint: disable=too-many-arguments,too-many-locals
+        battery,
+        coefficients,
+        motor_speed,
+        pwm,
+        curve_voltage=12.0,
+        tolerance=1e-6,
+        max_iterations=50):
+    """Solve for the self consistent bus voltage of motors on one battery.
+
+    Newton iterations run on whole arrays, every operating point at once.
+    The last axis of motor_speed and pwm is the motors sharing the battery,
+    any leading axes are independent operating points (e.g. time steps).
+
+    :param battery: The battery the motors share
+    :type battery: `frc_rekt.battery.Battery`
+    :param coefficients: The motor fits, floats if every motor is the same
+        type, or `frc_rekt.motor.stack_coefficients` of each motor
+    :type coefficients: `frc_rekt.motor.MotorCoefficients`
+    :param motor_speed: Motor speeds in revolutions / second
+    :type motor_speed: numpy.ndarray
+    :param pwm: Motor pwm, -1 to 1
+    :type pwm: numpy.ndarray
+    :param curve_voltage: The voltage the motor curve was taken at
+    :type curve_voltage: float
+    :param tolerance: Stop once no voltage moves more than this
+    :type tolerance: float
+    :param max_iterations: Stop after this many iterations
+    :type max_iterations: int
+    :returns: voltage at each operating point, motor_current of each motor,
+        total_current drawn from the battery, and the iterations used
+    :rtype: `frc_rekt.electrical.BusSolution`
+
+    """
+    motor_speed, pwm = np.broadcast_arrays(
+        np.asarray(motor_speed, dtype=float), np.asarray(pwm, dtype=float))
+    # The motor fits are for forward voltage, reverse is the mirror image.
+    # Either way the battery supplies the mirrored motor's current.
+    direction = np.where(pwm >= 0, 1.0, -1.0)
+    magnitude = pwm * direction
+    forward_speed = motor_speed * direction
+    slopes = current_slopes(coefficients)
+
+    voltage = np.full(pwm.shape[:-1], battery.voltage(0.0))
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        current, slope = motor_current_slope(
+            coefficients, forward_speed, magnitude * voltage[..., np.newaxis],
+            curve_voltage, slopes)
+        residual = voltage - battery.voltage(current.sum(axis=-1))
+        step = residual / (1.0 + battery.internal_resistance *
+                           (magnitude * slope).sum(axis=-1))
+        # A shorted battery bottoms out at 0 volts
+        voltage = np.maximum(voltage - step, 0.0)
+        if np.all(np.abs(step) < tolerance):
+            break
+    else:
+        logging.getLogger(__name__).warning(
+            'Bus voltage not converged after %s iterations', iterations)
+
+    current = motor_current_slope(coefficients, forward_speed,
+                                  magnitude * voltage[..., np.newaxis],
+                                  curve_voltage, slopes)[0]
+    return BusSolution(voltage, current * direction, current.sum(axis=-1),
+                       iterations)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Brownout safe pwm envelope.
+
+The largest pwm a drivetrain can be given at each motor speed without
+pulling the battery below a minimum voltage. At the limit the battery sits
+exactly at the minimum, so the current budget is known and only the motor
+voltage that draws it has to be found, at every speed at once. The envelope
+is returned as a table, and fitted with a polynomial below the speed where
+full pwm becomes safe, for use in robot code.
+
+"""
+
+import collections
+import logging
+import pandas as pd
+import numpy as np
+
+from frc_rekt.battery import Battery
+from frc_rekt.electrical import solve_bus
+from frc_rekt.gearbox import Gearbox
+from frc_rekt.motor import (current_slopes, horner, motor_current_slope,
+                            stack_coefficients)
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+# The roboRIO browns out below this many volts
+BROWNOUT_VOLTAGE = 6.8
+
+
+def max_pwm(  # pylint: disable=too-many-arguments,too-many-locals
+        battery,
+        coefficients,
+        motor_speed,
+        min_voltage=BROWNOUT_VOLTAGE,
+        curve_voltage=12.0,
+        tolerance=1e-9,
+        max_iterations=50):
+    """Largest pwm that keeps the battery at or above min_voltage.
+
+    Every motor gets the same pwm. The last axis of motor_speed is the motors
+    sharing the battery, any leading axes are independent operating points
+    (e.g. speeds). Solved with Newton's method on whole arrays, falling back
+    to bisection wherever a step would leave the bracket.
+
+    :param battery: The battery the motors share
+    :type battery: `frc_rekt.battery.Battery`
+    :param coefficients: The motor fits, floats if every motor is the same
+        type, or `frc_rekt.motor.stack_coefficients` of each motor
+    :type coefficients: `frc_rekt.motor.MotorCoefficients`
+    :param motor_speed: Forward motor speeds in revolutions / second
+    :type motor_speed: numpy.ndarray
+    :param min_voltage: The lowest battery voltage allowed
+    :type min_voltage: float
+    :param curve_voltage: The voltage the motor curve was taken at
+    :type curve_voltage: float
+    :param tolerance: Stop once no motor voltage moves more than this
+    :type tolerance: float
+    :param max_iterations: Stop after this many iterations
+    :type max_iterations: int
+    :returns: pwm at each operating point, 0 to 1
+    :rtype: numpy.ndarray
+
+    """
+    motor_speed = np.asarray(motor_speed, dtype=float)
+    slopes = current_slopes(coefficients)
+    # At the limit the battery sits at min_voltage, which fixes the current
+    allowed = (battery.voltage(0.0) - min_voltage) / battery.internal_resistance
+
+    # Motor voltage, bracketed by lower and upper
+    voltage = np.full(motor_speed.shape[:-1], float(min_voltage))
+    lower = np.zeros_like(voltage)
+    upper = voltage.copy()
+    limited = None
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        current, slope = motor_current_slope(coefficients, motor_speed,
+                                             voltage[..., np.newaxis],
+                                             curve_voltage, slopes)
+        excess = current.sum(axis=-1) - allowed
+        over = excess > 0
+        if limited is None:
+            # Full pwm at min_voltage is within budget, so safe
+            limited = over
+        upper = np.where(over, voltage, upper)
+        lower = np.where(over, lower, voltage)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = voltage - excess / slope.sum(axis=-1)
+        inside = (newton >= lower) & (newton <= upper)
+        step = np.where(inside, newton, (lower + upper) / 2.0) - voltage
+        voltage = voltage + step
+        if np.all(np.abs(step) < tolerance):
+            break
+    else:
+        logging.getLogger(__name__).warning(
+            'Pwm envelope not converged after %s iterations', iterations)
+    return np.where(limited, voltage / min_voltage, 1.0)
+
+
+class PiecewisePolynomial(object):  # pylint: disable=too-few-public-methods
+    """Polynomials between breakpoints.
+
+    pieces[i] applies below breaks[i], and the last piece from the last
+    break up.
+
+    """
+
+    def __init__(self, breaks, pieces):
+        """PiecewisePolynomial.
+
+        :param breaks: Breakpoints, ascending
+        :type breaks: list
+        :param pieces: Coefficients of each polynomial, lowest order first,
+            one more than there are breaks
+        :type pieces: list
+
+        """
+        if len(pieces) != len(breaks) + 1:
+            raise ValueError('Expected {0} pieces, got {1}'.format(
+                len(breaks) + 1, len(pieces)))
+        self.breaks = [float(point) for point in breaks]
+        self.pieces = [
+            tuple(float(coef) for coef in piece) for piece in pieces
+        ]
+
+    def __call__(self, x):
+        """Evaluate at x.
+
+        :param x: Where to evaluate
+        :type x: float numpy.ndarray
+
+        """
+        result = horner(self.pieces[-1], x)
+        for point, piece in reversed(list(zip(self.breaks, self.pieces))):
+            result = np.where(x < point, horner(piece, x), result)
+        return result
+
+
+def fit_envelope(motor_speed, pwm, deg=2):
+    """Fit a pwm envelope with a polynomial below the first safe speed.
+
+    :param motor_speed: Motor speeds, ascending
+    :type motor_speed: numpy.ndarray
+    :param pwm: The envelope at each speed, see max_pwm
+    :type pwm: numpy.ndarray
+    :param deg: Degree of the polynomial
+    :type deg: int
+    :returns: the fit, 1 from the first speed full pwm is safe at
+    :rtype: `frc_rekt.envelope.PiecewisePolynomial`
+
+    """
+    motor_speed = np.asarray(motor_speed, dtype=float)
+    pwm = np.asarray(pwm, dtype=float)
+    limited = pwm < 1.0
+    safe = np.flatnonzero(~limited)
+    transition = motor_speed[safe[0]] if safe.size else motor_speed[-1]
+    if np.count_nonzero(limited) > deg:
+        coefs = POLY.polyfit(motor_speed[limited], pwm[limited], deg)
+    else:
+        coefs = [1.0]
+    return PiecewisePolynomial([transition], [coefs, [1.0]])
+
+
+def _merge(motors):
+    # Current scales with voltage_scaled_current, so n motors of one type
+    # draw what one motor with n times its voltage_scaled_current does
+    counts = collections.OrderedDict()
+    for motor in motors:
+        counts[motor.coefficients] = counts.get(motor.coefficients, 0) + 1
+    return [
+        coefficients._replace(voltage_scaled_current=tuple(
+            count * coef for coef in coefficients.voltage_scaled_current))
+        for coefficients, count in counts.items()
+    ]
+
+
+class PwmEnvelope(object):  # pylint: disable=too-many-instance-attributes
+    """Brownout safe pwm envelope of a drivetrain."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            gearbox=None,
+            battery=None,
+            min_voltage=BROWNOUT_VOLTAGE,
+            sides=2,
+            points=256,
+            deg=2):
+        """PwmEnvelope.
+
+        :param gearbox: The gearbox driving each side
+        :type gearbox: `frc_rekt.gearbox.Gearbox`
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param min_voltage: The lowest battery voltage allowed
+        :type min_voltage: float
+        :param sides: Number of gearboxes, all at the same speed
+        :type sides: int
+        :param points: Number of motor speeds, from 0 to free speed at the
+            battery's unloaded voltage
+        :type points: int
+        :param deg: Degree of the fitted polynomial
+        :type deg: int
+
+        """
+        self._logger = logging.getLogger(__name__)
+        if not gearbox:
+            gearbox = Gearbox()
+        self.gearbox = gearbox
+        if not battery:
+            battery = Battery()
+        self.battery = battery
+        self.min_voltage = float(min_voltage)
+        motors = list(gearbox.motors) * sides
+        self.coefficients = stack_coefficients(_merge(motors))
+        self.curve_voltage = motors[0].spec.curve_voltage
+        free_speed = max(self._free_speed(motor) for motor in motors)
+        self.motor_speed = np.linspace(0.0, free_speed, points)
+        self._speeds = self.motor_speed[:, np.newaxis] * np.ones(
+            len(self.coefficients.current_func[0]))
+        self.pwm = self.solve()
+        self.function = fit_envelope(self.motor_speed, self.pwm, deg)
+        self._logger.debug('Pwm envelope limits pwm below %s rev/s',
+                           self.function.breaks[0])
+
+    def _free_speed(self, motor):
+        # Where the torque fit crosses 0, at the unloaded battery voltage
+        roots = POLY.polyroots(motor.coefficients.torque_func)
+        speed = max(root.real for root in roots if abs(root.imag) < 1e-9)
+        return speed * self.battery.voltage(0.0) / motor.spec.curve_voltage
+
+    def solve(self, min_voltage=None, motor_speed=None):
+        """Solve the envelope for another floor, or at other speeds.
+
+        :param min_voltage: The lowest battery voltage allowed, defaults to
+            this envelope's
+        :type min_voltage: float
+        :param motor_speed: Motor speeds in revolutions / second, negative
+            for reverse pwm while moving forward, defaults to this
+            envelope's
+        :type motor_speed: numpy.ndarray
+        :returns: pwm at each motor speed
+        :rtype: numpy.ndarray
+
+        """
+        if min_voltage is None:
+            min_voltage = self.min_voltage
+        speeds = self._speeds
+        if motor_speed is not None:
+            speeds = np.asarray(
+                motor_speed, dtype=float)[..., np.newaxis] * np.ones(
+                    self._speeds.shape[-1])
+        return max_pwm(self.battery, self.coefficients, speeds, min_voltage,
+                       self.curve_voltage)
+
+    @property
+    def table(self):
+        """The envelope, with the battery voltage and current it results in.
+
+        :rtype: pandas.DataFrame
+
+        """
+        solution = solve_bus(self.battery, self.coefficients, self._speeds,
+                             self.pwm[:, np.newaxis], self.curve_voltage)
+        return pd.DataFrame(
+            collections.OrderedDict([
+                ('motor_speed', self.motor_speed),
+                ('output_speed',
+                 self.motor_speed / self.gearbox.mechanical_advantage),
+                ('pwm', self.pwm), ('fit', self.function(self.motor_speed)),
+                ('battery_voltage', solution.voltage),
+                ('total_current', solution.total_current)
+            ]))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Execution backends.
+
+Runs many independent evaluations serially, on a thread pool or on a
+process pool. Workers are initialized once with preloaded motor and breaker
+characterizations, and results always come back in task order.
+
+"""
+
+import concurrent.futures
+import logging
+import os
+
+from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.motor import Motor
+
+BACKENDS = ['serial', 'thread', 'process']
+
+# Per process state, filled in by initialize_worker
+_WORKER = {'motors': {}, 'breaker': None}
+
+
+def initialize_worker(motor_types=(), breaker=False):
+    """Preload characterizations in this process.
+
+    :param motor_types: Motor types to characterize
+    :type motor_types: list
+    :param breaker: Whether to build a `frc_rekt.main_breaker.MainBreaker`
+    :type breaker: bool
+
+    """
+    for motor_type in motor_types:
+        _WORKER['motors'][motor_type] = Motor(motor_type)
+    if breaker and not _WORKER['breaker']:
+        _WORKER['breaker'] = MainBreaker()
+
+
+def worker_motor(motor_type):
+    """Return this process's Motor for a motor type.
+
+    :param motor_type: The type of motor
+    :type motor_type: str
+    :rtype: `frc_rekt.motor.Motor`
+
+    """
+    if motor_type not in _WORKER['motors']:
+        initialize_worker(motor_types=[motor_type])
+    return _WORKER['motors'][motor_type]
+
+
+def worker_breaker():
+    """Return this process's MainBreaker.
+
+    :rtype: `frc_rekt.main_breaker.MainBreaker`
+
+    """
+    initialize_worker(breaker=True)
+    return _WORKER['breaker']
+
+
+def chunk_slices(total, chunk_size):
+    """Split range(total) into consecutive slices.
+
+    :param total: The number of items
+    :type total: int
+    :param chunk_size: The largest number of items per slice
+    :type chunk_size: int
+    :rtype: list
+
+    """
+    return [
+        slice(start, min(start + chunk_size, total))
+        for start in range(0, total, chunk_size)
+    ]
+
+
+class Executor(object):
+    """Maps a function over tasks on the chosen backend."""
+
+    def __init__(self,
+                 backend='serial',
+                 workers=None,
+                 motor_types=(),
+                 breaker=False):
+        """Executor.
+
+        :param backend: One of serial, thread or process
+        :type backend: str
+        :param workers: Number of workers, defaults to the number of cpus
+        :type workers: int
+        :param motor_types: Motor types to preload in each worker
+        :type motor_types: list
+        :param breaker: Whether to preload a MainBreaker in each worker
+        :type breaker: bool
+
+        """
+        if backend not in BACKENDS:
+            raise ValueError('Unknown backend {0}, expected one of {1}'.format(
+                backend, BACKENDS))
+        self._logger = logging.getLogger(__name__)
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self._initargs = (tuple(motor_types), breaker)
+        self._pool = None
+        self._started = False
+
+    def __enter__(self):
+        """Start the workers."""
+        if self.backend == 'process':
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=initialize_worker,
+                initargs=self._initargs)
+        else:
+            # Threads share this process's characterizations
+            initialize_worker(*self._initargs)
+            if self.backend == 'thread':
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers)
+        self._started = True
+        self._logger.debug('Started %s backend with %s workers',
+                           self.backend, self.workers)
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the workers."""
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+        self._started = False
+
+    def map(self, func, tasks):
+        """Apply func to each task.
+
+        :param func: A module level function, so process workers can find it
+        :type func: types.FunctionType
+        :param tasks: The tasks, keep them coarse to keep overhead small
+        :type tasks: list
+        :returns: func's result for each task, in task order
+        :rtype: list
+
+        """
+        if not self._started:
+            with self:
+                return self.map(func, tasks)
+        if self.backend == 'serial':
+            return [func(task) for task in tasks]
+        return list(self._pool.map(func, tasks))
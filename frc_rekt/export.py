@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Coefficient export.
+
+Flattens the fitted models into a coefficient table, so robot code can do
+the same math without python. A table is a dict of named entries, each one
+fit:
+
+    polynomial: coefs, lowest order first, evaluated with Horner's method
+    power: params a, b, c, d, e of a * (b * (x + c)) ** d + e, the main
+        breaker's trip curves
+    piecewise: polynomial pieces between breaks, e.g. the pwm envelope of
+        `frc_rekt.envelope`
+
+The table is written as JSON, or as Java and C++ source holding one
+constant array per entry along with Horner form evaluators. evaluate() is
+the reference evaluator the generated code is checked against.
+
+"""
+
+import collections
+import json
+import logging
+import re
+
+from frc_rekt.envelope import PiecewisePolynomial, PwmEnvelope
+from frc_rekt.motor import horner
+
+# Bump when the layout of the table changes
+EXPORT_VERSION = 1
+
+KINDS = ['polynomial', 'power', 'piecewise']
+
+_JAVA_TEMPLATE = '''{package}/** Generated by frc_rekt.export, do not edit. */
+public final class {class_name} {{
+    private {class_name}() {{
+    }}
+
+{constants}
+
+    /** Evaluate a polynomial, lowest order coefficient first. */
+    public static double horner(double[] coefs, double x) {{
+        double result = 0.0;
+        for (int i = coefs.length - 1; i >= 0; i--) {{
+            result = result * x + coefs[i];
+        }}
+        return result;
+    }}
+
+    /** Evaluate a * (b * (x + c)) ^ d + e. */
+    public static double power(double[] params, double x) {{
+        return params[0] * Math.pow(params[1] * (x + params[2]), params[3]) + params[4];
+    }}
+
+    /** Evaluate a motor fit at a speed in revolutions / second and a voltage. */
+    public static double motor(double[] curve, double[] voltageScale, double curveVoltage, double speed,
+                               double voltage) {{
+        double scaledSpeed = voltage == 0.0 ? speed * curveVoltage : speed * curveVoltage / voltage;
+        return horner(voltageScale, voltage) * horner(curve, scaledSpeed);
+    }}
+
+    /** Evaluate pieces[i] below breaks[i], and the last piece from the last break up. */
+    public static double piecewise(double[] breaks, double[][] pieces, double x) {{
+        for (int i = 0; i < breaks.length; i++) {{
+            if (x < breaks[i]) {{
+                return horner(pieces[i], x);
+            }}
+        }}
+        return horner(pieces[breaks.length], x);
+    }}
+}}
+'''
+
+_CPP_TEMPLATE = '''// Generated by frc_rekt.export, do not edit.
+#pragma once
+
+#include <cmath>
+#include <cstddef>
+
+namespace {namespace} {{
+
+{constants}
+
+// Evaluate a polynomial, lowest order coefficient first.
+template <std::size_t N>
+inline double horner(const double (&coefs)[N], double x) {{
+    double result = 0.0;
+    for (std::size_t i = N; i-- > 0;) {{
+        result = result * x + coefs[i];
+    }}
+    return result;
+}}
+
+// Evaluate a * (b * (x + c)) ^ d + e.
+inline double power(const double (&params)[5], double x) {{
+    return params[0] * std::pow(params[1] * (x + params[2]), params[3]) + params[4];
+}}
+
+// Evaluate a motor fit at a speed in revolutions / second and a voltage.
+template <std::size_t N, std::size_t M>
+inline double motor(const double (&curve)[N], const double (&voltage_scale)[M], double curve_voltage,
+                    double speed, double voltage) {{
+    double scaled_speed = voltage == 0.0 ? speed * curve_voltage : speed * curve_voltage / voltage;
+    return horner(voltage_scale, voltage) * horner(curve, scaled_speed);
+}}
+
+// Evaluate pieces[i] below breaks[i], and the last piece from the last break up.
+template <std::size_t B, std::size_t N>
+inline double piecewise(const double (&breaks)[B], const double (&pieces)[B + 1][N], double x) {{
+    for (std::size_t i = 0; i < B; i++) {{
+        if (x < breaks[i]) {{
+            return horner(pieces[i], x);
+        }}
+    }}
+    return horner(pieces[B], x);
+}}
+
+}}  // namespace {namespace}
+'''
+
+
+def polynomial_entry(coefs):
+    """Table entry of a polynomial.
+
+    :param coefs: Coefficients, lowest order first
+    :type coefs: list
+    :rtype: dict
+
+    """
+    return {'kind': 'polynomial', 'coefs': [float(coef) for coef in coefs]}
+
+
+def power_entry(params):
+    """Table entry of a * (b * (x + c)) ** d + e.
+
+    :param params: a, b, c, d and e
+    :type params: list
+    :rtype: dict
+
+    """
+    params = [float(param) for param in params]
+    if len(params) != 5:
+        raise ValueError('Expected 5 params, got {0}'.format(len(params)))
+    return {'kind': 'power', 'params': params}
+
+
+def piecewise_entry(breaks, pieces):
+    """Table entry of polynomials between breakpoints.
+
+    :param breaks: Breakpoints, ascending, at least one
+    :type breaks: list
+    :param pieces: Coefficients of each polynomial, lowest order first,
+        pieces[i] applies below breaks[i] and the last from the last break up
+    :type pieces: list
+    :rtype: dict
+
+    """
+    if not breaks:
+        raise ValueError('Expected at least one break')
+    function = PiecewisePolynomial(breaks, pieces)
+    return {
+        'kind': 'piecewise',
+        'breaks': function.breaks,
+        'pieces': [list(piece) for piece in function.pieces]
+    }
+
+
+def evaluate(entry, x):
+    """Evaluate a table entry, the way the generated code does.
+
+    :param entry: The entry
+    :type entry: dict
+    :param x: Where to evaluate it
+    :type x: float numpy.ndarray
+
+    """
+    if entry['kind'] == 'polynomial':
+        return horner(entry['coefs'], x)
+    if entry['kind'] == 'power':
+        a, b, c, d, e = entry['params']
+        return a * (b * (x + c))**d + e
+    if entry['kind'] == 'piecewise':
+        return PiecewisePolynomial(entry['breaks'], entry['pieces'])(x)
+    raise ValueError('Unknown kind {0}, expected one of {1}'.format(
+        entry['kind'], KINDS))
+
+
+def motor_entries(motor):
+    """Table entries of a motor's fits.
+
+    :param motor: The motor
+    :type motor: `frc_rekt.motor.Motor`
+    :returns: the curve voltage and each fit, by name
+    :rtype: dict
+
+    """
+    entries = collections.OrderedDict()
+    entries['curve_voltage'] = float(motor.spec.curve_voltage)
+    for name, coefs in motor.coefficients._asdict().items():
+        entries[name] = polynomial_entry(coefs)
+    return entries
+
+
+def breaker_entries(breaker):
+    """Table entries of a main breaker's fits.
+
+    The trip curves take the current as a fraction of rated_current, the
+    derate curves take the ambient temperature in degrees C.
+
+    :param breaker: The breaker
+    :type breaker: `frc_rekt.main_breaker.MainBreaker`
+    :returns: the rated current and each fit, by name
+    :rtype: dict
+
+    """
+    params = breaker.fit_params
+    entries = collections.OrderedDict()
+    entries['rated_current'] = float(breaker.rated_current)
+    for boundary in ['min', 'max']:
+        entries['trip_time_{0}'.format(boundary)] = power_entry(
+            params['trip_time-{0}'.format(boundary)])
+    for boundary in ['min', 'max']:
+        entries['temp_derate_{0}'.format(boundary)] = polynomial_entry(
+            params['temp_derate-{0}'.format(boundary)])
+    return entries
+
+
+def coefficient_table(motor_types=None, breaker=True, curves=None):
+    """Build the coefficient table.
+
+    :param motor_types: Motor types to export, defaults to every motor in
+        `frc_rekt.catalog.MOTOR_CATALOG`
+    :type motor_types: list
+    :param breaker: Whether to export the main breaker's fits
+    :type breaker: bool
+    :param curves: Other curves to export, e.g. derived current limits, as
+        {name: entry}
+    :type curves: dict
+    :rtype: dict
+
+    """
+    from frc_rekt.catalog import MOTOR_CATALOG
+    from frc_rekt.main_breaker import MainBreaker
+
+    if motor_types is None:
+        motor_types = MOTOR_CATALOG.names
+    table = collections.OrderedDict()
+    table['version'] = EXPORT_VERSION
+    table['motors'] = collections.OrderedDict(
+        (motor_type, motor_entries(MOTOR_CATALOG.motor(motor_type)))
+        for motor_type in motor_types)
+    if breaker:
+        table['main_breaker'] = breaker_entries(MainBreaker())
+    table['curves'] = collections.OrderedDict(sorted((curves or {}).items()))
+    return table
+
+
+def _identifier(*parts):
+    name = re.sub(r'[^0-9A-Za-z]+', '_', '_'.join(parts)).strip('_')
+    return name.upper()
+
+
+def _constants(table):
+    # (name, values) of every constant, in table order
+    constants = []
+    for motor_type, entries in table.get('motors', {}).items():
+        constants.extend(_group_constants(('motor', motor_type), entries))
+    constants.extend(
+        _group_constants(('main_breaker', ), table.get('main_breaker', {})))
+    constants.extend(_group_constants(('curve', ), table.get('curves', {})))
+    return constants
+
+
+def _group_constants(prefix, entries):
+    constants = []
+    for name, entry in entries.items():
+        identifier = _identifier(*(prefix + (name, )))
+        if not isinstance(entry, dict):
+            constants.append((identifier, entry))
+        elif entry['kind'] == 'piecewise':
+            # Zero padded to one length, so the pieces form a 2d array
+            length = max(len(piece) for piece in entry['pieces'])
+            constants.append((identifier + '_BREAKS', entry['breaks']))
+            constants.append((identifier + '_PIECES', [
+                list(piece) + [0.0] * (length - len(piece))
+                for piece in entry['pieces']
+            ]))
+        else:
+            constants.append((identifier, entry.get('coefs',
+                                                    entry.get('params'))))
+    return constants
+
+
+def _literals(values):
+    if isinstance(values, list):
+        return '{{{0}}}'.format(', '.join(_literals(value) for value in values))
+    return repr(float(values))
+
+
+def _dimensions(values):
+    # Nesting depth of a constant, 0 for a float
+    if isinstance(values, list):
+        return 1 + _dimensions(values[0])
+    return 0
+
+
+def to_json(table, path=None):
+    """Export a table as JSON.
+
+    :param table: The table, see coefficient_table
+    :type table: dict
+    :param path: Write to this file, if given
+    :type path: str
+    :returns: the JSON
+    :rtype: str
+
+    """
+    text = json.dumps(table, indent=2)
+    _write(text, path)
+    return text
+
+
+def to_java(table, path=None, class_name='FrcRektCoefficients', package=None):
+    """Export a table as a Java class of constants and evaluators.
+
+    :param table: The table, see coefficient_table
+    :type table: dict
+    :param path: Write to this file, if given
+    :type path: str
+    :param class_name: The class to generate
+    :type class_name: str
+    :param package: The package of the class, if any
+    :type package: str
+    :returns: the Java source
+    :rtype: str
+
+    """
+    lines = [
+        '    public static final double{0} {1} = {2};'.format(
+            '[]' * _dimensions(values), name, _literals(values))
+        for name, values in _constants(table)
+    ]
+    text = _JAVA_TEMPLATE.format(
+        package='package {0};\n\n'.format(package) if package else '',
+        class_name=class_name,
+        constants='\n'.join(lines))
+    _write(text, path)
+    return text
+
+
+def to_cpp(table, path=None, namespace='frc_rekt'):
+    """Export a table as a C++ header of constants and evaluators.
+
+    :param table: The table, see coefficient_table
+    :type table: dict
+    :param path: Write to this file, if given
+    :type path: str
+    :param namespace: The namespace to generate
+    :type namespace: str
+    :returns: the C++ source
+    :rtype: str
+
+    """
+    lines = []
+    for name, values in _constants(table):
+        dimensions = _dimensions(values)
+        if dimensions == 2:
+            shape = '[{0}][{1}]'.format(len(values), len(values[0]))
+        else:
+            shape = '[]' * dimensions
+        lines.append('constexpr double {0}{1} = {2};'.format(
+            name, shape, _literals(values)))
+    text = _CPP_TEMPLATE.format(
+        namespace=namespace, constants='\n'.join(lines))
+    _write(text, path)
+    return text
+
+
+def _write(text, path):
+    if path:
+        with open(path, 'w') as source_file:
+            source_file.write(text)
+        logging.getLogger(__name__).info('Wrote %s', path)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    logging.basicConfig(level=logging.INFO)
+    ENVELOPE = PwmEnvelope().function
+    COEFFICIENTS = coefficient_table(curves={
+        'pwm_envelope': piecewise_entry(ENVELOPE.breaks, ENVELOPE.pieces)
+    })
+    to_json(COEFFICIENTS, 'artifacts/coefficients.json')
+    to_java(COEFFICIENTS, 'artifacts/FrcRektCoefficients.java')
+    to_cpp(COEFFICIENTS, 'artifacts/frc_rekt_coefficients.h')
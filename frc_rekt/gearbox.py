@@ -21,6 +21,21 @@ pd.set_option('expand_frame_repr', False)
 POLY = np.polynomial.polynomial
 
 
+def gear_ratio(gears):
+    """Mechanical advantage of a list of gear pairs.
+
+    :param gears: (driver, driven) tooth counts of each stage
+    :type gears: list
+    :rtype: float
+
+    """
+    mechanical_advantage = 1.0
+    for gear_pair in gears:
+        mechanical_advantage = mechanical_advantage * (
+            float(gear_pair[1]) / float(gear_pair[0]))
+    return mechanical_advantage
+
+
 class Gearbox(object):  # pylint: disable=too-few-public-methods
     """Model of a Gearbox."""
 
@@ -44,13 +59,19 @@ class Gearbox(object):  # pylint: disable=too-few-public-methods
         if not self._motors:
             self._motors = [Motor(), Motor(), Motor()]
         self._efficiency = efficiency
-        self._logger.debug('%s created', str(self))
+        self._logger.debug('%s created', self)
+
+    @property
+    def motors(self):
+        """Motors attached to the gearbox."""
+        return self._motors
+
+    @property
+    def efficiency(self):
+        """Gearbox efficiency."""
+        return self._efficiency
 
     @property
     def mechanical_advantage(self):
         """Gearbox mechanical advantage."""
-        mechanical_advantage = 1.0
-        for gear_pair in self._gears:
-            mechanical_advantage = mechanical_advantage * (
-                float(gear_pair[1]) / float(gear_pair[0]))
-        return mechanical_advantage
+        return gear_ratio(self._gears)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Gear train search.
+
+Finds the tooth counts that give a gearbox a mechanical advantage in a
+target range, best first. Each stage's catalog is reduced to its buildable
+(driver, driven) pairs, sorted by log ratio, once. A train is split into two
+halves: every combination of the second half is enumerated and sorted, and
+every combination of the first half finds the second halves that complete it
+into the target range with a binary search (meet in the middle), so the full
+product of stages is never formed.
+
+Designs are ranked by a score of their mechanical advantage, lower is better,
+by default the time to drive a distance. That score is tabulated over the
+target range and interpolated, which makes the best score a first half can
+reach a range minimum over the table. First halves are expanded in order of
+that bound, and the search stops once no remaining bound can beat the top
+designs found. Other scores have no such bound, so every design in range is
+scored.
+
+"""
+
+import collections
+import logging
+import pandas as pd
+import numpy as np
+
+from frc_rekt.battery import Battery
+from frc_rekt.drivetrain import Drivetrain
+from frc_rekt.simulation import DrivetrainPlant
+from frc_rekt.sweep import drive_to_distance
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+# (drivers, driven) tooth counts available to each stage, motor pinions first
+CATALOG = [
+    (range(9, 15), range(30, 73)),
+    (range(12, 25), range(24, 73)),
+    (range(12, 25), range(24, 73)),
+]
+
+# Designs are expanded about this many at a time
+BATCH = 16384
+
+StagePairs = collections.namedtuple('StagePairs',
+                                    ['driver', 'driven', 'log_ratio'])
+
+
+def stage_pairs(drivers, driven, min_ratio=1.0, max_ratio=6.0):
+    """Buildable gear pairs of a stage, by ascending ratio.
+
+    :param drivers: Driver tooth counts available
+    :type drivers: list
+    :param driven: Driven tooth counts available
+    :type driven: list
+    :param min_ratio: Smallest reduction of the stage, driven / driver
+    :type min_ratio: float
+    :param max_ratio: Largest reduction of the stage
+    :type max_ratio: float
+    :rtype: `frc_rekt.gearing.StagePairs`
+
+    """
+    driver, driven = [
+        grid.ravel()
+        for grid in np.meshgrid(
+            np.asarray(drivers, dtype=int), np.asarray(driven, dtype=int))
+    ]
+    ratio = driven / driver.astype(float)
+    keep = (ratio >= min_ratio) & (ratio <= max_ratio)
+    order = np.argsort(ratio[keep], kind='mergesort')
+    return StagePairs(driver[keep][order], driven[keep][order],
+                      np.log(ratio[keep][order]))
+
+
+def _combine(stages):
+    # Every combination of pairs from stages, as the log ratio and teeth of
+    # each and the pair index in each stage, by ascending log ratio
+    log_ratio = np.zeros(1)
+    teeth = np.zeros(1, dtype=int)
+    indexes = np.zeros((1, 0), dtype=int)
+    for stage in stages:
+        log_ratio = np.add.outer(log_ratio, stage.log_ratio).ravel()
+        teeth = np.add.outer(teeth, stage.driver + stage.driven).ravel()
+        indexes = np.column_stack([
+            np.repeat(indexes, len(stage.log_ratio), axis=0),
+            np.tile(np.arange(len(stage.log_ratio)), len(indexes))
+        ])
+    order = np.argsort(log_ratio, kind='mergesort')
+    return log_ratio[order], teeth[order], indexes[order]
+
+
+def _log_sum(first, second):
+    # Rounded, so trains of the same ratio from different teeth tie exactly
+    return np.round(first + second, 12)
+
+
+def _range_min(values, start, stop):
+    # Smallest of values[start:stop] for each start, stop, inf where empty
+    bounds = np.column_stack([start, stop]).ravel()
+    reduced = np.minimum.reduceat(
+        np.append(values, np.inf), np.minimum(bounds, len(values)))[::2]
+    return np.where(stop > start, reduced, np.inf)
+
+
+class DriveTimeScore(object):  # pylint: disable=too-few-public-methods
+    """Time for a drivetrain to drive a distance, by mechanical advantage."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            min_ratio,
+            max_ratio,
+            drivetrain=None,
+            battery=None,
+            mass=154,
+            distance=20.0,
+            points=64,
+            dt=0.005,
+            max_time=10.0):
+        """DriveTimeScore.
+
+        :param min_ratio: Smallest mechanical advantage scored
+        :type min_ratio: float
+        :param max_ratio: Largest mechanical advantage scored
+        :type max_ratio: float
+        :param drivetrain: The drivetrain, its gearbox's gears are ignored
+        :type drivetrain: `frc_rekt.drivetrain.Drivetrain`
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param mass: The robot mass in lbs
+        :type mass: int float
+        :param distance: Distance to drive in feet
+        :type distance: int float
+        :param points: Number of mechanical advantages simulated
+        :type points: int
+        :param dt: The length of a time step in seconds
+        :type dt: float
+        :param max_time: Mechanical advantages that take longer than this
+            score inf
+        :type max_time: float
+
+        """
+        if not drivetrain:
+            drivetrain = Drivetrain()
+        if not battery:
+            battery = Battery()
+        gearbox = drivetrain.gearbox
+        # Interpolated in log ratio, as the search works in log ratios
+        self.log_ratio = np.linspace(
+            np.log(min_ratio), np.log(max_ratio), points)
+        plant = DrivetrainPlant(
+            drivetrain.motor.coefficients,
+            battery,
+            float(mass) * 0.453592,
+            drivetrain.wheel.diameter * 0.0254,
+            np.exp(self.log_ratio),
+            efficiency=gearbox.efficiency,
+            motors_per_side=len(gearbox.motors),
+            cof=drivetrain.wheel.cof,
+            curve_voltage=drivetrain.motor.spec.curve_voltage)
+        time = drive_to_distance(plant, distance * 0.3048, dt=dt,
+                                 max_time=max_time)[0]
+        self.time = np.where(np.isnan(time), np.inf, time)
+
+    def __call__(self, mechanical_advantage):
+        """Score mechanical advantages, the time to distance in seconds.
+
+        :param mechanical_advantage: Gearbox reductions, within the range
+        :type mechanical_advantage: float numpy.ndarray
+
+        """
+        return np.interp(np.log(mechanical_advantage), self.log_ratio,
+                         self.time)
+
+
+class GearSearch(object):  # pylint: disable=too-few-public-methods
+    """Searches gear catalogs for the best trains in a ratio range."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            min_ratio,
+            max_ratio,
+            catalog=None,
+            min_stage_ratio=1.0,
+            max_stage_ratio=6.0,
+            score=None):
+        """GearSearch.
+
+        :param min_ratio: Smallest mechanical advantage of a design
+        :type min_ratio: float
+        :param max_ratio: Largest mechanical advantage of a design
+        :type max_ratio: float
+        :param catalog: (drivers, driven) tooth counts available to each
+            stage, a train has at most as many stages as the catalog
+        :type catalog: list
+        :param min_stage_ratio: Smallest reduction of any stage
+        :type min_stage_ratio: float
+        :param max_stage_ratio: Largest reduction of any stage
+        :type max_stage_ratio: float
+        :param score: Scores arrays of mechanical advantages, lower is
+            better, defaults to a `frc_rekt.gearing.DriveTimeScore`. The
+            search is only pruned for scores with a log_ratio attribute, that
+            are linear in log ratio between its points.
+        :type score: types.FunctionType
+
+        """
+        self._logger = logging.getLogger(__name__)
+        if not catalog:
+            catalog = CATALOG
+        if score is None:
+            score = DriveTimeScore(min_ratio, max_ratio)
+        self.min_ratio = float(min_ratio)
+        self.max_ratio = float(max_ratio)
+        self.stages = [
+            stage_pairs(drivers, driven, min_stage_ratio, max_stage_ratio)
+            for drivers, driven in catalog
+        ]
+        self.score = score
+        # The score at each table point, if the score interpolates a table
+        self._table = None
+        log_ratio = getattr(score, 'log_ratio', None)
+        if log_ratio is not None:
+            self._table = (log_ratio, score(np.exp(log_ratio)))
+
+    def _bound(self, low, high):
+        # Lowest score for a log ratio from low to high. The table is taken as
+        # interpolated, so that is at an end or a table point between. Any
+        # other score could dip anywhere, so has no bound.
+        if self._table is None:
+            return np.full(len(low), -np.inf)
+        log_ratio, table = self._table
+        ends = np.minimum(
+            self.score(np.exp(low)), self.score(np.exp(high)))
+        inside = _range_min(table,
+                            np.searchsorted(log_ratio, low, 'right'),
+                            np.searchsorted(log_ratio, high, 'left'))
+        return np.minimum(ends, inside)
+
+    def _search(self, stages, top, best):  # pylint: disable=too-many-locals
+        # Best designs of one stage count, merged into best
+        split = len(stages) // 2
+        first_log, first_teeth, first_index = _combine(stages[:split])
+        second_log, second_teeth, second_index = _combine(stages[split:])
+        start = np.searchsorted(second_log,
+                                np.log(self.min_ratio) - first_log - 1e-12,
+                                'left')
+        stop = np.searchsorted(second_log,
+                               np.log(self.max_ratio) - first_log + 1e-12,
+                               'right')
+        reachable = np.flatnonzero(stop > start)
+        bound = self._bound(
+            _log_sum(first_log[reachable], second_log[start[reachable]]),
+            _log_sum(first_log[reachable], second_log[stop[reachable] - 1]))
+        # Ties in score go to the fewest teeth, so bound those too
+        fewest = first_teeth[reachable] + second_teeth.min()
+        order = np.lexsort((fewest, bound))
+        reachable, bound, fewest = (reachable[order], bound[order],
+                                    fewest[order])
+        counts = np.cumsum(stop[reachable] - start[reachable])
+        expanded = 0
+        position = 0
+        while position < len(reachable):
+            if len(best[0]) >= top and (bound[position], fewest[position]) >= (
+                    best[0][top - 1], best[1][top - 1]):
+                break
+            end = max(position + 1,
+                      np.searchsorted(counts, counts[position] + BATCH - 1,
+                                      'right'))
+            batch = reachable[position:end]
+            sizes = stop[batch] - start[batch]
+            first = np.repeat(batch, sizes)
+            second = np.repeat(start[batch] - np.cumsum(sizes) + sizes,
+                               sizes) + np.arange(sizes.sum())
+            score = self.score(
+                np.exp(_log_sum(first_log[first], second_log[second])))
+            teeth = first_teeth[first] + second_teeth[second]
+            kept = np.lexsort((teeth, score))[:top]
+            indexes = np.column_stack([
+                first_index[first[kept]], second_index[second[kept]]
+            ])
+            best = self._merge(best, score[kept], teeth[kept], indexes,
+                               stages, top)
+            expanded += len(first)
+            position = end
+        self._logger.debug('%s stages: expanded %s of %s designs',
+                           len(stages), expanded, counts[-1]
+                           if len(counts) else 0)
+        return best
+
+    def _merge(  # pylint: disable=too-many-arguments
+            self, best, score, teeth, indexes, stages, top):
+        # Keep the top designs, by score then the fewest teeth
+        gears = np.empty((len(indexes), len(stages), 2), dtype=int)
+        for number, stage in enumerate(stages):
+            gears[:, number, 0] = stage.driver[indexes[:, number]]
+            gears[:, number, 1] = stage.driven[indexes[:, number]]
+        scores = np.concatenate([best[0], score])
+        all_teeth = np.concatenate([best[1], teeth])
+        designs = best[2] + [
+            tuple(map(tuple, design)) for design in gears.tolist()
+        ]
+        keep = np.lexsort((all_teeth, scores))[:top]
+        return (scores[keep], all_teeth[keep],
+                [designs[index] for index in keep])
+
+    def search(self, top=10, stages=None):
+        """Find the best designs.
+
+        :param top: Number of designs to return
+        :type top: int
+        :param stages: Stage counts to consider, defaults to 1 up to the
+            catalog's length
+        :type stages: list
+        :returns: One row per design, best first, with the gears as taken by
+            `frc_rekt.gearbox.Gearbox`, number of stages, mechanical
+            advantage, total teeth and score
+        :rtype: pandas.DataFrame
+
+        """
+        if stages is None:
+            stages = range(1, len(self.stages) + 1)
+        best = (np.zeros(0), np.zeros(0, dtype=int), [])
+        for count in stages:
+            best = self._search(self.stages[:count], top, best)
+        scores, teeth, designs = best
+        return pd.DataFrame(
+            collections.OrderedDict([
+                ('gears', [list(design) for design in designs]),
+                ('stages', [len(design) for design in designs]),
+                ('mechanical_advantage', [
+                    np.prod([float(b) / a for a, b in design])
+                    for design in designs
+                ]),
+                ('total_teeth', teeth),
+                ('score', scores),
+            ]))
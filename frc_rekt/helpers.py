@@ -5,36 +5,51 @@
 Use these so we don't write duplicate code.
 
 """
-import datetime
-import magic
+import hashlib
 
-import matplotlib
-matplotlib.use('AGG')
-import matplotlib.pyplot as plt  # noqa pylint: disable=wrong-import-position
+from frc_rekt import manifest
+from frc_rekt.instrument import timed
 
 
+@timed()
 def get_file_encoding(file_path):
     """Return encoding for file path.
 
+    Looked up in the data manifest, see `frc_rekt.manifest`.
+
     :param file_path: Path to file
     :type file_path: str
     :returns: encoding
     :rtype: str
 
     """
-    magic_instance = magic.Magic(mime_encoding=True)
-    encoding = magic_instance.from_file(file_path)
-    return encoding
+    return manifest.lookup(file_path)['encoding']
+
+
+def file_digest(file_paths):
+    """Return a sha256 hex digest of the contents of files.
+
+    :param file_paths: Paths to the files, in a stable order
+    :type file_paths: list
+    :returns: hex digest
+    :rtype: str
+
+    """
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        with open(file_path, 'rb') as data_file:
+            digest.update(data_file.read())
+    return digest.hexdigest()
 
 
-def plot_func(dataframe, func, x_label=None, y_label=None,
-              title=None):  # pragma: no cover
+def plot_func(dataframe, func, x_label=None, y_label=None, title=None):
     """Plot best fit function.
 
     Generates points using the function, and plots those points
-    against the original data.
+    against the original data. Renders in this process, use
+    `frc_rekt.diagnostics.report` to render many plots in the background.
 
-    :param dataframe: the dataframe of original data
+    :param dataframe: the dataframe of original data, left unchanged
     :type dataframe: pandas.DataFrame
     :param func: the function to plot
     :type func: types.FunctionType
@@ -42,18 +57,14 @@ def plot_func(dataframe, func, x_label=None, y_label=None,
     :type x_label: str
     :param y_label: the label of the y axis data in the dataframe
     :type y_label: str
+    :param title: what was fitted, e.g. the motor type
+    :type title: str
+    :returns: the paths written
+    :rtype: list
 
     """
-    if not x_label:
-        x_label = dataframe.columns[0]
-    if not y_label:
-        y_label = dataframe.columns[1]
-    dataframe['fit'] = func(dataframe[x_label])
-    plot_df = dataframe.loc[:, [x_label, y_label, 'fit']]
-    plot_df.plot(x=x_label)
-    if title:
-        title = '{cls}_{x_label}_vs_{y_label}_fit'.format(
-            cls=title, x_label=x_label, y_label=y_label)
-    if not title:
-        title = datetime.datetime.now().isoformat()
-    plt.savefig('artifacts/{0}.png'.format(title))
+    # diagnostics reaches the models through its executor, which use helpers
+    from frc_rekt import diagnostics
+
+    job = diagnostics.plot_job(dataframe, func, x_label, y_label, title)
+    return diagnostics.render(job)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Instrumentation.
+
+Opt-in timing spans around the expensive stages of building models (csv
+parsing, encoding lookups, fitting, plotting). Spans are only timed while a
+collector is registered, otherwise they cost one list check. A
+SpanCollector gathers them, and exports them as JSON or as folded stacks
+for flame graph tools (e.g. flamegraph.pl or speedscope).
+
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import threading
+import time
+
+Span = collections.namedtuple(
+    'Span', ['name', 'stack', 'start', 'duration', 'self_time', 'thread'])
+
+# Callbacks given every finished Span, see add_collector
+_COLLECTORS = []
+
+# Open spans of each thread, as [name, start, time in child spans]
+_LOCAL = threading.local()
+
+
+def add_collector(collector):
+    """Start passing every finished span to collector.
+
+    :param collector: Called with each `frc_rekt.instrument.Span`, from the
+        thread that ran the span
+    :type collector: types.FunctionType
+
+    """
+    _COLLECTORS.append(collector)
+
+
+def remove_collector(collector):
+    """Stop passing spans to collector."""
+    _COLLECTORS.remove(collector)
+
+
+@contextlib.contextmanager
+def _span(name):
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    frame = [name, time.perf_counter(), 0.0]
+    stack.append(frame)
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - frame[1]
+        path = tuple(open_frame[0] for open_frame in stack)
+        stack.pop()
+        if stack:
+            stack[-1][2] += duration
+        finished = Span(name, path, frame[1], duration, duration - frame[2],
+                        threading.get_ident())
+        for collector in list(_COLLECTORS):
+            collector(finished)
+
+
+def span(name):
+    """Time a block of code, while any collector is registered.
+
+    :param name: The stage being timed
+    :type name: str
+    :returns: a context manager
+
+    """
+    if not _COLLECTORS:
+        return contextlib.suppress()
+    return _span(name)
+
+
+def timed(name=None):
+    """Time every call of the decorated function as a span.
+
+    :param name: The span name, defaults to the function's qualified name
+    :type name: str
+
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _COLLECTORS:
+                return func(*args, **kwargs)
+            with _span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class SpanCollector(object):
+    """Gathers spans while registered, as a context manager or explicitly."""
+
+    def __init__(self):
+        """SpanCollector."""
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __call__(self, finished):
+        """Keep a finished span."""
+        with self._lock:
+            self.spans.append(finished)
+
+    def __enter__(self):
+        """Start collecting."""
+        add_collector(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop collecting."""
+        remove_collector(self)
+
+    def totals(self):
+        """Sum the calls and seconds spent per span name.
+
+        :returns: {name: (count, total seconds, self seconds)}
+        :rtype: dict
+
+        """
+        totals = {}
+        for finished in self.spans:
+            count, total, self_time = totals.get(finished.name, (0, 0.0, 0.0))
+            totals[finished.name] = (count + 1, total + finished.duration,
+                                     self_time + finished.self_time)
+        return totals
+
+    def to_json(self, path=None):
+        """Export the spans as JSON.
+
+        :param path: Write to this file, if given
+        :type path: str
+        :returns: the JSON
+        :rtype: str
+
+        """
+        text = json.dumps(
+            [finished._asdict() for finished in self.spans], indent=2)
+        if path:
+            with open(path, 'w') as json_file:
+                json_file.write(text)
+        return text
+
+    def folded(self, path=None):
+        """Export the spans as folded stacks, the input of flame graph tools.
+
+        One line per distinct stack, its frames joined by ; then the
+        microseconds spent in it but not in its children.
+
+        :param path: Write to this file, if given
+        :type path: str
+        :returns: the folded stacks
+        :rtype: str
+
+        """
+        stacks = collections.OrderedDict()
+        for finished in self.spans:
+            key = ';'.join(finished.stack)
+            stacks[key] = stacks.get(key, 0.0) + finished.self_time
+        text = ''.join('{0} {1}\n'.format(key, int(round(seconds * 1e6)))
+                       for key, seconds in stacks.items())
+        if path:
+            with open(path, 'w') as folded_file:
+                folded_file.write(text)
+        return text
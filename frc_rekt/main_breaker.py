@@ -6,13 +6,15 @@ Models a main breaker on an frc robot. Uses data from datasheet
 
 """
 
+import json
 import logging
+import os
+import tempfile
 import pandas as pd
 import numpy as np
 
-from scipy import optimize
-
-from frc_rekt.helpers import get_file_encoding, plot_func
+from frc_rekt.helpers import file_digest, get_file_encoding, plot_func
+from frc_rekt.instrument import span, timed
 
 # Pandas options
 pd.set_option('max_rows', 121)
@@ -22,10 +24,17 @@ pd.set_option('expand_frame_repr', False)
 # just a convenience, so we dont have to type np.poly.poly
 POLY = np.polynomial.polynomial
 
+# Bump when the fit functions change, old fit caches are then refit
+FIT_CACHE_VERSION = 1
+
 
 class MainBreaker(object):  # pylint: disable=too-many-instance-attributes
     """Model of a Mainbreaker."""
 
+    fit_cache_path = 'data/data_sheets/120-main-breaker-fit.json'
+    _datatypes = ['trip_time', 'temp_derate']
+    _boundaries = ['min', 'max']
+
     def __init__(self, ambient_temp=25):
         """MainBreaker.
 
@@ -38,18 +47,48 @@ class MainBreaker(object):  # pylint: disable=too-many-instance-attributes
         self.ambient_temp = ambient_temp
         self._temp_derate_min_frames = self._get_temp_derate_frames()
         self._trip_time_frames = self._get_trip_time_frames()
+        self._fit_params = {}
         self._generate_functions()
+        # Percent of rated current where each trip curve starts
+        self.trip_thresholds = {
+            boundary: float(frame[str(frame.columns[0])].min())
+            for boundary, frame in self._trip_time_frames.items()
+        }
         self._logger.debug('Main Breaker created at %s degrees C',
                            self.ambient_temp)
 
+    @property
+    def trip_time_frames(self):
+        """Trip time datasheet curves, keyed by boundary, min or max."""
+        return self._trip_time_frames
+
+    @property
+    def fit_params(self):
+        """Fitted parameters of each curve, keyed by datatype-boundary.
+
+        Power fits are a, b, c, d, e of a * ((b * (x + c))**d) + e, polynomial
+        fits are coefficients from lowest degree up.
+
+        """
+        return self._fit_params
+
+    @property
+    def temp_derate_frames(self):
+        """Temperature derating datasheet curves, keyed by boundary."""
+        return self._temp_derate_min_frames
+
     @staticmethod
-    def _get_file_name(datatype='temp_derate', boundary='min'):
+    def _get_file_path(datatype='temp_derate', boundary='min'):
         directory = 'data/data_sheets'
         filename = '120-main-breaker-{0}-{1}.csv'.format(datatype, boundary)
-        path = '{0}/{1}'.format(directory, filename)
+        return '{0}/{1}'.format(directory, filename)
+
+    def _get_file_name(self, datatype='temp_derate', boundary='min'):
+        path = self._get_file_path(datatype=datatype, boundary=boundary)
         encoding = get_file_encoding(path)
         return path, encoding
 
+    @timed()
     def _get_frame(self, datatype='temp_derate', boundary='min'):
         file_path, encoding = self._get_file_name(
             datatype=datatype, boundary=boundary)
@@ -59,7 +98,8 @@ class MainBreaker(object):  # pylint: disable=too-many-instance-attributes
             pd.read_csv(file_path, encoding=encoding, comment='#')
         )  # The cast to DataFrame is due to bug: https://github.com/PyCQA/pylint/issues/1161
 
-        self._logger.debug('Opened dataframe: %s', d_frame)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('Opened dataframe: %s', d_frame)
         return d_frame
 
     def _get_temp_derate_frames(self):
@@ -104,53 +144,121 @@ class MainBreaker(object):  # pylint: disable=too-many-instance-attributes
 
         return func
 
+    def _data_files(self):
+        return [
+            self._get_file_path(datatype=datatype, boundary=boundary)
+            for datatype in self._datatypes for boundary in self._boundaries
+        ]
+
+    @timed()
+    def _load_fit_cache(self, data_hash):
+        try:
+            with open(self.fit_cache_path) as cache_file:
+                fit_cache = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        if fit_cache.get('version') != FIT_CACHE_VERSION or fit_cache.get(
+                'hash') != data_hash:
+            self._logger.info('Ignoring stale fit cache %s',
+                              self.fit_cache_path)
+            return {}
+        return fit_cache['fits']
+
+    def _save_fit_cache(self, data_hash):
+        fit_cache = {
+            'version': FIT_CACHE_VERSION,
+            'hash': data_hash,
+            'fits': self._fit_params
+        }
+        # Written whole then moved into place, so concurrent breakers (e.g.
+        # in process workers) never read a half written cache
+        folder = os.path.dirname(os.path.abspath(self.fit_cache_path))
+        try:
+            with tempfile.NamedTemporaryFile(
+                    'w', dir=folder, suffix='.tmp', delete=False) as cache_file:
+                json.dump(fit_cache, cache_file, indent=2, sort_keys=True)
+            os.replace(cache_file.name, self.fit_cache_path)
+        except OSError:  # pragma: no cover
+            self._logger.warning('Could not write fit cache %s',
+                                 self.fit_cache_path)
+
+    @timed()
     def _generate_functions(self, plot=False):
+        data_hash = file_digest(self._data_files())
+        fits = self._load_fit_cache(data_hash)
         self.trip_time_min = self._generate_func(
             datatype='trip_time',
             boundary='min',
             plot=plot,
-            fit_func_factory=self._fit_func_factory)
+            fit_func_factory=self._fit_func_factory,
+            params=fits.get('trip_time-min'))
         self.trip_time_max = self._generate_func(
             datatype='trip_time',
             boundary='max',
             plot=plot,
-            fit_func_factory=self._fit_func_factory)
+            fit_func_factory=self._fit_func_factory,
+            params=fits.get('trip_time-max'))
         self.temp_derate_min = self._generate_func(
-            datatype='temp_derate', boundary='min', plot=plot)
+            datatype='temp_derate',
+            boundary='min',
+            plot=plot,
+            params=fits.get('temp_derate-min'))
         self.temp_derate_max = self._generate_func(
-            datatype='temp_derate', boundary='max', plot=plot)
+            datatype='temp_derate',
+            boundary='max',
+            plot=plot,
+            params=fits.get('temp_derate-max'))
+        if fits != self._fit_params:
+            self._save_fit_cache(data_hash)
 
     @staticmethod
+    @timed()
     def _generate_poly_fit(x, y, deg=3):
-        coefs = POLY.polyfit(x, y, deg)
-        func = POLY.Polynomial(coefs)
-        return func
+        return POLY.polyfit(x, y, deg)
 
     @staticmethod
+    @timed()
     def _generate_func_fit(func_factory, x, y):
-        popt, pcov = optimize.curve_fit(func_factory(), x, y)
-        logging.debug(popt)
-        logging.debug(pcov)
+        # scipy is slow to load, and only needed without a fit cache
+        from scipy import optimize
+        with span('scipy.optimize.curve_fit'):
+            popt, pcov = optimize.curve_fit(func_factory(), x, y)
+        logger = logging.getLogger(__name__)
+        logger.debug('popt: %s', popt)
+        logger.debug('pcov: %s', pcov)
         # Static shift to have the end condition be nice
         unshifted_func = func_factory(*popt)
         end_diff = y.iloc[-1] - unshifted_func(x.iloc[-1])
-        logging.debug("end diff: %s", end_diff)
-        popt_shifted = np.append(popt, end_diff)
-        return func_factory(*popt_shifted)
+        logger.debug('end diff: %s', end_diff)
+        return np.append(popt, end_diff)
 
+    @timed()
     def _generate_func(self,
                        datatype='trip_time',
                        boundary='min',
                        plot=False,
-                       fit_func_factory=None):
-        d_frame = self._get_frame(datatype=datatype, boundary=boundary)
-        logging.debug("d_frame to fit: %s", d_frame)
-        x = d_frame[str(d_frame.columns[0])]
-        y = d_frame[str(d_frame.columns[1])]
+                       fit_func_factory=None,
+                       params=None):
+        if datatype == 'trip_time':
+            d_frame = self._trip_time_frames[boundary]
+        else:
+            d_frame = self._temp_derate_min_frames[boundary]
+        if params is None:
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug('d_frame to fit: %s', d_frame)
+            x = d_frame[str(d_frame.columns[0])]
+            y = d_frame[str(d_frame.columns[1])]
+            if not fit_func_factory:
+                params = self._generate_poly_fit(x, y)
+            else:
+                params = self._generate_func_fit(fit_func_factory, x, y)
+        params = [float(param) for param in params]
+        self._fit_params['{0}-{1}'.format(datatype, boundary)] = params
+
         if not fit_func_factory:
-            fitted_func = self._generate_poly_fit(x, y)
+            fitted_func = POLY.Polynomial(params)
         else:
-            fitted_func = self._generate_func_fit(fit_func_factory, x, y)
+            fitted_func = fit_func_factory(*params)
 
         if plot:
             plot_func(d_frame, fitted_func, title='main_breaker')
@@ -166,3 +274,123 @@ class MainBreaker(object):  # pylint: disable=too-many-instance-attributes
         """Trip time derating, based on temperature."""
         temp_c = (temp - 32) / 1.8
         return self.temp_derate_min(temp_c), self.temp_derate_max(temp_c)
+
+
+class TripAccumulator(object):  # pylint: disable=too-many-instance-attributes
+    """Cumulative thermal trip model of a MainBreaker.
+
+    Consumes a current trace sample by sample or in chunks. Each sample above
+    a trip curve heats the breaker by dt / trip time at that current, samples
+    below it let the breaker cool exponentially. The breaker trips when the
+    accumulated heat reaches 1. The conservative (min) and optimistic (max)
+    trip curves and temperature derates give a band of heats.
+
+    """
+
+    def __init__(self, breaker=None, dt=0.02, ambient_temp=None,
+                 cooling_time=60.0):
+        """TripAccumulator.
+
+        :param breaker: The breaker to model, defaults to MainBreaker()
+        :type breaker: `frc_rekt.main_breaker.MainBreaker`
+        :param dt: The time between current samples in seconds
+        :type dt: float
+        :param ambient_temp: Ambient temperature in degrees C, defaults to the
+            breaker's ambient_temp
+        :type ambient_temp: int float
+        :param cooling_time: Time constant of cooling below the trip curve,
+            in seconds
+        :type cooling_time: float
+
+        """
+        self._logger = logging.getLogger(__name__)
+        if not breaker:
+            breaker = MainBreaker()
+        if ambient_temp is None:
+            ambient_temp = breaker.ambient_temp
+        self.dt = float(dt)
+        self.cooling_time = float(cooling_time)
+        derate_min, derate_max = breaker.temperature_derate(
+            ambient_temp * 1.8 + 32)
+        # conservative first, then optimistic
+        self._bands = [
+            (breaker.trip_time_min, breaker.rated_current * derate_min,
+             breaker.trip_thresholds['min']),
+            (breaker.trip_time_max, breaker.rated_current * derate_max,
+             breaker.trip_thresholds['max']),
+        ]
+        # Keep exp() of the cumulative cooling in range within a block
+        self._block_size = max(1, int(300 * self.cooling_time / self.dt))
+        self.reset()
+
+    def reset(self):
+        """Start again with a cold breaker."""
+        self.elapsed = 0.0
+        self._heat = [0.0, 0.0]
+        self._peak_heat = [0.0, 0.0]
+        self._trip_times = [np.nan, np.nan]
+
+    def update(self, current):
+        """Consume the next current samples.
+
+        :param current: Current in amps, one sample every dt seconds
+        :type current: float numpy.ndarray
+        :returns: self, so calls can be chained
+        :rtype: `frc_rekt.main_breaker.TripAccumulator`
+
+        """
+        current = np.atleast_1d(np.asarray(current, dtype=float))
+        for start in range(0, len(current), self._block_size):
+            block = current[start:start + self._block_size]
+            for band in range(len(self._bands)):
+                self._update_band(band, block)
+            self.elapsed += len(block) * self.dt
+        return self
+
+    def _update_band(self, band, block):
+        trip_func, rated_current, threshold = self._bands[band]
+        percent = np.abs(block) / rated_current
+        heating = percent >= threshold
+        with np.errstate(invalid='ignore'):
+            # The fits dip below 0 far past the datasheet, call that instant
+            trip_time = np.maximum(
+                trip_func(np.where(heating, percent, threshold)), 1e-3)
+        dose = np.where(heating, self.dt / trip_time, 0.0)
+        # heat[k] = decay[k] * heat[k-1] + dose[k], solved with cumsums
+        cooling = np.cumsum(np.where(heating, 0.0, -self.dt /
+                                     self.cooling_time))
+        heat = np.exp(cooling) * (
+            self._heat[band] + np.cumsum(dose * np.exp(-cooling)))
+        if np.isnan(self._trip_times[band]):
+            tripped = np.flatnonzero(heat >= 1.0)
+            if len(tripped):
+                self._trip_times[band] = self.elapsed + (
+                    tripped[0] + 1) * self.dt
+                self._logger.debug('Trip at %s s', self._trip_times[band])
+        self._peak_heat[band] = max(self._peak_heat[band], heat.max())
+        self._heat[band] = heat[-1]
+
+    @property
+    def heat(self):
+        """Accumulated heat, conservative and optimistic, 1 is a trip."""
+        return tuple(self._heat)
+
+    @property
+    def time_to_trip(self):
+        """Earliest and latest trip time in seconds, nan if not tripped."""
+        return tuple(self._trip_times)
+
+    @property
+    def trip_probability(self):
+        """Chance the breaker has tripped so far.
+
+        The true trip curve is assumed to be anywhere between the
+        conservative and optimistic curves with equal likelihood.
+
+        """
+        high, low = self._peak_heat
+        if high < 1.0:
+            return 0.0
+        if low >= 1.0:
+            return 1.0
+        return (high - 1.0) / (high - low)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Data file manifests.
+
+Records the encoding, size, mtime, sha256 and columns of every csv under a
+data folder in a manifest.json, so loaders can look up a file's encoding
+instead of sniffing it with libmagic each time it is opened. Manifests are
+read once per process. Without a manifest on disk, entries are computed on
+first use and kept in memory.
+
+"""
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+
+from frc_rekt.instrument import timed
+
+MANIFEST_NAME = 'manifest.json'
+
+# Manifests are looked for up to this folder, files outside it only use
+# their own folder's
+DATA_ROOT = 'data'
+
+# Bump when the layout of the manifest changes, old manifests are then rebuilt
+MANIFEST_VERSION = 1
+
+# manifest folder: {relative path: entry}, filled in as manifests are used
+_MANIFESTS = {}
+
+
+def sniff_encoding(data):
+    """Guess the encoding of file contents, the way libmagic names them.
+
+    :param data: The file contents
+    :type data: bytes
+    :returns: encoding
+    :rtype: str
+
+    """
+    if data.startswith(b'\xff\xfe'):
+        return 'utf-16le'
+    if data.startswith(b'\xfe\xff'):
+        return 'utf-16be'
+    for encoding in ['us-ascii', 'utf-8']:
+        try:
+            data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    return 'iso-8859-1'
+
+
+def _detect_encoding(file_path, data):
+    try:
+        import magic
+    except ImportError:
+        return sniff_encoding(data)
+    return magic.Magic(mime_encoding=True).from_file(file_path)
+
+
+@timed()
+def file_entry(file_path):
+    """Describe a data file.
+
+    :param file_path: Path to the file
+    :type file_path: str
+    :returns: encoding, size in bytes, mtime, sha256 hex digest and csv
+        columns
+    :rtype: dict
+
+    """
+    mtime = os.path.getmtime(file_path)
+    with open(file_path, 'rb') as data_file:
+        data = data_file.read()
+    encoding = _detect_encoding(file_path, data)
+    columns = []
+    try:
+        text = data.decode(encoding)
+    except (LookupError, UnicodeDecodeError):
+        text = ''
+    for row in csv.reader(io.StringIO(text)):
+        if row and not row[0].startswith('#'):
+            columns = row
+            break
+    return {
+        'encoding': encoding,
+        'size': len(data),
+        'mtime': mtime,
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'columns': columns
+    }
+
+
+def build_manifest(folder):
+    """Write a manifest of every csv under folder.
+
+    :param folder: The data folder, e.g. data/vex
+    :type folder: str
+    :returns: The manifest entries, by path relative to folder
+    :rtype: dict
+
+    """
+    entries = {}
+    for root, _, file_names in os.walk(folder):
+        for file_name in sorted(file_names):
+            if file_name.endswith('.csv'):
+                file_path = os.path.join(root, file_name)
+                relative = os.path.relpath(file_path, folder)
+                entries[relative.replace(os.sep, '/')] = file_entry(file_path)
+    manifest = {'version': MANIFEST_VERSION, 'files': entries}
+    with open(os.path.join(folder, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    _MANIFESTS[os.path.abspath(folder)] = entries
+    logging.getLogger(__name__).info('Wrote manifest of %s files in %s',
+                                     len(entries), folder)
+    return entries
+
+
+def _find_manifest(file_path):
+    # The nearest folder above file_path with a manifest, not looking above
+    # DATA_ROOT, else its own folder
+    folder = os.path.dirname(os.path.abspath(file_path))
+    root = os.path.abspath(DATA_ROOT)
+    if os.path.commonpath([folder, root]) != root:
+        return folder
+    candidate = folder
+    while True:
+        if candidate in _MANIFESTS or os.path.isfile(
+                os.path.join(candidate, MANIFEST_NAME)):
+            return candidate
+        if candidate == root:
+            return folder
+        candidate = os.path.dirname(candidate)
+
+
+def _is_current(entry, file_path):
+    # Same size and mtime, or failing the mtime (e.g. a fresh checkout of a
+    # committed manifest), the same contents
+    if not entry or entry['size'] != os.path.getsize(file_path):
+        return False
+    mtime = os.path.getmtime(file_path)
+    if entry.get('mtime') == mtime:
+        return True
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as data_file:
+        for chunk in iter(lambda: data_file.read(64 * 1024), b''):
+            digest.update(chunk)
+    if digest.hexdigest() != entry['sha256']:
+        return False
+    entry['mtime'] = mtime
+    return True
+
+
+def _load_manifest(folder):
+    if folder not in _MANIFESTS:
+        _MANIFESTS[folder] = {}
+        try:
+            with open(os.path.join(folder, MANIFEST_NAME)) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return _MANIFESTS[folder]
+        if manifest.get('version') == MANIFEST_VERSION:
+            _MANIFESTS[folder] = manifest['files']
+    return _MANIFESTS[folder]
+
+
+def lookup(file_path):
+    """Manifest entry of a data file.
+
+    Entries missing from the manifest, or whose file has changed, are
+    recomputed and kept for the rest of the process. A file is taken as
+    unchanged if its size and mtime match, else if its sha256 does.
+
+    :param file_path: Path to the file
+    :type file_path: str
+    :returns: encoding, size in bytes, mtime, sha256 hex digest and csv
+        columns
+    :rtype: dict
+
+    """
+    folder = _find_manifest(file_path)
+    entries = _load_manifest(folder)
+    relative = os.path.relpath(
+        os.path.abspath(file_path), folder).replace(os.sep, '/')
+    entry = entries.get(relative)
+    if not _is_current(entry, file_path):
+        logging.getLogger(__name__).debug('Describing %s', file_path)
+        entry = entries[relative] = file_entry(file_path)
+    return entry
+
+
+def clear():
+    """Forget every manifest read so far."""
+    _MANIFESTS.clear()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    logging.basicConfig(level=logging.INFO)
+    for data_folder in ['data/vex', 'data/data_sheets']:
+        build_manifest(data_folder)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Time optimal motion profiles.
+
+The fastest way to drive a distance in a straight line, found without
+simulating. The drivetrain's largest acceleration and deceleration are
+tabulated against velocity once, from the motor fits with pwm held to the
+brownout safe envelope and force held to the wheels' traction. A profile is
+then a backward pass over a distance grid, from the end velocity, followed
+by a forward pass from the start velocity that never exceeds it. Both passes
+step every profile of a batch at once, so each profile costs O(n) in the
+grid size.
+
+"""
+
+import collections
+import logging
+import pandas as pd
+import numpy as np
+
+from frc_rekt.battery import Battery
+from frc_rekt.envelope import BROWNOUT_VOLTAGE, PwmEnvelope
+from frc_rekt.simulation import DrivetrainSimulation
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+MotionProfile = collections.namedtuple(
+    'MotionProfile', ['position', 'velocity', 'acceleration', 'time'])
+
+
+def _pass(limit_velocity, limit, step, start, ceiling):
+    # Largest velocity at each grid point reachable from start, accelerating
+    # at most limit(velocity) and never above ceiling
+    velocity = np.empty_like(ceiling)
+    velocity[0] = np.minimum(start, ceiling[0])
+    for i in range(1, len(ceiling)):
+        previous = velocity[i - 1]
+        reach = previous * previous + 2.0 * step * np.interp(
+            previous, limit_velocity, limit)
+        velocity[i] = np.minimum(np.sqrt(reach), ceiling[i])
+    return velocity
+
+
+class MotionProfiler(object):  # pylint: disable=too-few-public-methods
+    """Generates time optimal straight line profiles for a drivetrain."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            drivetrain=None,
+            battery=None,
+            mass=154,
+            min_voltage=BROWNOUT_VOLTAGE,
+            points=256):
+        """MotionProfiler.
+
+        :param drivetrain: The drivetrain being profiled
+        :type drivetrain: `frc_rekt.drivetrain.Drivetrain`
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param mass: The robot mass in lbs
+        :type mass: int float
+        :param min_voltage: The lowest battery voltage allowed
+        :type min_voltage: float
+        :param points: Number of velocities the limits are tabulated at
+        :type points: int
+
+        """
+        self._logger = logging.getLogger(__name__)
+        if not battery:
+            battery = Battery()
+        simulation = DrivetrainSimulation(drivetrain, battery, mass)
+        self.drivetrain = simulation.drivetrain
+        self.plant = simulation.plant
+        self.envelope = PwmEnvelope(self.drivetrain.gearbox, battery,
+                                    min_voltage)
+        # Velocities in m/s, up to free speed at the unloaded voltage
+        self.velocity = np.linspace(
+            0.0, self.envelope.motor_speed[-1] / self.plant.speed_ratio,
+            points)
+        motor_speed = self.velocity * self.plant.speed_ratio
+        bus_voltage = battery.voltage(0.0)
+        forward = self.envelope.solve(motor_speed=motor_speed)
+        reverse = self.envelope.solve(motor_speed=-motor_speed)
+        # Largest acceleration and deceleration in m/s^2, both 0 or more
+        self.max_acceleration = np.maximum(
+            self.plant.step(self.velocity, forward, bus_voltage, 8)[0], 0.0)
+        self.max_deceleration = np.maximum(
+            -self.plant.step(self.velocity, -reverse, bus_voltage, 8)[0],
+            0.0)
+        self._logger.debug('Profiling up to %s m/s', self.velocity[-1])
+
+    def generate(  # pylint: disable=too-many-arguments
+            self,
+            distance,
+            steps=200,
+            start_velocity=0.0,
+            end_velocity=0.0,
+            max_velocity=None):
+        """Generate the fastest profiles over distances.
+
+        :param distance: Distances to drive in m, one profile each
+        :type distance: float numpy.ndarray
+        :param steps: Number of steps in each profile's distance grid
+        :type steps: int
+        :param start_velocity: Velocity at the start in m/s
+        :type start_velocity: float numpy.ndarray
+        :param end_velocity: Largest velocity at the end in m/s, None to end
+            at whatever velocity is reached
+        :type end_velocity: float numpy.ndarray
+        :param max_velocity: A velocity cap in m/s, e.g. for a path's curves
+        :type max_velocity: float numpy.ndarray
+        :returns: position, velocity and time at each of steps + 1 grid
+            points, and the acceleration over each step. Arrays have a
+            trailing axis of profiles if distance is an array.
+        :rtype: `frc_rekt.motion.MotionProfile`
+
+        """
+        distance = np.asarray(distance, dtype=float)
+        step = distance / steps
+        position = np.linspace(0.0, 1.0, steps + 1).reshape(
+            (steps + 1, ) + (1, ) * distance.ndim) * distance
+        ceiling = np.full_like(position, self.velocity[-1])
+        if max_velocity is not None:
+            ceiling = np.minimum(ceiling, max_velocity)
+        if end_velocity is not None:
+            ceiling = _pass(self.velocity, self.max_deceleration, step,
+                            np.broadcast_to(end_velocity, step.shape),
+                            ceiling[::-1])[::-1]
+        velocity = _pass(self.velocity, self.max_acceleration, step,
+                         np.broadcast_to(start_velocity, step.shape),
+                         ceiling)
+        # Each step is at constant acceleration
+        average = velocity[1:] + velocity[:-1]
+        duration = np.divide(
+            2.0 * step * np.ones_like(average),
+            average,
+            out=np.zeros_like(average),
+            where=average > 0)
+        acceleration = np.divide(
+            velocity[1:]**2 - velocity[:-1]**2,
+            2.0 * step * np.ones_like(average),
+            out=np.zeros_like(average),
+            where=step > 0)
+        time = np.concatenate(
+            [np.zeros_like(velocity[:1]),
+             np.cumsum(duration, axis=0)])
+        return MotionProfile(position, velocity, acceleration, time)
@@ -6,11 +6,18 @@ Models an frc motor. Uses data from motors.vex.com.
 
 """
 
+import collections
 import logging
+import zipfile
 import pandas as pd
 import numpy as np
 
+from frc_rekt.cache import CharacterizationCache, file_stamps
+from frc_rekt.catalog import MOTOR_CATALOG
 from frc_rekt.helpers import get_file_encoding, plot_func
+from frc_rekt.instrument import timed
+from frc_rekt.profile import is_fresh, load_profile, profile_path, save_profile
+from frc_rekt.tabulate import TabulatedFunction
 
 # Pandas options
 pd.set_option('max_rows', 121)
@@ -20,15 +27,239 @@ pd.set_option('expand_frame_repr', False)
 # just a convenience, so we dont have to type np.poly.poly
 POLY = np.polynomial.polynomial
 
+# Shared between Motor instances, so N motors of one type cost one load
+MOTOR_CACHE = CharacterizationCache(max_size=8)
+
+MotorCoefficients = collections.namedtuple('MotorCoefficients', [
+    'current_func', 'torque_func', 'voltage_scaled_current',
+    'voltage_scaled_torque'
+])
+
+OperatingPoints = collections.namedtuple('OperatingPoints', [
+    'current', 'torque', 'supplied_power', 'output_power', 'efficiency',
+    'power_dissipation'
+])
+
+
+def horner(coefs, x):
+    """Evaluate a polynomial with Horner's method.
+
+    Only uses arithmetic, so x can be a float or a numpy array, and each
+    coefficient can be a float or an array that broadcasts against x. Arrays
+    are updated in place, so large batches only allocate the result.
+
+    :param coefs: Polynomial coefficients, lowest order first
+    :type coefs: tuple
+    :param x: Where to evaluate the polynomial
+    :type x: float numpy.ndarray
+
+    """
+    if len(coefs) == 1:
+        return coefs[0] + 0.0 * x
+    result = coefs[-1] * x
+    result += coefs[-2]
+    for coef in coefs[-3::-1]:
+        result *= x
+        result += coef
+    return result
+
+
+def derivative(coefs):
+    """Coefficients of the derivative of a polynomial.
+
+    :param coefs: Polynomial coefficients, lowest order first
+    :type coefs: tuple
+    :rtype: tuple
+
+    """
+    return tuple(coef * power
+                 for power, coef in enumerate(coefs))[1:] or (0.0, )
+
+
+def stack_coefficients(coefficients):
+    """Stack the coefficients of several motors into arrays.
+
+    The result evaluates every motor at once with the vectorized functions,
+    index its arrays to pick a motor per operating point.
+
+    :param coefficients: MotorCoefficients of each motor
+    :type coefficients: list
+    :rtype: `frc_rekt.motor.MotorCoefficients`
+
+    """
+    return MotorCoefficients(*[
+        tuple(np.array(powers) for powers in zip(*funcs))
+        for funcs in zip(*coefficients)
+    ])
+
+
+def _scaled_speed(speed, voltage, curve_voltage):
+    # The 12v curve is stretched along the speed axis by voltage / 12, then
+    # scaled by the locked rotor fit. Arithmetic only, so floats stay floats.
+    return speed * curve_voltage / (voltage + (voltage == 0))
+
+
+def _voltage_scaled(func_coefs, scale_coefs, scaled_speed, voltage):
+    # The locked rotor fits have no constant term, so 0 volts gives 0
+    result = horner(scale_coefs, voltage)
+    result *= horner(func_coefs, scaled_speed)
+    return result
+
+
+def motor_current(coefficients, speed, voltage, curve_voltage=12.0):
+    """Return the current drawn by a motor, vectorized.
+
+    :param coefficients: The fitted motor coefficients
+    :type coefficients: `frc_rekt.motor.MotorCoefficients`
+    :param speed: Motor speed in revolutions / second
+    :type speed: float numpy.ndarray
+    :param voltage: Applied voltage, 0 or more
+    :type voltage: float numpy.ndarray
+    :param curve_voltage: The voltage the motor curve was taken at
+    :type curve_voltage: float
+    :returns: current in amps
+
+    """
+    return _voltage_scaled(coefficients.current_func,
+                           coefficients.voltage_scaled_current,
+                           _scaled_speed(speed, voltage, curve_voltage),
+                           voltage)
+
+
+def current_slopes(coefficients):
+    """Differentiate the current fits, as used by motor_current_slope.
+
+    :param coefficients: The fitted motor coefficients
+    :type coefficients: `frc_rekt.motor.MotorCoefficients`
+    :returns: derivative coefficients of current_func and
+        voltage_scaled_current
+    :rtype: tuple
+
+    """
+    return (derivative(coefficients.current_func),
+            derivative(coefficients.voltage_scaled_current))
+
+
+def motor_current_slope(coefficients,
+                        speed,
+                        voltage,
+                        curve_voltage=12.0,
+                        slopes=None):
+    """Return the current drawn by a motor, and its voltage derivative.
+
+    :param coefficients: The fitted motor coefficients
+    :type coefficients: `frc_rekt.motor.MotorCoefficients`
+    :param speed: Motor speed in revolutions / second
+    :type speed: float numpy.ndarray
+    :param voltage: Applied voltage, 0 or more
+    :type voltage: float numpy.ndarray
+    :param curve_voltage: The voltage the motor curve was taken at
+    :type curve_voltage: float
+    :param slopes: current_slopes(coefficients), pass them in when calling
+        this in a loop
+    :type slopes: tuple
+    :returns: current in amps, d current / d voltage in amps / volt
+    :rtype: tuple
+
+    """
+    if slopes is None:
+        slopes = current_slopes(coefficients)
+    scaled_speed = _scaled_speed(speed, voltage, curve_voltage)
+    scale = horner(coefficients.voltage_scaled_current, voltage)
+    curve = horner(coefficients.current_func, scaled_speed)
+    # d scaled_speed / d voltage = -scaled_speed / voltage
+    slope = (horner(slopes[1], voltage) * curve -
+             scale * horner(slopes[0], scaled_speed) * scaled_speed /
+             (voltage + (voltage == 0)))
+    return scale * curve, slope
+
+
+def motor_torque(coefficients, speed, voltage, curve_voltage=12.0):
+    """Torque produced by a motor, vectorized.
+
+    :param coefficients: The fitted motor coefficients
+    :type coefficients: `frc_rekt.motor.MotorCoefficients`
+    :param speed: Motor speed in revolutions / second
+    :type speed: float numpy.ndarray
+    :param voltage: Applied voltage, 0 or more
+    :type voltage: float numpy.ndarray
+    :param curve_voltage: The voltage the motor curve was taken at
+    :type curve_voltage: float
+    :returns: torque in N*m
+
+    """
+    return _voltage_scaled(coefficients.torque_func,
+                           coefficients.voltage_scaled_torque,
+                           _scaled_speed(speed, voltage, curve_voltage),
+                           voltage)
+
+
+@timed()
+def stall_points(stall_frames, window=(1, 10)):  # pylint: disable=too-many-locals
+    """Pick the peak power sample of each locked rotor test.
+
+    The motor heats up and sags as a locked rotor test runs, so only the
+    rows in window are searched. (1, 10) was picked after looking at the
+    775pro 12v locked rotor test data. Tests with no positive power in the
+    window fall back to their first row.
+
+    :param stall_frames: Locked rotor test data with time, current, voltage
+        and torque columns, keyed by test voltage
+    :type stall_frames: dict
+    :param window: First and last + 1 row to search in each test
+    :type window: tuple
+    :returns: test_voltage, time, current, voltage and torque of the picked
+        samples, by test voltage, after a row of 0's
+    :rtype: pandas.DataFrame
+
+    """
+    columns = ['time', 'current', 'voltage', 'torque']
+    start, stop = window
+    test_voltages = sorted(stall_frames)
+    # Stack the first stop rows of every test, padding short tests with nan
+    stacked = np.full((len(test_voltages), stop, len(columns)), np.nan)
+    for row, test_voltage in enumerate(test_voltages):
+        frame = stall_frames[test_voltage]
+        for column_index, column in enumerate(columns):
+            head = frame[column].values[:stop]
+            stacked[row, :len(head), column_index] = head
+    power = stacked[:, start:stop, 1] * stacked[:, start:stop, 2]
+    power[np.isnan(power)] = -np.inf
+    peak = power.argmax(axis=1)
+    peak_power = power[np.arange(len(peak)), peak]
+    index = np.where(peak_power > 0, peak + start, 0)
+    picked = stacked[np.arange(len(index)), index]
+    data = {'test_voltage': [0] + test_voltages}
+    for column, values in zip(columns, picked.T):
+        data[column] = np.concatenate([[0.0], values])
+    return pd.DataFrame(data, columns=['test_voltage'] + columns)
+
+
+class _CatalogNames(object):  # pylint: disable=too-few-public-methods
+    """The motor types in `frc_rekt.catalog.MOTOR_CATALOG`."""
+
+    def __get__(self, instance, owner):
+        return MOTOR_CATALOG.names
+
 
 class Motor(object):  # pylint: disable=too-many-instance-attributes,too-few-public-methods
     """Models a motor."""
 
-    motor_types = ['cim', 'mini-cim', '775pro', 'bag']
-    _stall_voltages = [2, 4, 6, 8, 10, 12]
-    _motor_curve_voltage = 12.0
+    motor_types = _CatalogNames()
+    stall_window = (1, 10)
+    _function_names = [
+        'current_func', 'torque_func', 'voltage_scaled_current',
+        'voltage_scaled_torque'
+    ]
 
-    def __init__(self, motor_type='cim', speed=0.0, voltage=0.0):
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 motor_type='cim',
+                 speed=0.0,
+                 voltage=0.0,
+                 tabulated=False,
+                 tolerance=1e-4,
+                 stall_window=None,
+                 catalog=None):
         """Motor.
 
         :param motor_type: The type of motor to model
@@ -37,47 +268,233 @@ class Motor(object):  # pylint: disable=too-many-instance-attributes,too-few-pub
         :type speed: float
         :param voltage: The voltage being supplied to the motor
         :type voltage: float
+        :param tabulated: Evaluate the voltage_scaled_current and
+            voltage_scaled_torque attributes from lookup tables from 0 to
+            twice the curve voltage when called with scalars, see
+            `frc_rekt.tabulate.TabulatedFunction`. current, torque and the
+            other evaluators work from the coefficients, and are unaffected
+        :type tabulated: bool
+        :param tolerance: Largest error of the lookup tables, as a fraction of
+            the largest value of each fit
+        :type tolerance: float
+        :param stall_window: Rows of the locked rotor tests to search for
+            peak power, see `frc_rekt.motor.stall_points`
+        :type stall_window: tuple
+        :param catalog: The catalog to look motor_type up in, defaults to
+            `frc_rekt.catalog.MOTOR_CATALOG`
+        :type catalog: `frc_rekt.catalog.MotorCatalog`
 
         """
         self._logger = logging.getLogger(__name__)
         self.motor_type = motor_type
+        if not catalog:
+            catalog = MOTOR_CATALOG
+        self._data_folder = catalog.data_folder
+        self.spec = catalog[motor_type]
+        self._stall_voltages = list(self.spec.stall_voltages)
+        self._motor_curve_voltage = self.spec.curve_voltage
+        if stall_window:
+            self.stall_window = tuple(stall_window)
         self.speed = speed
         self.voltage = voltage
+        self._characterization = MOTOR_CACHE.get(self._cache_key(),
+                                                 self._characterize)
+        for name in self._function_names:
+            setattr(self, name, self._characterization[name])
+        self.coefficients = MotorCoefficients(*[
+            tuple(float(coef) for coef in self._characterization[name].coef)
+            for name in self._function_names
+        ])
+        if tabulated:
+            for name in self._function_names[2:]:
+                setattr(self, name,
+                        TabulatedFunction(
+                            self._characterization[name],
+                            0.0,
+                            2.0 * self._motor_curve_voltage,
+                            kind='cubic',
+                            tolerance=tolerance,
+                            scalars_only=True))
+        self._logger.debug('%s Motor created', self.motor_type)
+
+    def current(self, speed, voltage):
+        """Return the current drawn at speed and applied voltage.
+
+        :param speed: Motor speed in revolutions / second
+        :type speed: float numpy.ndarray
+        :param voltage: Applied voltage, 0 or more
+        :type voltage: float numpy.ndarray
+        :returns: current in amps
+
+        """
+        return motor_current(self.coefficients, speed, voltage,
+                             self._motor_curve_voltage)
+
+    def torque(self, speed, voltage):
+        """Torque produced at speed and applied voltage.
+
+        :param speed: Motor speed in revolutions / second
+        :type speed: float numpy.ndarray
+        :param voltage: Applied voltage, 0 or more
+        :type voltage: float numpy.ndarray
+        :returns: torque in N*m
+
+        """
+        return motor_torque(self.coefficients, speed, voltage,
+                            self._motor_curve_voltage)
+
+    def evaluate(self, speed, voltage):
+        """Evaluate many operating points in one vectorized pass.
+
+        :param speed: Motor speeds in revolutions / second
+        :type speed: numpy.ndarray
+        :param voltage: Applied voltages, 0 or more
+        :type voltage: numpy.ndarray
+        :returns: current, torque, supplied_power, output_power, efficiency
+            and power_dissipation at each operating point
+        :rtype: `frc_rekt.motor.OperatingPoints`
+
+        """
+        speed = np.asarray(speed, dtype=float)
+        voltage = np.asarray(voltage, dtype=float)
+        scaled_speed = _scaled_speed(speed, voltage,
+                                     self._motor_curve_voltage)
+        current = _voltage_scaled(self.coefficients.current_func,
+                                  self.coefficients.voltage_scaled_current,
+                                  scaled_speed, voltage)
+        torque = _voltage_scaled(self.coefficients.torque_func,
+                                 self.coefficients.voltage_scaled_torque,
+                                 scaled_speed, voltage)
+        supplied_power = voltage * current
+        output_power = torque * speed
+        output_power *= 2.0 * np.pi
+        efficiency = np.divide(
+            output_power,
+            supplied_power,
+            out=np.zeros_like(output_power),
+            where=supplied_power != 0)
+        return OperatingPoints(current, torque, supplied_power, output_power,
+                               efficiency, supplied_power - output_power)
+
+    @timed()
+    def _characterize(self):
+        path = profile_path(self.motor_type, self._data_folder)
+        # Profiles are compiled with the default stall window
+        if self.stall_window == Motor.stall_window and is_fresh(
+                path, self._data_files()):
+            try:
+                characterization = load_profile(path)
+            except (OSError, ValueError, zipfile.BadZipFile) as error:
+                self._logger.warning('Ignoring unreadable profile %s: %s',
+                                     path, error)
+                characterization = None
+            if characterization:
+                self._logger.debug('Loaded profile %s', path)
+                return characterization
+        self._characterization = {}
         self.curve_frame = self._get_curve_frame()
         self.stall_frames = self._get_stall_frames()
         self._generate_functions()
-        self._logger.debug('%s Motor created', self.motor_type)
+        for name in self._function_names:
+            self._characterization[name] = getattr(self, name)
+        return self._characterization
 
-    def _get_file_name(self, voltage=None):
-        data_folder = 'data/vex'
-        curve_data_date = {
-            'cim': '20151104',
-            'mini-cim': '20151207',
-            '775pro': '20151208',
-            'bag': '20151207'
-        }
-        stall_data_date = {
-            'cim': '20151104',
-            'mini-cim': '20151209',
-            '775pro': '20151209',
-            'bag': '20151207'
+    def _frame(self, name):
+        # Profiles hand frames over as callables, build them on first use
+        frame = self._characterization[name]
+        if callable(frame):
+            frame = frame()
+            self._characterization[name] = frame
+        return frame
+
+    @property
+    def curve_frame(self):
+        """Motor curve data at 12 volts, in si units."""
+        return self._frame('curve_frame')
+
+    @curve_frame.setter
+    def curve_frame(self, curve_frame):
+        self._characterization['curve_frame'] = curve_frame
+
+    @property
+    def stall_frames(self):
+        """Locked rotor test data, keyed by test voltage."""
+        return self._frame('stall_frames')
+
+    @stall_frames.setter
+    def stall_frames(self, stall_frames):
+        self._characterization['stall_frames'] = stall_frames
+
+    @property
+    def stall_points(self):
+        """Peak power sample of each locked rotor test.
+
+        See `frc_rekt.motor.stall_points`, computed once per characterization.
+
+        """
+        if 'stall_points' not in self._characterization:
+            self._characterization['stall_points'] = stall_points(
+                self.stall_frames, self.stall_window)
+        return self._characterization['stall_points']
+
+    @timed()
+    def compile_profile(self):
+        """Save this motor's characterization as a compiled profile.
+
+        Later Motors of this type load the profile instead of parsing csv's
+        and refitting, until the csv's are modified.
+
+        :returns: path to the profile
+        :rtype: str
+
+        """
+        if self.stall_window != Motor.stall_window:
+            raise ValueError(
+                'Profiles are compiled with the default stall window {0}'.
+                format(Motor.stall_window))
+        path = profile_path(self.motor_type, self._data_folder)
+        characterization = {
+            'curve_frame': self.curve_frame,
+            'stall_frames': self.stall_frames
         }
-        date = curve_data_date[self.motor_type]
+        for name in self._function_names:
+            characterization[name] = getattr(self, name)
+        save_profile(path, characterization)
+        return path
+
+    def _data_files(self):
+        data_files = [self._get_file_path()]
+        for voltage in self._stall_voltages:
+            data_files.append(self._get_file_path(voltage=voltage))
+        return data_files
+
+    def _cache_key(self):
+        return (self.motor_type, self.stall_window,
+                file_stamps(self._data_files()))
+
+    def _get_file_path(self, voltage=None):
+        date = self.spec.curve_date
         data_type = 'motor-curve-data'
         if voltage:
             data_type = 'locked-rotor-data-{voltage}v'.format(voltage=voltage)
-            date = stall_data_date[self.motor_type]
+            date = self.spec.stall_date
 
         file_name = '{motor_type}-{data_type}-{date}.csv'.format(
             motor_type=self.motor_type, data_type=data_type, date=date)
         file_path = '{data_folder}/{motor_type}/{file_name}'.format(
-            data_folder=data_folder,
+            data_folder=self._data_folder,
             motor_type=self.motor_type,
             file_name=file_name)
+        return file_path
+
+    def _get_file_name(self, voltage=None):
+        file_path = self._get_file_path(voltage=voltage)
         encoding = get_file_encoding(file_path)
-        logging.debug('file_path: %s, encoding: %s', file_path, encoding)
+        self._logger.debug('file_path: %s, encoding: %s', file_path,
+                           encoding)
         return file_path, encoding
 
+    @timed()
     def _get_curve_frame(self):
         file_path, encoding = self._get_file_name()
 
@@ -85,7 +502,8 @@ class Motor(object):  # pylint: disable=too-many-instance-attributes,too-few-pub
         curve_frame = pd.DataFrame(
             pd.read_csv(file_path, encoding=encoding)
         )  # The cast to DataFrame is due to bug: https://github.com/PyCQA/pylint/issues/1161
-        self._logger.debug('Opened Curve: %s', curve_frame)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('Opened Curve: %s', curve_frame)
 
         # Rename columns
         curve_frame.rename(
@@ -104,9 +522,11 @@ class Motor(object):  # pylint: disable=too-many-instance-attributes,too-few-pub
             'speed'] / 60.0  # revolutions / second
         curve_frame['efficiency'] = curve_frame[
             'efficiency'] / 100.0  # percentage scaled to 1
-        self._logger.debug('Motor Curve: %s', curve_frame)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('Motor Curve: %s', curve_frame)
         return curve_frame
 
+    @timed()
     def _get_stall_frames(self):
         stall_frames = {}
         for voltage in self._stall_voltages:
@@ -124,18 +544,15 @@ class Motor(object):  # pylint: disable=too-many-instance-attributes,too-few-pub
                     'Current (A)': 'current',
                     'Volts': 'voltage',
                     'Voltage (V)': 'voltage',
-                    'Torque 2V (N · m)': 'torque',
-                    'Torque 4V (N · m)': 'torque',
-                    'Torque 6V (N · m)': 'torque',
-                    'Torque 8V (N · m)': 'torque',
-                    'Torque 10V (N · m)': 'torque',
-                    'Torque 12V (N · m)': 'torque'
+                    'Torque {0}V (N · m)'.format(voltage): 'torque'
                 },
                 inplace=True)
             stall_frames[voltage] = stall_frame
-        self._logger.debug('Stall frames: %s', stall_frames)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('Stall frames: %s', stall_frames)
         return stall_frames
 
+    @timed()
     def _generate_functions(self):
         self.current_func = self._generate_basic_function('current')
         self.torque_func = self._generate_basic_function('torque')
@@ -153,50 +570,37 @@ class Motor(object):  # pylint: disable=too-many-instance-attributes,too-few-pub
                       self.motor_type)
         return current_func
 
-    def _choose_stall_indexes(self):
-        time = [0]
-        current = [0]
-        voltage = [0]
-        torque = [0]
-        test_voltage = [0]
-
-        # Get the first 10 values, picked 10 after looking at
-        # 775pro 12v locked rotor test data
-        # Then, we get the max power in those first 10 data points
-        for test_v in self._stall_voltages:
-            head = self.stall_frames[test_v].iloc[1:10]
-            max_power_index = 0
-            max_power = 0
-            for index, row in head.iterrows():
-                power = row['current'] * row['voltage']
-                if power > max_power:
-                    max_power_index = index
-                    max_power = power
-            test_voltage.append(test_v)
-            time.append(
-                self.stall_frames[test_v].iloc[max_power_index]['time'])
-            current.append(
-                self.stall_frames[test_v].iloc[max_power_index]['current'])
-            voltage.append(
-                self.stall_frames[test_v].iloc[max_power_index]['voltage'])
-            torque.append(
-                self.stall_frames[test_v].iloc[max_power_index]['torque'])
-
-        stall_index = {
-            'test_voltage': test_voltage,
-            'time': time,
-            'current': current,
-            'voltage': voltage,
-            'torque': torque
-        }
-        return pd.DataFrame(stall_index)
+    def voltage_scaled_frame(self, y_label, predict=False):
+        """Stall points scaled to the curve voltage test.
 
-    def _gen_voltage_scaled_func(self, y_label, plot=False):
+        The data voltage_scaled_current and voltage_scaled_torque are fit to.
+
+        :param y_label: The column to scale, current or torque
+        :type y_label: str
+        :param predict: Add rows at 13 and 14 volts, past the tests, to see
+            where the fit goes
+        :type predict: bool
+        :returns: the stall points with the scaled column, and its label
+        :rtype: tuple
+
+        """
         percent_label = '{0}_percent'.format(y_label)
 
-        stall_df = self._choose_stall_indexes()
-        y_label_12v = stall_df[y_label].iloc[6]
-        stall_df[percent_label] = stall_df[y_label] / y_label_12v
+        stall_df = self.stall_points.copy()
+        # Scaled to the test at the curve voltage, else the highest test
+        reference = stall_df['test_voltage'] == self.spec.curve_voltage
+        if not reference.any():
+            reference = stall_df.index == stall_df.index[-1]
+        y_label_reference = stall_df.loc[reference, y_label].iloc[0]
+        stall_df[percent_label] = stall_df[y_label] / y_label_reference
+        if predict:
+            predict_df = [{'voltage': 13}, {'voltage': 14}]
+            stall_df = pd.concat(
+                [stall_df, pd.DataFrame(predict_df)], ignore_index=True)
+        return stall_df, percent_label
+
+    def _gen_voltage_scaled_func(self, y_label, plot=False):
+        stall_df, percent_label = self.voltage_scaled_frame(y_label)
         x = stall_df['voltage']
         y = stall_df[percent_label]
         coefs = POLY.polyfit(
@@ -205,8 +609,7 @@ class Motor(object):  # pylint: disable=too-many-instance-attributes,too-few-pub
                  3])  # Don't use the 0th term because we want to intercept 0,0
         vs_func = POLY.Polynomial(coefs)
         if plot:
-            predict_df = [{'voltage': 13}, {'voltage': 14}]
-            stall_df = stall_df.append(predict_df, ignore_index=True)
+            stall_df, _ = self.voltage_scaled_frame(y_label, predict=True)
             plot_func(stall_df, vs_func, 'voltage', percent_label,
                       self.motor_type)
         return vs_func
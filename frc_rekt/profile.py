@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Compiled motor profiles.
+
+Compiles the vex csv data for a motor into a single npz file holding the
+raw curve arrays and the fitted coefficients, so a cold process can build a
+Motor without parsing csv's or refitting.
+
+"""
+
+import functools
+import json
+import logging
+import os
+import tempfile
+import pandas as pd
+import numpy as np
+
+from frc_rekt.instrument import timed
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+# Bump when the layout of the profile changes, old profiles are then ignored
+PROFILE_VERSION = 1
+
+_FUNCTIONS = [
+    'current_func', 'torque_func', 'voltage_scaled_current',
+    'voltage_scaled_torque'
+]
+
+
+def profile_path(motor_type, data_folder='data/vex'):
+    """Path of the compiled profile for a motor type.
+
+    :param motor_type: The type of motor
+    :type motor_type: str
+    :param data_folder: The folder holding the per motor data folders
+    :type data_folder: str
+    :returns: path to the profile
+    :rtype: str
+
+    """
+    return '{data_folder}/{motor_type}/{motor_type}-profile.npz'.format(
+        data_folder=data_folder, motor_type=motor_type)
+
+
+def is_fresh(path, data_files):
+    """Whether a profile exists and is newer than all of its data files.
+
+    :param path: Path to the profile
+    :type path: str
+    :param data_files: Paths to the csv's the profile was compiled from
+    :type data_files: list
+    :rtype: bool
+
+    """
+    try:
+        profile_mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return all(os.stat(data_file).st_mtime_ns <= profile_mtime
+               for data_file in data_files)
+
+
+@timed()
+def save_profile(path, characterization):
+    """Write a motor characterization to a profile.
+
+    Everything numeric is packed into one float array, described by a json
+    layout, so loading a profile only parses two npz members.
+
+    :param path: Path to write the profile to
+    :type path: str
+    :param characterization: curve_frame, stall_frames and fitted functions
+    :type characterization: dict
+
+    """
+    curve_frame = characterization['curve_frame']
+    stall_frames = characterization['stall_frames']
+    stall_voltages = sorted(stall_frames)
+    stall_columns = [str(c) for c in stall_frames[stall_voltages[0]].columns]
+    blocks = [curve_frame.values.astype(float).ravel()]
+    stall_rows = []
+    for voltage in stall_voltages:
+        stall_array = stall_frames[voltage][stall_columns].values.astype(float)
+        stall_rows.append(len(stall_array))
+        blocks.append(stall_array.ravel())
+    for name in _FUNCTIONS:
+        blocks.append(characterization[name].coef)
+    layout = {
+        'version': PROFILE_VERSION,
+        'curve_columns': [str(c) for c in curve_frame.columns],
+        'curve_rows': len(curve_frame),
+        'stall_columns': stall_columns,
+        'stall_voltages': [int(v) for v in stall_voltages],
+        'stall_rows': stall_rows,
+        'coefficients': [len(characterization[n].coef) for n in _FUNCTIONS]
+    }
+    # Written whole then moved into place, so a crash or a concurrent Motor
+    # never sees a half written profile that is newer than the csv's. np.savez
+    # appends .npz to names that lack it, so hand it a file object
+    folder = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+            dir=folder, suffix='.tmp', delete=False) as profile_file:
+        np.savez(
+            profile_file,
+            layout=np.array(json.dumps(layout)),
+            data=np.concatenate(blocks))
+    os.replace(profile_file.name, path)
+    logging.getLogger(__name__).debug('Saved profile %s', path)
+
+
+@timed()
+def load_profile(path):
+    """Read a motor characterization from a profile.
+
+    The frames are returned as callables that build the DataFrame on first
+    use, most Motors never look at their raw data.
+
+    :param path: Path to the profile
+    :type path: str
+    :returns: curve_frame, stall_frames and fitted functions, or None if the
+        profile was written by a different profile version
+    :rtype: dict
+
+    """
+    with np.load(path) as profile:
+        layout = json.loads(str(profile['layout']))
+        if layout['version'] != PROFILE_VERSION:
+            logging.getLogger(__name__).info('Ignoring stale profile %s',
+                                             path)
+            return None
+        data = profile['data']
+
+    offset = 0
+    size = layout['curve_rows'] * len(layout['curve_columns'])
+    curve = data[offset:offset + size].reshape(layout['curve_rows'], -1)
+    offset += size
+    stalls = []
+    for rows in layout['stall_rows']:
+        size = rows * len(layout['stall_columns'])
+        stalls.append(data[offset:offset + size].reshape(rows, -1))
+        offset += size
+
+    characterization = {
+        'curve_frame':
+        functools.partial(
+            pd.DataFrame, curve, columns=layout['curve_columns']),
+        'stall_frames':
+        functools.partial(_stall_frames, layout['stall_voltages'], stalls,
+                          layout['stall_columns'])
+    }
+    for name, size in zip(_FUNCTIONS, layout['coefficients']):
+        characterization[name] = POLY.Polynomial(data[offset:offset + size])
+        offset += size
+    return characterization
+
+
+def _stall_frames(voltages, arrays, columns):
+    return {
+        voltage: pd.DataFrame(array, columns=columns)
+        for voltage, array in zip(voltages, arrays)
+    }
+
+
+def compile_profiles(motor_types=None):  # pragma: no cover
+    """Compile a profile for each motor type.
+
+    :param motor_types: The motor types to compile, defaults to all of them
+    :type motor_types: list
+
+    """
+    from frc_rekt.catalog import MOTOR_CATALOG
+
+    if not motor_types:
+        motor_types = MOTOR_CATALOG.names
+    for motor_type in motor_types:
+        MOTOR_CATALOG.motor(motor_type).compile_profile()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    logging.basicConfig(level=logging.INFO)
+    compile_profiles()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Match log replay.
+
+Runs recorded robot logs through the models, to compare what they predict
+against what happened. A log is a table of samples taken every dt seconds,
+with columns:
+
+    time: seconds
+    battery_voltage: volts at the battery
+    total_current: amps out of the battery, defaults to the sum of every
+        <channel>_current column
+    <channel>_current, <channel>_speed, <channel>_voltage: a motor's current
+        in amps, speed in revolutions / second and applied voltage
+
+Logs are read in fixed size windows, from CSV with pandas or from a folder
+of one .npy file per column, which is memory mapped so only the window being
+replayed is ever paged in. Model state (breaker heat, an ongoing brownout)
+is carried from one window to the next, so the results do not depend on the
+window size and memory stays bounded however long the log is.
+
+"""
+
+import collections
+import glob
+import logging
+import os
+import pandas as pd
+import numpy as np
+
+from frc_rekt.battery import Battery
+from frc_rekt.envelope import BROWNOUT_VOLTAGE
+from frc_rekt.main_breaker import TripAccumulator
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+# Samples per window when reading a log
+WINDOW = 65536
+
+ReplayEvent = collections.namedtuple('ReplayEvent',
+                                     ['kind', 'start', 'end', 'value'])
+
+ReplayWindow = collections.namedtuple('ReplayWindow', ['residuals', 'events'])
+
+
+def read_csv(path, window=WINDOW, columns=None):
+    """Read a CSV log in windows.
+
+    :param path: The log file
+    :type path: str
+    :param window: Samples per window
+    :type window: int
+    :param columns: Columns to read, defaults to all of them
+    :type columns: list
+    :returns: a generator of {column: numpy.ndarray} windows
+    :rtype: types.GeneratorType
+
+    """
+    for chunk in pd.read_csv(path, chunksize=window, usecols=columns):
+        yield collections.OrderedDict(
+            (str(name), chunk[name].values.astype(float))
+            for name in chunk.columns)
+
+
+def read_columns(path, window=WINDOW, columns=None):
+    """Read a columnar log in windows.
+
+    Each column is memory mapped, so a window is a view into the file.
+
+    :param path: The folder of <column>.npy files
+    :type path: str
+    :param window: Samples per window
+    :type window: int
+    :param columns: Columns to read, defaults to all of them
+    :type columns: list
+    :returns: a generator of {column: numpy.ndarray} windows
+    :rtype: types.GeneratorType
+
+    """
+    if columns is None:
+        columns = sorted(
+            os.path.splitext(os.path.basename(name))[0]
+            for name in glob.glob(os.path.join(path, '*.npy')))
+    arrays = collections.OrderedDict(
+        (name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r'))
+        for name in columns)
+    lengths = set(len(array) for array in arrays.values())
+    if len(lengths) > 1:
+        raise ValueError('Columns of {0} differ in length: {1}'.format(
+            path, sorted(lengths)))
+    length = lengths.pop() if lengths else 0
+    for start in range(0, length, window):
+        yield collections.OrderedDict(
+            (name, array[start:start + window])
+            for name, array in arrays.items())
+
+
+def read_log(path, window=WINDOW, columns=None):
+    """Read a CSV or columnar log in windows.
+
+    :param path: A CSV file, or a folder of <column>.npy files
+    :type path: str
+    :param window: Samples per window
+    :type window: int
+    :param columns: Columns to read, defaults to all of them
+    :type columns: list
+    :returns: a generator of {column: numpy.ndarray} windows
+    :rtype: types.GeneratorType
+
+    """
+    if os.path.isdir(path):
+        return read_columns(path, window, columns)
+    return read_csv(path, window, columns)
+
+
+def write_columns(windows, path):
+    """Write windows of a log as a columnar log.
+
+    Columns are appended to as each window arrives, so a CSV log can be
+    converted once without holding it in memory, then replayed memory
+    mapped.
+
+    :param windows: {column: numpy.ndarray} windows, e.g. from read_csv
+    :type windows: iterable
+    :param path: The folder to write <column>.npy files to, created if
+        missing
+    :type path: str
+    :returns: the number of samples written
+    :rtype: int
+
+    """
+    os.makedirs(path, exist_ok=True)
+    raw_files = collections.OrderedDict()
+    length = 0
+    try:
+        for window in windows:
+            for name, values in window.items():
+                if name not in raw_files:
+                    raw_files[name] = open(
+                        os.path.join(path, name + '.raw'), 'wb')
+                np.asarray(values, dtype='<f8').tofile(raw_files[name])
+            length += len(next(iter(window.values())))
+    finally:
+        for raw_file in raw_files.values():
+            raw_file.close()
+    # .npy headers need the length, so the raw columns are wrapped after
+    for name in raw_files:
+        raw_path = os.path.join(path, name + '.raw')
+        array = np.lib.format.open_memmap(
+            os.path.join(path, name + '.npy'),
+            mode='w+',
+            dtype='<f8',
+            shape=(length, ))
+        raw = np.memmap(raw_path, dtype='<f8', mode='r', shape=(length, ))
+        for start in range(0, length, WINDOW):
+            array[start:start + WINDOW] = raw[start:start + WINDOW]
+        array.flush()
+        del raw, array
+        os.remove(raw_path)
+    logging.getLogger(__name__).info('Wrote %s samples of %s columns to %s',
+                                     length, len(raw_files), path)
+    return length
+
+
+def _motor_current(motor, speed, voltage):
+    # The fits are for forward voltage, reverse is the mirror image
+    sign = np.sign(voltage)
+    return sign * motor.current(sign * speed, np.abs(voltage))
+
+
+class _Statistics(object):  # pylint: disable=too-few-public-methods
+    # Running count, sum, sum of squares and largest magnitude
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.max_abs = 0.0
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.count += values.size
+            self.total += float(values.sum())
+            self.squares += float(np.dot(values, values))
+            self.max_abs = max(self.max_abs, float(np.abs(values).max()))
+
+
+class LogReplay(object):  # pylint: disable=too-many-instance-attributes
+    """Replays logs through the battery, main breaker and motor models."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            battery=None,
+            breaker=None,
+            motors=None,
+            dt=0.02,
+            min_voltage=BROWNOUT_VOLTAGE,
+            ambient_temp=None):
+        """LogReplay.
+
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param breaker: The main breaker, defaults to MainBreaker()
+        :type breaker: `frc_rekt.main_breaker.MainBreaker`
+        :param motors: The motor on each logged channel, as {channel: motor}
+        :type motors: dict
+        :param dt: The time between samples in seconds
+        :type dt: float
+        :param min_voltage: Battery voltages below this are a brownout
+        :type min_voltage: float
+        :param ambient_temp: Ambient temperature in degrees C, defaults to the
+            breaker's ambient_temp
+        :type ambient_temp: int float
+
+        """
+        self._logger = logging.getLogger(__name__)
+        if not battery:
+            battery = Battery()
+        self.battery = battery
+        self.motors = collections.OrderedDict(sorted((motors or {}).items()))
+        self.min_voltage = float(min_voltage)
+        self.accumulator = TripAccumulator(breaker, dt, ambient_temp)
+        self.reset()
+
+    def reset(self):
+        """Start again at the beginning of a log."""
+        self.accumulator.reset()
+        self.samples = 0
+        self._start_time = None
+        self._brownout = None
+        self._tripped = [False, False]
+        self._statistics = collections.OrderedDict()
+
+    def _time(self, window, length):
+        if 'time' in window:
+            time = np.asarray(window['time'], dtype=float)
+        else:
+            time = (self.samples + np.arange(length)) * self.accumulator.dt
+        if self._start_time is None:
+            self._start_time = float(time[0]) if length else 0.0
+        return time
+
+    def _total_current(self, window):
+        if 'total_current' in window:
+            return np.asarray(window['total_current'], dtype=float)
+        currents = [
+            np.asarray(values, dtype=float)
+            for name, values in window.items() if name.endswith('_current')
+        ]
+        if not currents:
+            raise ValueError('Log has no total_current or <channel>_current '
+                             'columns')
+        return np.sum(currents, axis=0)
+
+    def _residuals(self, window, time, total_current):
+        residuals = collections.OrderedDict([('time', time)])
+        if 'battery_voltage' in window:
+            residuals['battery_voltage'] = np.asarray(
+                window['battery_voltage'],
+                dtype=float) - self.battery.voltage(total_current)
+        for channel, motor in self.motors.items():
+            columns = [
+                '{0}_{1}'.format(channel, name)
+                for name in ['current', 'speed', 'voltage']
+            ]
+            if all(column in window for column in columns):
+                current, speed, voltage = [
+                    np.asarray(window[column], dtype=float)
+                    for column in columns
+                ]
+                residuals[columns[0]] = current - _motor_current(
+                    motor, speed, voltage)
+        for name, values in list(residuals.items())[1:]:
+            self._statistics.setdefault(name, _Statistics()).update(values)
+        return pd.DataFrame(residuals)
+
+    def _trip_events(self, time, total_current):
+        events = []
+        elapsed = self.accumulator.elapsed
+        self.accumulator.update(total_current)
+        for band, kind in enumerate(['trip_conservative', 'trip_optimistic']):
+            trip_time = self.accumulator.time_to_trip[band]
+            if self._tripped[band] or np.isnan(trip_time):
+                continue
+            self._tripped[band] = True
+            index = min(
+                int(round((trip_time - elapsed) / self.accumulator.dt)) - 1,
+                len(time) - 1)
+            events.append(
+                ReplayEvent(kind, time[index], time[index],
+                            total_current[index]))
+        return events
+
+    def _brownout_events(self, time, voltage):
+        # Edges of the runs below min_voltage, carried across windows
+        events = []
+        low = voltage < self.min_voltage
+        edges = np.flatnonzero(np.diff(low.astype(np.int8)))
+        bounds = np.concatenate([[0], edges + 1, [len(voltage)]])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if not low[start]:
+                if self._brownout is not None:
+                    events.append(self._brownout._replace(end=time[start]))
+                    self._brownout = None
+                continue
+            lowest = float(voltage[start:stop].min())
+            if self._brownout is None:
+                self._brownout = ReplayEvent('brownout', time[start], None,
+                                             lowest)
+            elif lowest < self._brownout.value:
+                self._brownout = self._brownout._replace(value=lowest)
+        return events
+
+    def process(self, window):
+        """Replay the next window of a log.
+
+        :param window: {column: numpy.ndarray} of the next samples
+        :type window: dict
+        :returns: the residuals, measured less predicted, at each sample, and
+            the trips and brownouts that ended in the window
+        :rtype: `frc_rekt.replay.ReplayWindow`
+
+        """
+        total_current = self._total_current(window)
+        length = len(total_current)
+        time = self._time(window, length)
+        residuals = self._residuals(window, time, total_current)
+        events = self._trip_events(time, total_current)
+        if 'battery_voltage' in window:
+            voltage = np.asarray(window['battery_voltage'], dtype=float)
+        else:
+            voltage = self.battery.voltage(total_current)
+        events.extend(self._brownout_events(time, voltage))
+        self.samples += length
+        return ReplayWindow(residuals, events)
+
+    def finish(self):
+        """Events still open at the end of the log, i.e. a brownout.
+
+        :rtype: list
+
+        """
+        events = []
+        if self._brownout is not None:
+            end = self._start_time + self.samples * self.accumulator.dt
+            events.append(self._brownout._replace(end=end))
+            self._brownout = None
+        return events
+
+    def run(self, windows):
+        """Replay a whole log.
+
+        :param windows: {column: numpy.ndarray} windows, e.g. from read_log
+        :type windows: iterable
+        :returns: a generator of `frc_rekt.replay.ReplayWindow`, the last one
+            holding any events still open at the end
+        :rtype: types.GeneratorType
+
+        """
+        self.reset()
+        for window in windows:
+            yield self.process(window)
+        yield ReplayWindow(pd.DataFrame(columns=['time']), self.finish())
+        self._logger.debug('Replayed %s samples', self.samples)
+
+    @property
+    def summary(self):
+        """Count, mean, rms and largest magnitude of each residual so far.
+
+        :rtype: pandas.DataFrame
+
+        """
+        rows = collections.OrderedDict()
+        for name, statistics in self._statistics.items():
+            count = max(statistics.count, 1)
+            rows[name] = collections.OrderedDict([
+                ('count', statistics.count),
+                ('mean', statistics.total / count),
+                ('rms', np.sqrt(statistics.squares / count)),
+                ('max_abs', statistics.max_abs),
+            ])
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def replay(path, window=WINDOW, **kwargs):
+    """Replay a log file, keeping only the summary and the events.
+
+    :param path: A CSV file, or a folder of <column>.npy files
+    :type path: str
+    :param window: Samples per window
+    :type window: int
+    :param kwargs: Passed to `frc_rekt.replay.LogReplay`
+    :returns: the residual summary and every event
+    :rtype: tuple
+
+    """
+    log_replay = LogReplay(**kwargs)
+    events = []
+    for result in log_replay.run(read_log(path, window)):
+        events.extend(result.events)
+    return log_replay.summary, events
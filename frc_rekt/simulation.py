@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Drivetrain simulation.
+
+Steps a robot driving in a straight line through time, tracking velocity,
+motor speed, current draw and battery sag for a commanded pwm profile.
+
+"""
+
+import logging
+import pandas as pd
+import numpy as np
+
+from frc_rekt.battery import Battery
+from frc_rekt.drivetrain import Drivetrain
+from frc_rekt.motor import current_slopes, horner, motor_current_slope
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+# Standard gravity, m/s^2
+GRAVITY = 9.80665
+
+
+def clamp(value, limit):
+    """Clamp value to +/- limit.
+
+    Written with arithmetic, so value and limit can be floats or arrays.
+
+    :param value: The value to clamp
+    :type value: float numpy.ndarray
+    :param limit: The largest magnitude allowed, 0 or more
+    :type limit: float numpy.ndarray
+
+    """
+    return (abs(value + limit) - abs(value - limit)) / 2.0
+
+
+class DrivetrainPlant(object):  # pylint: disable=too-many-instance-attributes
+    """Straight line drivetrain dynamics.
+
+    Everything is in si units. Every parameter may be a float, or a numpy
+    array to step a batch of robots at once.
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            coefficients,
+            battery,
+            mass,
+            wheel_diameter,
+            mechanical_advantage,
+            efficiency=0.8,
+            motors_per_side=3,
+            cof=1.3,
+            curve_voltage=12.0):
+        """DrivetrainPlant.
+
+        :param coefficients: The fitted coefficients of the drive motor
+        :type coefficients: `frc_rekt.motor.MotorCoefficients`
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param mass: Robot mass in kg
+        :type mass: float numpy.ndarray
+        :param wheel_diameter: Wheel diameter in m
+        :type wheel_diameter: float numpy.ndarray
+        :param mechanical_advantage: Gearbox reduction
+        :type mechanical_advantage: float numpy.ndarray
+        :param efficiency: Gearbox efficiency
+        :type efficiency: float numpy.ndarray
+        :param motors_per_side: Motors in each side's gearbox
+        :type motors_per_side: int numpy.ndarray
+        :param cof: Wheel coefficient of friction
+        :type cof: float numpy.ndarray
+        :param curve_voltage: The voltage the motor curve was taken at
+        :type curve_voltage: float
+
+        """
+        self.coefficients = coefficients
+        self.battery = battery
+        self.mass = mass
+        self.curve_voltage = curve_voltage
+        # motor rev/s per robot m/s
+        self.speed_ratio = mechanical_advantage / (np.pi * wheel_diameter)
+        # robot force in N per N*m of motor torque, both sides
+        self.force_ratio = (2.0 * motors_per_side * mechanical_advantage *
+                            efficiency / (wheel_diameter / 2.0))
+        self.motor_count = 2 * motors_per_side
+        self.max_force = cof * mass * GRAVITY
+        self._slopes = current_slopes(coefficients)
+
+    def _bus_voltage(self, motor_speed, pwm, voltage, iterations):
+        # Newton's method on V = V0 - R * n * I(w, pwm * V), warm started
+        # from voltage. n * I is the battery current in either direction.
+        battery = self.battery
+        for _ in range(iterations):
+            current, slope = motor_current_slope(
+                self.coefficients, motor_speed, pwm * voltage,
+                self.curve_voltage, self._slopes)
+            residual = voltage - battery.voltage(self.motor_count * current)
+            voltage = voltage - residual / (
+                1.0 + battery.internal_resistance * self.motor_count * pwm *
+                slope)
+        return voltage
+
+    def step(self, velocity, pwm, bus_voltage, iterations=2):
+        """Evaluate the drivetrain at a velocity and commanded pwm.
+
+        :param velocity: Robot velocity in m/s
+        :type velocity: float numpy.ndarray
+        :param pwm: Commanded pwm, -1 to 1
+        :type pwm: float numpy.ndarray
+        :param bus_voltage: Battery voltage guess, e.g. the last step's
+        :type bus_voltage: float numpy.ndarray
+        :param iterations: Newton iterations for the battery voltage
+        :type iterations: int
+        :returns: acceleration, motor_speed, motor_voltage, motor_current,
+            total_current, bus_voltage
+        :rtype: tuple
+
+        """
+        # The motor fits are for forward voltage, reverse is the mirror image
+        direction = (pwm >= 0) * 2.0 - 1.0
+        magnitude = pwm * direction
+        motor_speed = velocity * self.speed_ratio
+        forward_speed = motor_speed * direction
+        bus_voltage = self._bus_voltage(forward_speed, magnitude, bus_voltage,
+                                        iterations)
+        motor_voltage = magnitude * bus_voltage
+        unpowered = motor_voltage == 0
+        scaled_speed = (forward_speed * self.curve_voltage /
+                        (motor_voltage + unpowered))
+        motor_current = (horner(self.coefficients.voltage_scaled_current,
+                                motor_voltage) *
+                         horner(self.coefficients.current_func, scaled_speed))
+        torque = (horner(self.coefficients.voltage_scaled_torque,
+                         motor_voltage) *
+                  horner(self.coefficients.torque_func, scaled_speed))
+        force = clamp(torque * direction * self.force_ratio, self.max_force)
+        return (force / self.mass, motor_speed, motor_voltage * direction,
+                motor_current * direction, motor_current * self.motor_count,
+                bus_voltage)
+
+
+class DrivetrainSimulation(object):  # pylint: disable=too-few-public-methods
+    """Time stepped simulation of a robot driving straight."""
+
+    columns = [
+        'time', 'pwm', 'velocity', 'position', 'acceleration', 'motor_speed',
+        'motor_voltage', 'motor_current', 'total_current', 'battery_voltage'
+    ]
+
+    def __init__(self, drivetrain=None, battery=None, mass=154):
+        """DrivetrainSimulation.
+
+        :param drivetrain: The drivetrain being simulated
+        :type drivetrain: `frc_rekt.drivetrain.Drivetrain`
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param mass: The robot mass in lbs
+        :type mass: int float
+
+        """
+        self._logger = logging.getLogger(__name__)
+        if not drivetrain:
+            drivetrain = Drivetrain()
+        self.drivetrain = drivetrain
+        if not battery:
+            battery = Battery()
+        self.battery = battery
+        # store mass in kg
+        self._mass = float(mass) * 0.453592
+        gearbox = drivetrain.gearbox
+        self.plant = DrivetrainPlant(
+            drivetrain.motor.coefficients,
+            battery,
+            self._mass,
+            drivetrain.wheel.diameter * 0.0254,
+            gearbox.mechanical_advantage,
+            efficiency=gearbox.efficiency,
+            motors_per_side=len(gearbox.motors),
+            cof=drivetrain.wheel.cof,
+            curve_voltage=drivetrain.motor.spec.curve_voltage)
+
+    @property
+    def mass(self):
+        """Robot mass in lbs."""
+        return self._mass / 0.453592
+
+    def run(self, pwm, dt=0.001, velocity=0.0):  # pylint: disable=too-many-locals
+        """Simulate a pwm profile.
+
+        :param pwm: Commanded pwm for each time step, -1 to 1
+        :type pwm: numpy.ndarray
+        :param dt: The length of a time step in seconds
+        :type dt: float
+        :param velocity: The starting velocity in m/s
+        :type velocity: float
+        :returns: One row per time step, in si units
+        :rtype: pandas.DataFrame
+
+        """
+        commands = np.asarray(pwm, dtype=float)
+        steps = len(commands)
+        record = {name: np.empty(steps) for name in self.columns}
+        record['time'] = np.arange(steps) * dt
+        record['pwm'] = commands
+        velocities = record['velocity']
+        positions = record['position']
+        accelerations = record['acceleration']
+        motor_speeds = record['motor_speed']
+        motor_voltages = record['motor_voltage']
+        motor_currents = record['motor_current']
+        total_currents = record['total_current']
+        battery_voltages = record['battery_voltage']
+
+        step = self.plant.step
+        velocity = float(velocity)
+        position = 0.0
+        bus_voltage = self.battery.voltage(0.0)
+        # floats are much faster than numpy scalars in a python loop
+        for k, command in enumerate(commands.tolist()):
+            (acceleration, motor_speed, motor_voltage, motor_current,
+             total_current, bus_voltage) = step(velocity, command, bus_voltage)
+            velocities[k] = velocity
+            positions[k] = position
+            accelerations[k] = acceleration
+            motor_speeds[k] = motor_speed
+            motor_voltages[k] = motor_voltage
+            motor_currents[k] = motor_current
+            total_currents[k] = total_current
+            battery_voltages[k] = bus_voltage
+            # semi-implicit euler
+            velocity += acceleration * dt
+            position += velocity * dt
+        self._logger.debug('Simulated %s steps', steps)
+        return pd.DataFrame(record, columns=self.columns)
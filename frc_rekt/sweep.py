@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Drivetrain parameter sweeps.
+
+Evaluates every combination of gearing, wheel size, motors per side, robot
+mass and motor type by stepping them through a straight line drive as one
+batch.
+
+"""
+
+import logging
+import math
+import pandas as pd
+import numpy as np
+
+from frc_rekt.battery import Battery
+from frc_rekt.executor import Executor, chunk_slices, worker_motor
+from frc_rekt.gearbox import gear_ratio
+from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.motor import MotorCoefficients, stack_coefficients
+from frc_rekt.simulation import DrivetrainPlant
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+PARAMETERS = ['gears', 'wheel_diameter', 'motors_per_side', 'mass',
+              'motor_type']
+RESULTS = [
+    'time_to_distance', 'peak_current', 'min_battery_voltage',
+    'breaker_trip_margin'
+]
+
+
+def drive_to_distance(  # pylint: disable=too-many-locals
+        plant, distance, pwm=1.0, dt=0.005, max_time=10.0):
+    """Drive a batch of robots until they have all covered a distance.
+
+    :param plant: The drivetrains, with array parameters
+    :type plant: `frc_rekt.simulation.DrivetrainPlant`
+    :param distance: The distance to drive in m
+    :type distance: float
+    :param pwm: The commanded pwm
+    :type pwm: float
+    :param dt: The length of a time step in seconds
+    :type dt: float
+    :param max_time: Give up on robots that take longer than this
+    :type max_time: float
+    :returns: time_to_distance (nan if not reached), peak_current and
+        min_battery_voltage for each robot, over the drive
+    :rtype: tuple
+
+    """
+    size = np.size(plant.speed_ratio * plant.force_ratio * plant.mass)
+    velocity = np.zeros(size)
+    position = np.zeros(size)
+    bus_voltage = np.full(size, plant.battery.voltage(0.0))
+    time_to_distance = np.full(size, np.nan)
+    peak_current = np.zeros(size)
+    min_voltage = bus_voltage.copy()
+    active = np.ones(size, dtype=bool)
+    for k in range(int(math.ceil(max_time / dt))):
+        acceleration, _, _, _, total_current, bus_voltage = plant.step(
+            velocity, pwm, bus_voltage)
+        np.maximum(peak_current, total_current * active, out=peak_current)
+        np.minimum(
+            min_voltage,
+            np.where(active, bus_voltage, np.inf),
+            out=min_voltage)
+        velocity += acceleration * dt
+        next_position = position + velocity * dt
+        crossed = active & (next_position >= distance)
+        if crossed.any():
+            time_to_distance[crossed] = dt * (
+                k + (distance - position[crossed]) /
+                (next_position[crossed] - position[crossed]))
+            active &= ~crossed
+            if not active.any():
+                break
+        position = next_position
+    return time_to_distance, peak_current, min_voltage
+
+
+def _select(coefficients, index):
+    return MotorCoefficients(
+        *[tuple(power[index] for power in func) for func in coefficients])
+
+
+def _sweep_chunk(task):
+    (motor_types, advantage, diameter, count, mass, motor_index, battery,
+     distance, dt, max_time) = task
+    motors = [worker_motor(motor_type) for motor_type in motor_types]
+    stacked = stack_coefficients([motor.coefficients for motor in motors])
+    plant = DrivetrainPlant(
+        _select(stacked, motor_index),
+        battery,
+        mass,
+        diameter,
+        advantage,
+        motors_per_side=count,
+        curve_voltage=motors[0].spec.curve_voltage)
+    return drive_to_distance(plant, distance, dt=dt, max_time=max_time)
+
+
+def sweep(  # pylint: disable=too-many-arguments,too-many-locals
+        gears=None,
+        wheel_diameters=(4.0, ),
+        motors_per_side=(3, ),
+        masses=(154, ),
+        motor_types=('cim', ),
+        distance=20.0,
+        dt=0.005,
+        max_time=10.0,
+        battery=None,
+        breaker=None,
+        chunk_size=20000,
+        backend='serial',
+        workers=None):
+    """Evaluate every combination of drivetrain parameters.
+
+    Each combination drives distance at full throttle. One motor
+    characterization is shared per motor type, and combinations are stepped
+    chunk_size at a time as numpy arrays.
+
+    :param gears: Gear lists, as taken by `frc_rekt.gearbox.Gearbox`
+    :type gears: list
+    :param wheel_diameters: Wheel diameters in inches
+    :type wheel_diameters: list
+    :param motors_per_side: Motors per side
+    :type motors_per_side: list
+    :param masses: Robot masses in lbs
+    :type masses: list
+    :param motor_types: Motor types
+    :type motor_types: list
+    :param distance: Distance to drive in feet
+    :type distance: int float
+    :param dt: The length of a time step in seconds
+    :type dt: float
+    :param max_time: Give up on combinations that take longer than this
+    :type max_time: float
+    :param battery: The battery, defaults to `frc_rekt.battery.Battery`
+    :type battery: `frc_rekt.battery.Battery`
+    :param breaker: The main breaker, defaults to
+        `frc_rekt.main_breaker.MainBreaker`
+    :type breaker: `frc_rekt.main_breaker.MainBreaker`
+    :param chunk_size: Combinations stepped at once
+    :type chunk_size: int
+    :param backend: How to run the chunks, see `frc_rekt.executor.Executor`
+    :type backend: str
+    :param workers: Number of workers for the thread and process backends
+    :type workers: int
+    :returns: One row per combination, with the parameters, time_to_distance
+        in seconds, peak_current in amps, min_battery_voltage and
+        breaker_trip_margin, the seconds between reaching distance and the
+        conservative trip time at peak current
+    :rtype: pandas.DataFrame
+
+    """
+    logger = logging.getLogger(__name__)
+    if not gears:
+        gears = [[(14, 50), (16, 48)]]
+    if not battery:
+        battery = Battery()
+    if not breaker:
+        breaker = MainBreaker()
+    advantages = np.array([gear_ratio(gear_list) for gear_list in gears])
+    values = [
+        advantages,
+        np.asarray(wheel_diameters, dtype=float) * 0.0254,
+        np.asarray(motors_per_side, dtype=float),
+        np.asarray(masses, dtype=float) * 0.453592
+    ]
+    shape = [len(v) for v in values] + [len(motor_types)]
+    indexes = [index.ravel() for index in np.indices(shape)]
+    total = len(indexes[0])
+    logger.debug('Sweeping %s combinations', total)
+
+    tasks = [
+        (tuple(motor_types), ) + tuple(
+            value[index[chunk]] for value, index in zip(values, indexes)) +
+        (indexes[4][chunk], battery, distance * 0.3048, dt, max_time)
+        for chunk in chunk_slices(total, chunk_size)
+    ]
+    executor = Executor(
+        backend=backend, workers=workers, motor_types=motor_types)
+    chunk_results = executor.map(_sweep_chunk, tasks)
+    results = [
+        np.concatenate([chunk_result[i] for chunk_result in chunk_results])
+        for i in range(3)
+    ]
+
+    time_to_distance, peak_current, min_voltage = results
+    with np.errstate(invalid='ignore'):
+        trip_time = breaker.trip_time(peak_current)[0]
+    # Below the trip curve the breaker never trips
+    trip_time = np.where(np.isnan(trip_time), np.inf, trip_time)
+
+    return pd.DataFrame(
+        {
+            'gears':
+            pd.Categorical.from_codes(indexes[0],
+                                      [str(gear_list) for gear_list in gears]),
+            'mechanical_advantage':
+            advantages[indexes[0]],
+            'wheel_diameter':
+            np.asarray(wheel_diameters, dtype=float)[indexes[1]],
+            'motors_per_side':
+            np.asarray(motors_per_side)[indexes[2]],
+            'mass':
+            np.asarray(masses, dtype=float)[indexes[3]],
+            'motor_type':
+            pd.Categorical.from_codes(indexes[4], list(motor_types)),
+            'time_to_distance':
+            time_to_distance,
+            'peak_current':
+            peak_current,
+            'min_battery_voltage':
+            min_voltage,
+            'breaker_trip_margin':
+            trip_time - time_to_distance
+        },
+        columns=PARAMETERS[:1] + ['mechanical_advantage'] + PARAMETERS[1:] +
+        RESULTS)
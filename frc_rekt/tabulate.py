@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Tabulated functions.
+
+Samples a fitted function onto a dense, evenly spaced grid once, then
+evaluates it by interpolating the grid. Much cheaper per call than a numpy
+Polynomial on scalars, numpy arrays can be left to the function itself.
+
+"""
+
+import logging
+import numpy as np
+
+KINDS = ['linear', 'cubic']
+
+
+class TabulatedFunction(object):  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """A fitted function, evaluated from a lookup table."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            func,
+            lower,
+            upper,
+            points=256,
+            kind='linear',
+            tolerance=1e-4,
+            max_points=2**20,
+            scalars_only=False):
+        """TabulatedFunction.
+
+        The table is doubled in size until the interpolation is within
+        tolerance of func between every pair of grid points.
+
+        :param func: The function to tabulate, must accept numpy arrays
+        :type func: types.FunctionType
+        :param lower: The lowest x in the table
+        :type lower: float
+        :param upper: The highest x in the table, outside of lower to upper
+            func is called directly
+        :type upper: float
+        :param points: The starting number of grid points
+        :type points: int
+        :param kind: linear or cubic (hermite) interpolation
+        :type kind: str
+        :param tolerance: Largest allowed error, as a fraction of the largest
+            magnitude of func over the table
+        :type tolerance: float
+        :param max_points: Give up if the table would need more grid points
+        :type max_points: int
+        :param scalars_only: Evaluate numpy arrays with func rather than the
+            table, for funcs that are already cheap on arrays
+        :type scalars_only: bool
+
+        """
+        if kind not in KINDS:
+            raise ValueError('Unknown kind {0}, expected one of {1}'.format(
+                kind, KINDS))
+        self._logger = logging.getLogger(__name__)
+        self.func = func
+        self.kind = kind
+        self.lower = float(lower)
+        self.upper = float(upper)
+        self.scalars_only = scalars_only
+        points = int(points)
+        while True:
+            self._tabulate(points)
+            self.max_error = self._max_error()
+            if self.max_error <= tolerance * max(np.nanmax(np.abs(self._y)), 1e-12):
+                break
+            points = 2 * points - 1
+            if points > max_points:
+                raise ValueError(
+                    'Tabulating needs more than {0} points for {1}'.format(
+                        max_points, tolerance))
+        self._logger.debug('Tabulated with %s points, max error %s', points,
+                           self.max_error)
+
+    def _tabulate(self, points):
+        self.points = points
+        self._x = np.linspace(self.lower, self.upper, points)
+        self._step = (self.upper - self.lower) / (points - 1)
+        self._inverse_step = 1.0 / self._step
+        self._last = points - 1
+        self._y = np.asarray(self.func(self._x), dtype=float)
+        # y = c0 + c1 * t + c2 * t^2 + c3 * t^3 on each interval, 0 <= t <= 1
+        dy = np.diff(self._y)
+        coefs = [self._y[:-1], dy]
+        if self.kind == 'cubic':
+            # hermite tangents from the function itself, scaled by step
+            offset = self._step * 1e-3
+            slope = (np.asarray(self.func(self._x + offset)) - np.asarray(
+                self.func(self._x - offset))) / (2.0 * offset) * self._step
+            coefs = [
+                self._y[:-1], slope[:-1],
+                3.0 * dy - 2.0 * slope[:-1] - slope[1:],
+                slope[:-1] + slope[1:] - 2.0 * dy
+            ]
+        self._coefs = coefs
+        # python lists are faster than numpy arrays for scalar lookups
+        self._rows = list(zip(*[coef.tolist() for coef in coefs]))
+
+    def _max_error(self):
+        fractions = np.array([0.25, 0.5, 0.75])
+        x = (self._x[:-1, np.newaxis] + fractions * self._step).ravel()
+        return float(np.nanmax(np.abs(self._interpolate(x) - self.func(x))))
+
+    def __call__(self, x):
+        """Evaluate the function at x, a float or numpy array."""
+        if isinstance(x, float):
+            position = (x - self.lower) * self._inverse_step
+            if not 0 <= position <= self._last:
+                return self.func(x)
+            index = int(position)
+            if index == self._last:
+                index -= 1
+            t = position - index
+            if self.kind == 'linear':
+                y0, dy = self._rows[index]
+                return y0 + t * dy
+            c0, c1, c2, c3 = self._rows[index]
+            return c0 + t * (c1 + t * (c2 + t * c3))
+        x = np.asarray(x, dtype=float)
+        if not x.ndim:
+            return self(float(x))
+        if self.scalars_only:
+            return self.func(x)
+        return self._interpolate(x)
+
+    def _interpolate(self, x):
+        if self.kind == 'linear':
+            result = np.interp(x, self._x, self._y)
+        else:
+            position = (x - self.lower) * self._inverse_step
+            np.clip(position, 0, self._last, out=position)
+            index = np.minimum(position.astype(int), self._last - 1)
+            position -= index
+            c0, c1, c2, c3 = [coef[index] for coef in self._coefs]
+            result = c0 + position * (c1 + position * (c2 + position * c3))
+        outside = (x < self.lower) | (x > self.upper)
+        if outside.any():
+            result[outside] = self.func(x[outside])
+        return result
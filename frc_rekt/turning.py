@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Skid steer turning.
+
+A skid steer robot turns by driving its sides at different speeds, which
+drags the front and back wheels sideways. With the weight spread over the
+wheelbase, that scrub resists yawing with a moment of cof * m * g * L / 4,
+taken as Coulomb friction: constant while the robot yaws, and holding it
+straight until the sides push harder than that.
+
+SkidSteerPlant solves the steady state of many turns at once, for turn
+feasibility checks, and steps left / right pwm commands through time for
+SkidSteerSimulation.
+
+"""
+
+import math
+import pandas as pd
+import numpy as np
+
+from frc_rekt.envelope import BROWNOUT_VOLTAGE
+from frc_rekt.motor import motor_current, motor_current_slope, motor_torque
+from frc_rekt.simulation import (GRAVITY, DrivetrainPlant,
+                                 DrivetrainSimulation, clamp)
+
+# Pandas options
+pd.set_option('max_rows', 121)
+pd.set_option('max_columns', 132)
+pd.set_option('expand_frame_repr', False)
+
+# just a convenience, so we dont have to type np.poly.poly
+POLY = np.polynomial.polynomial
+
+
+def _direction(value):
+    # 1 for 0 or more, else -1, for floats or arrays
+    return (value >= 0) * 2.0 - 1.0
+
+
+class SkidSteerPlant(DrivetrainPlant):  # pylint: disable=too-many-instance-attributes
+    """Skid steer drivetrain dynamics, in si units.
+
+    Every parameter may be a float, or a numpy array to evaluate a batch of
+    robots at once.
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            coefficients,
+            battery,
+            mass,
+            wheel_diameter,
+            mechanical_advantage,
+            length,
+            width,
+            efficiency=0.8,
+            motors_per_side=3,
+            cof=1.3,
+            curve_voltage=12.0,
+            yaw_inertia=None):
+        """SkidSteerPlant.
+
+        :param coefficients: The fitted coefficients of the drive motor
+        :type coefficients: `frc_rekt.motor.MotorCoefficients`
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param mass: Robot mass in kg
+        :type mass: float numpy.ndarray
+        :param wheel_diameter: Wheel diameter in m
+        :type wheel_diameter: float numpy.ndarray
+        :param mechanical_advantage: Gearbox reduction
+        :type mechanical_advantage: float numpy.ndarray
+        :param length: Wheelbase length in m, front to back wheel centers
+        :type length: float numpy.ndarray
+        :param width: Wheelbase width in m, left to right wheel centers
+        :type width: float numpy.ndarray
+        :param efficiency: Gearbox efficiency
+        :type efficiency: float numpy.ndarray
+        :param motors_per_side: Motors in each side's gearbox
+        :type motors_per_side: int numpy.ndarray
+        :param cof: Wheel coefficient of friction
+        :type cof: float numpy.ndarray
+        :param curve_voltage: The voltage the motor curve was taken at
+        :type curve_voltage: float
+        :param yaw_inertia: Moment of inertia about the vertical axis in
+            kg*m^2, defaults to a uniform plate the size of the wheelbase
+        :type yaw_inertia: float numpy.ndarray
+
+        """
+        super(SkidSteerPlant, self).__init__(
+            coefficients,
+            battery,
+            mass,
+            wheel_diameter,
+            mechanical_advantage,
+            efficiency=efficiency,
+            motors_per_side=motors_per_side,
+            cof=cof,
+            curve_voltage=curve_voltage)
+        self.length = length
+        self.width = width
+        self.cof = cof
+        self.motors_per_side = motors_per_side
+        # robot force in N per N*m of motor torque, one side
+        self.side_force_ratio = self.force_ratio / 2.0
+        self.side_max_force = self.max_force / 2.0
+        self.scrub_moment = cof * mass * GRAVITY * length / 4.0
+        if yaw_inertia is None:
+            yaw_inertia = mass * (length**2 + width**2) / 12.0
+        self.yaw_inertia = yaw_inertia
+
+    def side_velocities(self, velocity, yaw_rate):
+        """Left and right side velocities of a robot.
+
+        :param velocity: Velocity of the robot's center in m/s
+        :type velocity: float numpy.ndarray
+        :param yaw_rate: Counterclockwise yaw rate in rad/s
+        :type yaw_rate: float numpy.ndarray
+        :returns: left, right velocity in m/s
+        :rtype: tuple
+
+        """
+        half = yaw_rate * self.width / 2.0
+        return velocity - half, velocity + half
+
+    def _torque(self, motor_speed, motor_voltage):
+        # The motor fits are for forward voltage, reverse is the mirror image
+        direction = _direction(motor_voltage)
+        return direction * motor_torque(
+            self.coefficients, motor_speed * direction,
+            motor_voltage * direction, self.curve_voltage)
+
+    def _voltage_for_torque(self, motor_speed, torque, iterations):
+        # Bisection for the motor voltage giving torque, which rises with
+        # voltage at any speed, between the unloaded battery's +/- voltage
+        limit = self.battery.voltage(0.0)
+        lower = np.full(np.shape(torque), -limit)
+        upper = np.full(np.shape(torque), limit)
+        achievable = ((self._torque(motor_speed, lower) <= torque) &
+                      (torque <= self._torque(motor_speed, upper)))
+        for _ in range(iterations):
+            middle = (lower + upper) / 2.0
+            over = self._torque(motor_speed, middle) > torque
+            upper = np.where(over, middle, upper)
+            lower = np.where(over, lower, middle)
+        return (lower + upper) / 2.0, achievable
+
+    def _battery_current(self, motor_speed, motor_voltage):
+        # Either way, the battery supplies the mirrored motor's current
+        direction = _direction(motor_voltage)
+        return motor_current(self.coefficients, motor_speed * direction,
+                             motor_voltage * direction, self.curve_voltage)
+
+    def turn(self,  # pylint: disable=too-many-locals
+             velocity,
+             yaw_rate,
+             min_voltage=BROWNOUT_VOLTAGE,
+             iterations=40):
+        """Steady state of turns, and whether the robot can hold them.
+
+        Holding a turn takes equal and opposite side forces whose moment
+        matches the scrub. A turn is feasible when each side can make its
+        force without slipping, with pwm of at most 1, while the battery
+        stays at or above min_voltage and friction can hold the robot on
+        the circle. Everything broadcasts, e.g. a grid of velocities against
+        yaw rates.
+
+        :param velocity: Velocity of the robot's center in m/s
+        :type velocity: float numpy.ndarray
+        :param yaw_rate: Counterclockwise yaw rate in rad/s, velocity /
+            radius for a turn of that radius
+        :type yaw_rate: float numpy.ndarray
+        :param min_voltage: The lowest battery voltage allowed
+        :type min_voltage: float
+        :param iterations: Bisection steps for each side's motor voltage
+        :type iterations: int
+        :returns: left_pwm, right_pwm, total_current, battery_voltage and
+            feasible
+        :rtype: dict
+
+        """
+        velocity, yaw_rate = np.broadcast_arrays(
+            np.asarray(velocity, dtype=float),
+            np.asarray(yaw_rate, dtype=float))
+        right_force = np.sign(yaw_rate) * self.scrub_moment / self.width
+        torque = right_force / self.side_force_ratio
+        state = {}
+        feasible = np.abs(right_force) <= self.side_max_force
+        total_current = 0.0
+        sides = zip(['left', 'right'],
+                    self.side_velocities(velocity, yaw_rate),
+                    [-torque, torque])
+        for side, side_velocity, side_torque in sides:
+            motor_speed = side_velocity * self.speed_ratio
+            motor_voltage, achievable = self._voltage_for_torque(
+                motor_speed, side_torque, iterations)
+            feasible = feasible & achievable
+            total_current = total_current + self.motors_per_side * (
+                self._battery_current(motor_speed, motor_voltage))
+            state[side] = motor_voltage
+        battery_voltage = self.battery.voltage(total_current)
+        for side in ['left', 'right']:
+            state['{0}_pwm'.format(side)] = state.pop(side) / battery_voltage
+            feasible = feasible & (np.abs(state['{0}_pwm'.format(side)]) <=
+                                   1.0)
+        state['total_current'] = total_current
+        state['battery_voltage'] = battery_voltage
+        lateral = np.abs(velocity * yaw_rate) <= self.cof * GRAVITY
+        state['feasible'] = (feasible & lateral &
+                             (battery_voltage >= min_voltage))
+        return state
+
+    def _tank_bus_voltage(self, speeds, magnitudes, voltage, iterations):
+        # Newton's method on V = V0 - R * n * (I_left + I_right), warm
+        # started from voltage
+        battery = self.battery
+        for _ in range(iterations):
+            total = 0.0
+            slope = 0.0
+            for motor_speed, magnitude in zip(speeds, magnitudes):
+                current, current_slope = motor_current_slope(
+                    self.coefficients, motor_speed, magnitude * voltage,
+                    self.curve_voltage, self._slopes)
+                total = total + current
+                slope = slope + magnitude * current_slope
+            residual = voltage - battery.voltage(self.motors_per_side * total)
+            voltage = voltage - residual / (
+                1.0 + battery.internal_resistance * self.motors_per_side *
+                slope)
+        return voltage
+
+    def tank_step(  # pylint: disable=too-many-arguments,too-many-locals
+            self,
+            velocity,
+            yaw_rate,
+            left_pwm,
+            right_pwm,
+            bus_voltage,
+            iterations=2):
+        """Evaluate the drivetrain with separate left and right pwm.
+
+        :param velocity: Velocity of the robot's center in m/s
+        :type velocity: float numpy.ndarray
+        :param yaw_rate: Counterclockwise yaw rate in rad/s
+        :type yaw_rate: float numpy.ndarray
+        :param left_pwm: Left side pwm, -1 to 1
+        :type left_pwm: float numpy.ndarray
+        :param right_pwm: Right side pwm, -1 to 1
+        :type right_pwm: float numpy.ndarray
+        :param bus_voltage: Battery voltage guess, e.g. the last step's
+        :type bus_voltage: float numpy.ndarray
+        :param iterations: Newton iterations for the battery voltage
+        :type iterations: int
+        :returns: acceleration, yaw_acceleration, left_current,
+            right_current (per motor), total_current, bus_voltage
+        :rtype: tuple
+
+        """
+        directions = [_direction(left_pwm), _direction(right_pwm)]
+        magnitudes = [left_pwm * directions[0], right_pwm * directions[1]]
+        speeds = [
+            side_velocity * self.speed_ratio * direction
+            for side_velocity, direction in zip(
+                self.side_velocities(velocity, yaw_rate), directions)
+        ]
+        bus_voltage = self._tank_bus_voltage(speeds, magnitudes, bus_voltage,
+                                             iterations)
+        forces = []
+        currents = []
+        for motor_speed, magnitude, direction in zip(speeds, magnitudes,
+                                                     directions):
+            motor_voltage = magnitude * bus_voltage
+            torque = motor_torque(self.coefficients, motor_speed,
+                                  motor_voltage, self.curve_voltage)
+            forces.append(
+                clamp(torque * direction * self.side_force_ratio,
+                      self.side_max_force))
+            currents.append(
+                motor_current(self.coefficients, motor_speed, motor_voltage,
+                              self.curve_voltage))
+        moment = (forces[1] - forces[0]) * self.width / 2.0
+        # Scrub opposes yawing, or holds the robot straight up to its limit
+        yawing = yaw_rate != 0
+        net = ((moment - _direction(yaw_rate) * self.scrub_moment) * yawing +
+               (abs(moment) > self.scrub_moment) *
+               (moment - _direction(moment) * self.scrub_moment) *
+               (1 - yawing))
+        return ((forces[0] + forces[1]) / self.mass, net / self.yaw_inertia,
+                currents[0] * directions[0], currents[1] * directions[1],
+                self.motors_per_side * (currents[0] + currents[1]),
+                bus_voltage)
+
+
+class SkidSteerSimulation(DrivetrainSimulation):  # pylint: disable=too-few-public-methods
+    """Time stepped simulation of a skid steer robot."""
+
+    tank_columns = [
+        'time', 'left_pwm', 'right_pwm', 'velocity', 'yaw_rate', 'heading',
+        'x', 'y', 'left_current', 'right_current', 'total_current',
+        'battery_voltage'
+    ]
+
+    def __init__(self, drivetrain=None, battery=None, mass=154):
+        """SkidSteerSimulation.
+
+        :param drivetrain: The drivetrain being simulated
+        :type drivetrain: `frc_rekt.drivetrain.Drivetrain`
+        :param battery: The battery powering the robot
+        :type battery: `frc_rekt.battery.Battery`
+        :param mass: The robot mass in lbs
+        :type mass: int float
+
+        """
+        super(SkidSteerSimulation, self).__init__(drivetrain, battery, mass)
+        plant = self.plant
+        self.turning = SkidSteerPlant(
+            plant.coefficients,
+            self.battery,
+            self._mass,
+            self.drivetrain.wheel.diameter * 0.0254,
+            self.drivetrain.gearbox.mechanical_advantage,
+            self.drivetrain.length * 0.0254,
+            self.drivetrain.width * 0.0254,
+            efficiency=self.drivetrain.gearbox.efficiency,
+            motors_per_side=plant.motor_count // 2,
+            cof=self.drivetrain.wheel.cof,
+            curve_voltage=plant.curve_voltage)
+
+    def run_tank(self, left_pwm, right_pwm, dt=0.001):  # pylint: disable=too-many-locals
+        """Simulate left and right pwm profiles, from rest at the origin.
+
+        :param left_pwm: Left side pwm for each time step, -1 to 1
+        :type left_pwm: numpy.ndarray
+        :param right_pwm: Right side pwm for each time step, -1 to 1
+        :type right_pwm: numpy.ndarray
+        :param dt: The length of a time step in seconds
+        :type dt: float
+        :returns: One row per time step, in si units, heading in rad
+        :rtype: pandas.DataFrame
+
+        """
+        left_commands, right_commands = np.broadcast_arrays(
+            np.asarray(left_pwm, dtype=float),
+            np.asarray(right_pwm, dtype=float))
+        steps = len(left_commands)
+        record = {name: np.empty(steps) for name in self.tank_columns}
+        record['time'] = np.arange(steps) * dt
+        record['left_pwm'] = left_commands
+        record['right_pwm'] = right_commands
+        step = self.turning.tank_step
+        velocity = yaw_rate = heading = x = y = 0.0
+        bus_voltage = self.battery.voltage(0.0)
+        # floats are much faster than numpy scalars in a python loop
+        for k, (left, right) in enumerate(
+                zip(left_commands.tolist(), right_commands.tolist())):
+            (acceleration, yaw_acceleration, left_current, right_current,
+             total_current, bus_voltage) = step(velocity, yaw_rate, left,
+                                                right, bus_voltage)
+            for name, value in [('velocity', velocity),
+                                ('yaw_rate', yaw_rate), ('heading', heading),
+                                ('x', x), ('y', y),
+                                ('left_current', left_current),
+                                ('right_current', right_current),
+                                ('total_current', total_current),
+                                ('battery_voltage', bus_voltage)]:
+                record[name][k] = value
+            # semi-implicit euler, scrub stops yawing rather than reversing
+            velocity += acceleration * dt
+            next_yaw_rate = yaw_rate + yaw_acceleration * dt
+            if next_yaw_rate * yaw_rate < 0:
+                next_yaw_rate = 0.0
+            yaw_rate = next_yaw_rate
+            heading += yaw_rate * dt
+            x += velocity * math.cos(heading) * dt
+            y += velocity * math.sin(heading) * dt
+        self._logger.debug('Simulated %s tank steps', steps)
+        return pd.DataFrame(record, columns=self.tank_columns)
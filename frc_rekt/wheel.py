@@ -36,7 +36,7 @@ class Wheel(object):
         self._diameter = float(diameter) * 0.0254
         self.cof = float(cof)
         self.torque = float(torque)
-        self._logger.debug('%s created', str(self))
+        self._logger.debug('%s created', self)
 
     def __repr__(self):
         """Represent a wheel."""
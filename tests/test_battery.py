@@ -1,7 +1,10 @@
 # -*- coding: UTF-8 -*-
+import numpy as np
 import pytest
 
-from frc_rekt.battery import Battery
+from frc_rekt.battery import Battery, DynamicBattery, fit_dynamic_battery
+from frc_rekt.electrical import solve_bus
+from frc_rekt.motor import Motor
 
 
 def test_init():
@@ -15,3 +18,79 @@ def battery():
 
 def test_voltage(battery):
     assert battery.voltage() == 13.2
+
+
+def test_voltage_at_load(battery):
+    assert battery.voltage(100) == pytest.approx(12.0)
+    assert battery.voltage() == 13.2
+
+
+@pytest.fixture
+def dynamic_battery():
+    return DynamicBattery(branches=((0.004, 2.0), (0.008, 60.0)))
+
+
+def test_dynamic_rested(dynamic_battery):
+    assert dynamic_battery.voltage() == pytest.approx(13.2)
+    assert dynamic_battery.voltage(100) == pytest.approx(12.0)
+    assert dynamic_battery.open_circuit_voltage(0.0) == pytest.approx(11.9)
+
+
+def test_dynamic_update(dynamic_battery):
+    # A step of 100 A for a minute, then rest
+    current = np.concatenate([np.full(3000, 100.0), np.zeros(3000)])
+    voltage = dynamic_battery.update(current)
+    time = np.arange(3000) * 0.02
+    drained = 1.3 * 100.0 * time / (3600.0 * 18.0)
+    sag = 0.4 * (1.0 - np.exp(-time / 2.0)) + 0.8 * (
+        1.0 - np.exp(-time / 60.0))
+    assert np.allclose(voltage[:3000], 13.2 - drained - 1.2 - sag)
+    assert dynamic_battery.state_of_charge == pytest.approx(1.0 - 100.0 /
+                                                            (60.0 * 18.0))
+    # Jumps back by the internal resistance's drop, then recovers
+    assert voltage[3000] - voltage[2999] == pytest.approx(1.2, abs=0.01)
+    assert np.allclose(dynamic_battery.branch_voltages,
+                       [0.0, 0.8 * (1.0 - np.exp(-1.0)) * np.exp(-1.0)])
+    assert dynamic_battery.load == 0.0
+
+
+def test_dynamic_update_chunks(dynamic_battery):
+    # Exact steps, so chunks and sample rates agree
+    current = np.abs(np.random.RandomState(0).normal(60.0, 40.0, 1000))
+    whole = dynamic_battery.update(current)
+    state = dynamic_battery.state_of_charge, dynamic_battery.branch_voltages
+    dynamic_battery.reset()
+    chunks = np.concatenate(
+        [dynamic_battery.update(chunk) for chunk in np.split(current, 8)])
+    assert np.allclose(whole, chunks)
+    assert dynamic_battery.state_of_charge == pytest.approx(state[0])
+    assert np.allclose(dynamic_battery.branch_voltages, state[1])
+    dynamic_battery.reset()
+    fine = dynamic_battery.update(np.repeat(current, 4), 0.005)
+    assert np.allclose(whole, fine[::4])
+
+
+def test_dynamic_solve_bus(dynamic_battery):
+    # Works anywhere a Battery does
+    dynamic_battery.update(np.full(100, 200.0))
+    motor = Motor('cim')
+    speed = np.linspace(0.0, 80.0, 50)[:, np.newaxis] * np.ones(4)
+    solution = solve_bus(dynamic_battery, motor.coefficients, speed,
+                         np.ones(4))
+    assert np.allclose(solution.voltage,
+                       dynamic_battery.voltage(solution.total_current))
+
+
+def test_fit_dynamic_battery(dynamic_battery):
+    state = np.random.RandomState(1)
+    current = np.repeat(np.abs(state.normal(80.0, 60.0, 500)), 50)
+    voltage = dynamic_battery.update(current) + state.normal(
+        0.0, 0.01, len(current))
+    fitted = fit_dynamic_battery(current, voltage, taus=(2.0, 60.0))
+    assert np.allclose(fitted.ocv_coefs, (11.9, 1.3), atol=0.05)
+    assert fitted.internal_resistance == pytest.approx(0.012, abs=1e-3)
+    assert np.allclose([resistance for resistance, _ in fitted.branches],
+                       [0.004, 0.008],
+                       atol=1e-3)
+    assert [tau for _, tau in fitted.branches] == [2.0, 60.0]
+    assert np.allclose(fitted.update(current), voltage, atol=0.05)
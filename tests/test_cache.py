@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+import pytest
+
+from frc_rekt.cache import CharacterizationCache, file_stamps
+
+
+@pytest.fixture
+def cache():
+    return CharacterizationCache(max_size=2)
+
+
+def test_get_builds_once(cache):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return {'value': len(calls)}
+
+    first = cache.get(('cim', 1), factory)
+    second = cache.get(('cim', 1), factory)
+    assert first is second
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ('cim', 1) in cache
+
+
+def test_new_key_replaces_stale(cache):
+    cache.get(('cim', 1), lambda: 1)
+    cache.get(('cim', 2), lambda: 2)
+    assert ('cim', 1) not in cache
+    assert len(cache) == 1
+
+
+def test_variants_kept(cache):
+    cache.get(('cim', (1, 10), 1), lambda: 1)
+    cache.get(('cim', (0, 5), 1), lambda: 2)
+    assert ('cim', (1, 10), 1) in cache
+    cache.get(('cim', (0, 5), 2), lambda: 3)
+    assert ('cim', (0, 5), 1) not in cache
+    assert len(cache) == 2
+
+
+def test_size_limit(cache):
+    cache.get(('cim', 1), lambda: 1)
+    cache.get(('bag', 1), lambda: 2)
+    cache.get(('cim', 1), lambda: 1)
+    cache.get(('775pro', 1), lambda: 3)
+    assert len(cache) == 2
+    assert ('bag', 1) not in cache
+    assert ('cim', 1) in cache
+
+
+def test_invalidate(cache):
+    cache.get(('cim', 1), lambda: 1)
+    cache.get(('bag', 1), lambda: 2)
+    cache.invalidate('cim')
+    assert ('cim', 1) not in cache
+    assert ('bag', 1) in cache
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_file_stamps(tmpdir):
+    path = tmpdir.join('data.csv')
+    path.write('a,b\n')
+    stamps = file_stamps([str(path)])
+    assert stamps[0][0] == str(path)
+    assert isinstance(stamps[0][1], int)
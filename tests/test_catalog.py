@@ -0,0 +1,120 @@
+# -*- coding: UTF-8 -*-
+
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+from frc_rekt.catalog import (MOTOR_CATALOG, MotorCatalog, MotorSpec,
+                              discover_spec)
+from frc_rekt.motor import Motor
+
+
+def test_default_catalog():
+    assert MOTOR_CATALOG.names == ['cim', 'mini-cim', '775pro', 'bag']
+    assert Motor.motor_types == MOTOR_CATALOG.names
+    assert MOTOR_CATALOG['mini-cim'] == MotorSpec(
+        'mini-cim', '20151207', '20151209', [2, 4, 6, 8, 10, 12], 12.0)
+    assert 'bag' in MOTOR_CATALOG
+    assert len(MOTOR_CATALOG) == 4
+    assert list(MOTOR_CATALOG) == MOTOR_CATALOG.names
+
+
+def test_unknown_motor():
+    with pytest.raises(KeyError):
+        MOTOR_CATALOG['falcon']
+    with pytest.raises(KeyError):
+        Motor('falcon')
+
+
+@pytest.fixture
+def data_folder(tmpdir):
+    """A catalog of the cim, plus an uncataloged copy of it, the dyno."""
+    folder = tmpdir.mkdir('vex')
+    cim = folder.mkdir('cim')
+    dyno = folder.mkdir('dyno')
+    for path in MOTOR_CATALOG.motor('cim')._data_files():
+        name = path.split('/')[-1]
+        shutil.copy(path, str(cim.join(name)))
+        shutil.copy(path, str(dyno.join(name.replace('cim', 'dyno'))))
+    folder.mkdir('empty')
+    folder.join('README.md').write('not a motor')
+    catalog = [{
+        'name': 'cim',
+        'curve_date': '20151104',
+        'stall_date': '20151104'
+    }]
+    folder.join('catalog.json').write(json.dumps({'motors': catalog}))
+    return folder
+
+
+@pytest.fixture
+def catalog(data_folder):
+    return MotorCatalog(
+        str(data_folder.join('catalog.json')), str(data_folder))
+
+
+def test_discovered(catalog):
+    assert catalog._specs is None
+    assert catalog.names == ['cim', 'dyno']
+    assert catalog['cim'].stall_voltages == [2, 4, 6, 8, 10, 12]
+    assert catalog['dyno'] == MotorSpec('dyno', '20151104', '20151104',
+                                        [2, 4, 6, 8, 10, 12], 12.0)
+
+
+def test_lazy_motor(catalog):
+    assert catalog._motors == {}
+    dyno = catalog.motor('dyno')
+    assert catalog.motor('dyno') is dyno
+    assert list(catalog._motors) == ['dyno']
+    cim = Motor('cim')
+    assert dyno.coefficients == cim.coefficients
+    assert dyno._data_files()[0].startswith(catalog.data_folder)
+
+
+@pytest.mark.parametrize('curve_voltage', [12.0, 14.0])
+def test_fewer_stall_voltages(data_folder, curve_voltage):
+    data_folder.join('catalog.json').write(
+        json.dumps({
+            'motors': [{
+                'name': 'dyno',
+                'curve_date': '20151104',
+                'stall_date': '20151104',
+                'stall_voltages': [4, 8, 12],
+                'curve_voltage': curve_voltage
+            }]
+        }))
+    dyno = MotorCatalog(
+        str(data_folder.join('catalog.json')), str(data_folder)).motor('dyno')
+    assert sorted(dyno.stall_frames) == [4, 8, 12]
+    assert dyno.stall_points['test_voltage'].tolist() == [0, 4, 8, 12]
+    assert not dyno.stall_points['torque'].isnull().any()
+    # Scaled to the 12v test, as with the full set of tests
+    frame, percent_label = dyno.voltage_scaled_frame('torque')
+    assert frame[percent_label].iloc[-1] == 1.0
+    assert np.isfinite(dyno.voltage_scaled_torque(12.0))
+
+
+def test_reload(catalog, data_folder):
+    catalog.motor('dyno')
+    data_folder.join('dyno').remove()
+    assert 'dyno' in catalog
+    catalog.reload()
+    assert catalog._motors == {}
+    assert catalog.names == ['cim']
+
+
+def test_bad_catalog_file(data_folder):
+    data_folder.join('catalog.json').write('not json')
+    catalog = MotorCatalog(
+        str(data_folder.join('catalog.json')), str(data_folder))
+    assert catalog.names == ['cim', 'dyno']
+    missing = MotorCatalog(
+        str(data_folder.join('missing.json')), str(data_folder.join('none')))
+    assert missing.names == []
+
+
+def test_discover_spec(data_folder):
+    assert discover_spec(str(data_folder.join('empty')), 'empty') is None
+    assert discover_spec(str(data_folder.join('cim')), 'dyno') is None
@@ -0,0 +1,93 @@
+# -*- coding: UTF-8 -*-
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frc_rekt import diagnostics
+from frc_rekt.helpers import plot_func
+from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.motor import Motor
+
+
+@pytest.fixture
+def dataframe():
+    return pd.DataFrame({'x': [0.0, 1.0, 2.0], 'y': [1.0, 3.0, 5.0]})
+
+
+def line(x):
+    return 2 * x + 1
+
+
+def test_plot_job(dataframe):
+    original = dataframe.copy()
+    job = diagnostics.plot_job(dataframe, line, title='line')
+    assert job.name == 'line_x_vs_y_fit'
+    assert (job.x_label, job.y_label) == ('x', 'y')
+    assert len(job.fit_x) == diagnostics.FIT_POINTS
+    assert np.allclose(job.fit_y, line(job.fit_x))
+    # The caller's data is left alone
+    pd.testing.assert_frame_equal(dataframe, original)
+
+
+def test_plot_job_untitled(dataframe):
+    assert diagnostics.plot_job(dataframe, line).name != 'line_x_vs_y_fit'
+
+
+def test_render(tmpdir, dataframe):
+    import matplotlib.pyplot as plt
+    open_figures = plt.get_fignums()
+    job = diagnostics.plot_job(dataframe, line, title='line')
+    for _ in range(20):
+        paths = diagnostics.render(job, str(tmpdir), ('png', 'svg'))
+    assert paths == [
+        str(tmpdir.join('line_x_vs_y_fit.png')),
+        str(tmpdir.join('line_x_vs_y_fit.svg'))
+    ]
+    assert all(os.path.getsize(path) for path in paths)
+    # Nothing is left in pyplot's figure registry
+    assert plt.get_fignums() == open_figures
+
+
+def test_plot_func(tmpdir, dataframe, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    tmpdir.mkdir('artifacts')
+    original = dataframe.copy()
+    paths = plot_func(dataframe, line, title='line')
+    assert tmpdir.join(paths[0]).check()
+    pd.testing.assert_frame_equal(dataframe, original)
+
+
+def test_motor_jobs():
+    jobs = diagnostics.motor_jobs(Motor('cim'))
+    assert [job.name for job in jobs] == [
+        'cim_speed_vs_current_fit', 'cim_speed_vs_torque_fit',
+        'cim_voltage_vs_current_percent_fit',
+        'cim_voltage_vs_torque_percent_fit'
+    ]
+    # The voltage scaled fits are drawn past the tests
+    assert jobs[2].fit_x[-1] == 14
+
+
+def test_breaker_jobs():
+    jobs = diagnostics.breaker_jobs(MainBreaker())
+    assert len(jobs) == 4
+    assert all(job.name.startswith('main_breaker_') for job in jobs)
+
+
+@pytest.mark.parametrize('backend', ['serial', 'process'])
+def test_report(tmpdir, backend):
+    folder = tmpdir.join('plots')
+    paths = diagnostics.report(folder=str(folder), backend=backend, workers=2)
+    assert len(paths) == 4 * 4 + 4
+    for job_paths in paths:
+        assert [path.rsplit('.', 1)[1] for path in job_paths] == ['png', 'svg']
+        assert all(os.path.isfile(path) for path in job_paths)
+
+
+def test_report_motors(tmpdir):
+    paths = diagnostics.report(['bag'], False, str(tmpdir), ('png', ),
+                               'serial')
+    assert len(paths) == 4
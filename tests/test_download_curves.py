@@ -0,0 +1,205 @@
+# -*- coding: UTF-8 -*-
+
+import importlib.util
+import gzip
+import io
+import json
+import threading
+import zipfile
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+SPEC = importlib.util.spec_from_file_location('download_curves',
+                                              'data/vex/download_curves.py')
+download_curves = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(download_curves)
+
+
+def zipped(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref:
+        for name, data in members.items():
+            zip_ref.writestr(name, data)
+    return buffer.getvalue()
+
+
+CONTENT = {
+    '/cim/cim-motor-curve-data-20151104.csv':
+    b'Speed (RPM),Current (A)\n' + b'1,2\n' * 5000,
+    '/cim/cim-locked-rotor-data-20151104.zip':
+    zipped({
+        'cim-locked-rotor-data-2v-20151104.csv': b'Time (s),Amps\n0,1\n',
+        'cim-locked-rotor-data-4v-20151104.csv': b'Time (s),Amps\n0,2\n'
+    }),
+    '/bag/bag-motor-curve-data-20151207.csv':
+    b'Speed (RPM),Current (A)\n3,4\n',
+}
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves CONTENT, honouring 'bytes=n-' ranges unless told not to.
+
+    With gzip set it gzips everything, whatever the client accepts, like a
+    misconfigured CDN.
+
+    """
+
+    requests = []
+    encodings = []
+    ranges = True
+    gzip = False
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.requests.append((self.path, self.headers.get('Range')))
+        self.encodings.append(self.headers.get('Accept-Encoding'))
+        if self.path not in CONTENT:
+            self.send_error(404)
+            return
+        data = CONTENT[self.path]
+        if self.gzip:
+            data = gzip.compress(data)
+        requested = self.headers.get('Range')
+        if requested and self.ranges:
+            start = int(requested.split('=')[1].rstrip('-'))
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(
+                start, len(data) - 1, len(data)))
+            data = data[start:]
+        else:
+            self.send_response(200)
+        if self.gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    Handler.requests = []
+    Handler.encodings = []
+    Handler.ranges = True
+    Handler.gzip = False
+    yield 'http://127.0.0.1:{0}'.format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def urls(server):
+    return {
+        'cim': [
+            server + '/cim/cim-motor-curve-data-20151104.csv',
+            server + '/cim/cim-locked-rotor-data-20151104.zip'
+        ],
+        'bag': [server + '/bag/bag-motor-curve-data-20151207.csv']
+    }
+
+
+def test_download(tmpdir, urls):
+    results = download_curves.download_files(str(tmpdir), urls)
+    for path, data in CONTENT.items():
+        assert tmpdir.join(path).read_binary() == data
+        assert results[path[1:]] == download_curves.file_sha256(
+            str(tmpdir.join(path)))
+    assert tmpdir.join('cim', 'cim-locked-rotor-data-4v-20151104.csv').check()
+    with open(str(tmpdir.join(download_curves.RECORD_NAME))) as record_file:
+        assert json.load(record_file) == results
+    assert not tmpdir.join('cim').listdir('*.part')
+
+
+def test_skip_current(tmpdir, urls):
+    download_curves.download_files(str(tmpdir), urls)
+    Handler.requests = []
+    tmpdir.join('cim', 'cim-locked-rotor-data-2v-20151104.csv').remove()
+    download_curves.download_files(str(tmpdir), urls)
+    assert Handler.requests == []
+    # Missing members of a current zip are extracted again
+    assert tmpdir.join('cim', 'cim-locked-rotor-data-2v-20151104.csv').check()
+
+
+def test_redownload_changed(tmpdir, urls):
+    download_curves.download_files(str(tmpdir), urls)
+    Handler.requests = []
+    path = '/bag/bag-motor-curve-data-20151207.csv'
+    tmpdir.join(path).write('tampered')
+    download_curves.download_files(str(tmpdir), urls)
+    assert Handler.requests == [(path, None)]
+    assert tmpdir.join(path).read_binary() == CONTENT[path]
+
+
+@pytest.mark.parametrize('ranges', [True, False])
+def test_resume(tmpdir, urls, ranges):
+    Handler.ranges = ranges
+    path = '/cim/cim-motor-curve-data-20151104.csv'
+    tmpdir.mkdir('cim').join(path.split('/')[-1] + '.part').write_binary(
+        CONTENT[path][:1000])
+    download_curves.download_files(str(tmpdir), urls)
+    assert (path, 'bytes=1000-') in Handler.requests
+    assert tmpdir.join(path).read_binary() == CONTENT[path]
+
+
+def test_gzip(tmpdir, urls):
+    Handler.gzip = True
+    path = '/cim/cim-motor-curve-data-20151104.csv'
+    # A part file of decoded bytes can't be resumed from an encoded range
+    tmpdir.mkdir('cim').join(path.split('/')[-1] + '.part').write_binary(
+        CONTENT[path][:1000])
+    download_curves.download_files(str(tmpdir), urls)
+    assert set(Handler.encodings) == {'identity'}
+    assert [request for request in Handler.requests
+            if request[0] == path] == [(path, 'bytes=1000-'), (path, None)]
+    for name, data in CONTENT.items():
+        assert tmpdir.join(name).read_binary() == data
+
+
+def test_resume_complete_part(tmpdir, urls):
+    path = '/bag/bag-motor-curve-data-20151207.csv'
+    tmpdir.mkdir('bag').join(path.split('/')[-1] + '.part').write_binary(
+        CONTENT[path] + b'extra')
+    download_curves.download_files(str(tmpdir), urls)
+    assert [request for request in Handler.requests
+            if request[0] == path] == [
+                (path, 'bytes={0}-'.format(len(CONTENT[path]) + 5)),
+                (path, None)
+            ]
+    assert tmpdir.join(path).read_binary() == CONTENT[path]
+
+
+def test_missing(tmpdir, urls, server):
+    urls['bag'].append(server + '/bag/missing.csv')
+    with pytest.raises(download_curves.requests.HTTPError):
+        download_curves.download_files(str(tmpdir), urls)
+    # Everything else still landed
+    assert tmpdir.join('bag', 'bag-motor-curve-data-20151207.csv').check()
+
+
+def test_truncated(tmpdir, urls, monkeypatch):
+    iter_content = download_curves.requests.Response.iter_content
+
+    def truncated(response, chunk_size=1):
+        for chunk in iter_content(response, chunk_size=chunk_size):
+            yield chunk[:10]
+            return
+
+    monkeypatch.setattr(download_curves.requests.Response, 'iter_content',
+                        truncated)
+    with pytest.raises(download_curves.DownloadError):
+        download_curves.download_files(str(tmpdir), urls, workers=1)
@@ -13,3 +13,13 @@ def test_init():
 @pytest.fixture
 def drivetrain():
     return Drivetrain()
+
+
+def test_gearbox(drivetrain):
+    assert drivetrain.gearbox.motors == [drivetrain.motor] * 3
+
+
+def test_str(drivetrain):
+    assert str(drivetrain).startswith('Drivetrain(')
+    assert drivetrain.length == pytest.approx(34)
+    assert drivetrain.width == pytest.approx(28)
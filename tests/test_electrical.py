@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+import pytest
+
+from frc_rekt.battery import Battery
+from frc_rekt.electrical import solve_bus
+from frc_rekt.motor import Motor, stack_coefficients
+
+
+@pytest.fixture
+def battery():
+    return Battery()
+
+
+@pytest.fixture
+def cim():
+    return Motor('cim')
+
+
+def test_self_consistent(battery, cim):
+    speed = np.linspace(0, 80, 100)[:, np.newaxis] * np.ones(6)
+    solution = solve_bus(battery, cim.coefficients, speed, 1.0)
+    assert solution.voltage.shape == (100, )
+    assert solution.motor_current.shape == (100, 6)
+    assert np.allclose(battery.voltage(solution.total_current),
+                       solution.voltage)
+    # Each motor draws what the solved voltage says it should
+    assert np.allclose(solution.motor_current[:, 0],
+                       cim.current(speed[:, 0], solution.voltage))
+    assert np.all(np.diff(solution.voltage) > 0)
+
+
+def test_idle(battery, cim):
+    solution = solve_bus(battery, cim.coefficients, [[10.0, 10.0]],
+                         [[0.0, 0.0]])
+    assert solution.voltage[0] == battery.voltage()
+    assert np.all(solution.motor_current == 0)
+    assert solution.iterations == 1
+
+
+def test_mixed_motors_and_reverse(battery, cim):
+    bag = Motor('bag')
+    stacked = stack_coefficients([cim.coefficients, bag.coefficients])
+    solution = solve_bus(battery, stacked, [[20.0, -50.0]], [[0.5, -0.8]])
+    voltage = solution.voltage[0]
+    assert solution.motor_current[0, 0] == pytest.approx(
+        cim.current(20.0, 0.5 * voltage))
+    assert solution.motor_current[0, 1] == pytest.approx(
+        -bag.current(50.0, 0.8 * voltage))
+    assert solution.total_current[0] == pytest.approx(
+        solution.motor_current[0, 0] - solution.motor_current[0, 1])
+
+
+def test_short_circuit(cim):
+    battery = Battery(internal_resistance=10.0)
+    solution = solve_bus(
+        battery, cim.coefficients, np.zeros((1, 6)), 1.0, max_iterations=3)
+    assert solution.iterations == 3
+    assert solution.voltage[0] >= 0
@@ -0,0 +1,136 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+import pytest
+
+from frc_rekt.battery import Battery
+from frc_rekt.electrical import solve_bus
+from frc_rekt.envelope import (BROWNOUT_VOLTAGE, PiecewisePolynomial,
+                               PwmEnvelope, fit_envelope, max_pwm)
+from frc_rekt.gearbox import Gearbox
+from frc_rekt.motor import Motor, stack_coefficients
+
+
+@pytest.fixture
+def battery():
+    # A worn battery, so 6 cims can pull it below the brownout voltage
+    return Battery(internal_resistance=0.02)
+
+
+@pytest.fixture
+def cim():
+    return Motor('cim')
+
+
+@pytest.fixture(scope='module')
+def envelope():
+    return PwmEnvelope(battery=Battery(internal_resistance=0.02))
+
+
+def test_max_pwm(battery, cim):
+    speed = np.linspace(0, 90, 200)[:, np.newaxis] * np.ones(6)
+    pwm = max_pwm(battery, cim.coefficients, speed)
+    assert pwm.shape == (200, )
+    assert np.all((pwm > 0) & (pwm <= 1))
+    assert np.all(np.diff(pwm) >= 0)
+    solution = solve_bus(battery, cim.coefficients, speed,
+                         pwm[:, np.newaxis])
+    limited = pwm < 1
+    assert limited[0] and not limited[-1]
+    # Limited speeds sit on the floor, the rest stay above it
+    assert np.allclose(solution.voltage[limited], BROWNOUT_VOLTAGE)
+    assert np.all(solution.voltage[~limited] >= BROWNOUT_VOLTAGE - 1e-9)
+
+
+def test_max_pwm_matches_loop(battery, cim):
+    # The voltage the motors get, found one speed at a time
+    allowed = (battery.voltage(0.0) - 7.5) / battery.internal_resistance
+    for speed in [0.0, 20.0, 40.0, 80.0]:
+        grid = np.linspace(0.0, 7.5, 200001)
+        current = 4 * cim.current(speed, grid)
+        index = np.searchsorted(current, allowed)
+        expected = grid[index] / 7.5 if index < len(grid) else 1.0
+        pwm = max_pwm(battery, cim.coefficients, [[speed] * 4], 7.5)
+        assert pwm[0] == pytest.approx(expected, abs=1e-4)
+
+
+def test_dead_battery(cim, caplog):
+    battery = Battery(starting_voltage=6.0)
+    pwm = max_pwm(
+        battery, cim.coefficients, np.zeros((3, 2)), max_iterations=5)
+    assert np.all(pwm < 0.1)
+    assert 'not converged' in caplog.text
+
+
+def test_piecewise():
+    function = PiecewisePolynomial([1.0, 2.0], [[0.0, 1.0], [5.0], [1.0]])
+    assert list(function(np.array([0.5, 1.0, 1.5, 2.0, 3.0]))) == [
+        0.5, 5.0, 5.0, 1.0, 1.0
+    ]
+    assert function(0.5) == 0.5
+    with pytest.raises(ValueError):
+        PiecewisePolynomial([1.0], [[1.0]])
+
+
+def test_fit_envelope():
+    speed = np.linspace(0.0, 10.0, 11)
+    pwm = np.minimum(0.2 + 0.01 * speed**2, 1.0)
+    function = fit_envelope(speed, pwm)
+    assert function.breaks == [9.0]
+    assert np.allclose(function.pieces[0], [0.2, 0.0, 0.01])
+    assert np.allclose(function(speed), pwm)
+    unlimited = fit_envelope(speed, np.ones(11))
+    assert unlimited.breaks == [0.0]
+    assert unlimited(speed).tolist() == [1.0] * 11
+    # Too few limited speeds to fit, so none are
+    assert fit_envelope(speed, np.ones(11) - (speed > 9.5)).pieces[0] == (1.0, )
+
+
+def test_envelope(envelope):
+    assert len(envelope.motor_speed) == 256
+    table = envelope.table
+    assert list(table.columns) == [
+        'motor_speed', 'output_speed', 'pwm', 'fit', 'battery_voltage',
+        'total_current'
+    ]
+    assert table['battery_voltage'].min() == pytest.approx(BROWNOUT_VOLTAGE)
+    assert np.allclose(table['output_speed'] * Gearbox().mechanical_advantage,
+                       table['motor_speed'])
+    # The fit follows the envelope closely
+    assert np.max(np.abs(table['fit'] - table['pwm'])) < 0.02
+    # Full pwm is safe near free speed
+    assert envelope.pwm[-1] == 1.0
+
+
+def test_envelope_floor(envelope):
+    lower = envelope.solve(6.0)
+    assert np.all(lower >= envelope.pwm)
+    assert np.any(lower > envelope.pwm)
+
+
+def test_envelope_mixed_motors(battery, cim):
+    bag = Motor('bag')
+    envelope = PwmEnvelope(
+        Gearbox(motors=[cim, bag, bag]), battery, 9.0, points=64)
+    assert len(envelope.pwm) == 64
+    assert envelope.pwm[0] < 1
+    assert envelope.table['battery_voltage'].min() == pytest.approx(9.0)
+    # The merged motors draw what each of them does
+    speed = envelope.motor_speed[:, np.newaxis] * np.ones(6)
+    separate = max_pwm(battery,
+                       stack_coefficients(
+                           [cim.coefficients, bag.coefficients,
+                            bag.coefficients] * 2), speed, 9.0)
+    assert np.allclose(separate, envelope.pwm)
+
+
+def test_envelope_fresh_battery():
+    # 6 cims can not pull a fresh battery down to brownout
+    assert np.all(PwmEnvelope(points=16).pwm == 1.0)
+
+
+def test_solve_at_speeds(envelope):
+    # Solving at the envelope's own speeds gives the envelope back
+    assert np.allclose(
+        envelope.solve(motor_speed=envelope.motor_speed), envelope.pwm)
+    middle = envelope.motor_speed[len(envelope.motor_speed) // 4]
+    assert envelope.solve(motor_speed=[0.0, middle])[1] > envelope.pwm[0]
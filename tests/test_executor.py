@@ -0,0 +1,48 @@
+# -*- coding: UTF-8 -*-
+import pytest
+
+from frc_rekt.executor import (BACKENDS, Executor, chunk_slices,
+                               worker_breaker, worker_motor)
+
+
+def stall_current(task):
+    motor_type, voltage = task
+    return worker_motor(motor_type).current(0.0, voltage)
+
+
+def trip_time(current):
+    return worker_breaker().trip_time(current)
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+def test_ordered_results(backend):
+    tasks = [('cim', voltage) for voltage in range(1, 13)]
+    executor = Executor(
+        backend=backend, workers=3, motor_types=['cim'], breaker=True)
+    with executor:
+        results = executor.map(stall_current, tasks)
+        assert executor.map(trip_time, [240]) == [worker_breaker().trip_time(240)]
+    assert results == [stall_current(task) for task in tasks]
+
+
+def test_map_without_context():
+    assert Executor(backend='thread', workers=2).map(abs, [-1, -2]) == [1, 2]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Executor(backend='cluster')
+
+
+def test_chunk_slices():
+    assert chunk_slices(5, 2) == [slice(0, 2), slice(2, 4), slice(4, 5)]
+    assert chunk_slices(0, 2) == []
+
+
+def test_worker_motor_lazy():
+    assert worker_motor('bag').motor_type == 'bag'
+    assert worker_motor('bag') is worker_motor('bag')
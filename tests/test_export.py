@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+
+import json
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from frc_rekt import export
+from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.motor import Motor
+
+
+@pytest.fixture(scope='module')
+def table():
+    return export.coefficient_table(
+        curves={
+            'limit': export.polynomial_entry([1.0, -0.5, 0.25]),
+            'envelope': export.piecewise_entry([2.0, 10.0],
+                                               [[0.5, 0.1], [0.6], [1.0]])
+        })
+
+
+def test_table(table):
+    assert table['version'] == export.EXPORT_VERSION
+    assert list(table['motors']) == ['cim', 'mini-cim', '775pro', 'bag']
+    assert list(table['main_breaker']) == [
+        'rated_current', 'trip_time_min', 'trip_time_max', 'temp_derate_min',
+        'temp_derate_max'
+    ]
+    assert list(table['curves']) == ['envelope', 'limit']
+
+
+def test_motor_round_trip(table):
+    speed = np.linspace(0.0, 80.0, 50)
+    voltage = np.linspace(0.5, 12.0, 50)
+    motors = json.loads(export.to_json(table))['motors']
+    for motor_type, entries in motors.items():
+        motor = Motor(motor_type)
+        scaled = speed * entries['curve_voltage'] / voltage
+        current = (export.evaluate(entries['voltage_scaled_current'], voltage)
+                   * export.evaluate(entries['current_func'], scaled))
+        torque = (export.evaluate(entries['voltage_scaled_torque'], voltage) *
+                  export.evaluate(entries['torque_func'], scaled))
+        assert np.allclose(current, motor.current(speed, voltage), rtol=1e-12)
+        assert np.allclose(torque, motor.torque(speed, voltage), rtol=1e-12)
+
+
+def test_breaker_round_trip(table, tmpdir):
+    path = str(tmpdir.join('coefficients.json'))
+    export.to_json(table, path)
+    with open(path) as json_file:
+        entries = json.load(json_file)['main_breaker']
+    breaker = MainBreaker()
+    current = np.linspace(1.5, 7.0, 30)
+    temp = np.linspace(-40.0, 80.0, 30)
+    for name, x in [('trip_time_min', current), ('trip_time_max', current),
+                    ('temp_derate_min', temp), ('temp_derate_max', temp)]:
+        assert np.allclose(
+            export.evaluate(entries[name], x),
+            getattr(breaker, name)(x),
+            rtol=1e-12)
+
+
+def test_entries():
+    assert export.evaluate(export.polynomial_entry([2]), 3.0) == 2.0
+    with pytest.raises(ValueError):
+        export.power_entry([1, 2, 3])
+    with pytest.raises(ValueError):
+        export.piecewise_entry([], [[1.0]])
+    with pytest.raises(ValueError):
+        export.evaluate({'kind': 'spline'}, 1.0)
+    entry = export.piecewise_entry([0.0], [[0.0, 1.0], [2.0]])
+    assert list(export.evaluate(entry, np.array([-1.0, 0.0]))) == [-1.0, 2.0]
+
+
+def test_identifiers(table):
+    names = [name for name, _ in export._constants(table)]
+    assert 'MOTOR_MINI_CIM_CURRENT_FUNC' in names
+    assert 'MOTOR_775PRO_CURVE_VOLTAGE' in names
+    assert 'MAIN_BREAKER_TRIP_TIME_MIN' in names
+    assert 'CURVE_LIMIT' in names
+    assert 'CURVE_ENVELOPE_BREAKS' in names
+    assert 'CURVE_ENVELOPE_PIECES' in names
+    assert len(names) == len(set(names))
+
+
+def test_java(table, tmpdir):
+    path = tmpdir.join('Coefficients.java')
+    text = export.to_java(table, str(path), 'Coefficients', 'frc.robot')
+    assert path.read() == text
+    assert text.startswith('package frc.robot;\n')
+    assert 'public final class Coefficients {' in text
+    coefs = table['motors']['cim']['current_func']['coefs']
+    assert 'double[] MOTOR_CIM_CURRENT_FUNC = {{{0}}};'.format(', '.join(
+        repr(coef) for coef in coefs)) in text
+    assert 'double[][] CURVE_ENVELOPE_PIECES = {{0.5, 0.1}, {0.6, 0.0}, {1.0, 0.0}};' in text
+    assert 'package' not in export.to_java(table)
+
+
+CPP_MAIN = '''#include <cstdio>
+#include "coefficients.h"
+
+int main() {
+    using namespace frc_rekt;
+    const double xs[] = {0.5, 2.0, 7.5, 13.0};
+    for (double x : xs) {
+        std::printf("%.17g %.17g %.17g %.17g %.17g\\n",
+                    motor(MOTOR_CIM_CURRENT_FUNC, MOTOR_CIM_VOLTAGE_SCALED_CURRENT,
+                          MOTOR_CIM_CURVE_VOLTAGE, x * 5.0, x),
+                    power(MAIN_BREAKER_TRIP_TIME_MIN, x),
+                    horner(MAIN_BREAKER_TEMP_DERATE_MAX, x * 5.0),
+                    horner(CURVE_LIMIT, x),
+                    piecewise(CURVE_ENVELOPE_BREAKS, CURVE_ENVELOPE_PIECES, x));
+    }
+    return 0;
+}
+'''
+
+
+@pytest.mark.skipif(not shutil.which('g++'), reason='needs a C++ compiler')
+def test_cpp_round_trip(table, tmpdir):
+    export.to_cpp(table, str(tmpdir.join('coefficients.h')))
+    tmpdir.join('main.cpp').write(CPP_MAIN)
+    binary = str(tmpdir.join('main'))
+    subprocess.check_call(
+        ['g++', '-std=c++11', '-Wall', '-Werror', '-o', binary,
+         str(tmpdir.join('main.cpp'))])
+    output = subprocess.check_output([binary]).decode()
+    values = np.array([line.split() for line in output.splitlines()],
+                      dtype=float)
+    x = np.array([0.5, 2.0, 7.5, 13.0])
+    motor = Motor('cim')
+    with np.errstate(invalid='ignore'):
+        expected = np.column_stack([
+            motor.current(x * 5.0, x),
+            export.evaluate(table['main_breaker']['trip_time_min'], x),
+            export.evaluate(table['main_breaker']['temp_derate_max'],
+                            x * 5.0),
+            export.evaluate(table['curves']['limit'], x),
+            export.evaluate(table['curves']['envelope'], x)
+        ])
+    assert np.allclose(values, expected, rtol=1e-12, equal_nan=True)
@@ -1,7 +1,7 @@
 # -*- coding: UTF-8 -*-
 import pytest
 
-from frc_rekt.gearbox import Gearbox
+from frc_rekt.gearbox import Gearbox, gear_ratio
 
 
 def test_init():
@@ -12,3 +12,13 @@ def test_init():
 @pytest.fixture
 def gearbox():
     return Gearbox()
+
+
+def test_properties(gearbox):
+    assert len(gearbox.motors) == 3
+    assert gearbox.efficiency == 0.8
+
+
+def test_gear_ratio():
+    assert gear_ratio([(12, 60)]) == 5.0
+    assert gear_ratio([]) == 1.0
@@ -0,0 +1,177 @@
+# -*- coding: UTF-8 -*-
+import itertools
+import logging
+
+import numpy as np
+import pytest
+
+from frc_rekt.gearbox import gear_ratio
+from frc_rekt.gearing import (CATALOG, DriveTimeScore, GearSearch, _combine,
+                              _range_min, stage_pairs)
+
+SMALL_CATALOG = [
+    (range(10, 15), range(30, 61, 3)),
+    (range(12, 19), range(24, 49, 4)),
+    (range(12, 19), range(24, 49, 4)),
+]
+
+
+def near_eight(mechanical_advantage):
+    # Best at 8:1, so the best designs are not at an end of the range
+    return (np.log(mechanical_advantage) - np.log(8.0))**2
+
+
+class TabulatedNearEight(object):
+    # near_eight interpolated in log ratio, so the search can be pruned. 8:1
+    # is a table point, so designs can reach the table's minimum.
+    log_ratio = np.log(8.0) + np.arange(-16, 17) * 0.02
+
+    def __call__(self, mechanical_advantage):
+        return np.interp(
+            np.log(mechanical_advantage), self.log_ratio,
+            near_eight(np.exp(self.log_ratio)))
+
+
+class LowestRatio(object):
+    # Linear in log ratio from 6:1 up, like a drive time score
+    log_ratio = np.log([6.0, 11.0])
+
+    def __call__(self, mechanical_advantage):
+        return np.log(mechanical_advantage) - np.log(6.0)
+
+
+@pytest.fixture(scope='module')
+def score():
+    return DriveTimeScore(5.0, 15.0, points=16)
+
+
+def brute_force(catalog, min_ratio, max_ratio, func, stage_counts):
+    designs = []
+    stages = [stage_pairs(drivers, driven) for drivers, driven in catalog]
+    for count in stage_counts:
+        pairs = [
+            list(zip(stage.driver.tolist(), stage.driven.tolist()))
+            for stage in stages[:count]
+        ]
+        for design in itertools.product(*pairs):
+            ratio = gear_ratio(design)
+            if min_ratio - 1e-9 <= ratio <= max_ratio + 1e-9:
+                teeth = sum(driver + driven for driver, driven in design)
+                designs.append((round(float(func(ratio)), 9), teeth))
+    return sorted(designs)
+
+
+def test_stage_pairs():
+    stage = stage_pairs(range(10, 15), range(20, 80), 2.0, 5.0)
+    ratio = stage.driven / stage.driver.astype(float)
+    assert np.all((ratio >= 2.0) & (ratio <= 5.0))
+    assert np.all(np.diff(stage.log_ratio) >= 0)
+    assert np.allclose(np.exp(stage.log_ratio), ratio)
+    assert len(stage.driver) == sum(
+        1 for a in range(10, 15) for b in range(20, 80) if 2 <= b / a <= 5)
+
+
+def test_combine():
+    stages = [stage_pairs(*pair) for pair in SMALL_CATALOG[:2]]
+    log_ratio, teeth, indexes = _combine(stages)
+    assert len(log_ratio) == len(stages[0].driver) * len(stages[1].driver)
+    assert np.all(np.diff(log_ratio) >= 0)
+    assert np.allclose(
+        log_ratio, stages[0].log_ratio[indexes[:, 0]] +
+        stages[1].log_ratio[indexes[:, 1]])
+    assert np.array_equal(
+        teeth, stages[0].driver[indexes[:, 0]] +
+        stages[0].driven[indexes[:, 0]] + stages[1].driver[indexes[:, 1]] +
+        stages[1].driven[indexes[:, 1]])
+    # No stages is the one empty combination
+    log_ratio, teeth, indexes = _combine([])
+    assert log_ratio.tolist() == [0.0] and indexes.shape == (1, 0)
+
+
+def test_range_min():
+    values = np.array([3.0, 1.0, 4.0, 1.5, 5.0])
+    start = np.array([0, 2, 3, 4, 5])
+    stop = np.array([5, 4, 3, 5, 5])
+    assert _range_min(values, start, stop).tolist() == [
+        1.0, 1.5, np.inf, 5.0, np.inf
+    ]
+
+
+def test_drive_time_score(score):
+    assert score.time.shape == (16, )
+    assert np.all(np.isfinite(score.time))
+    assert score(np.exp(score.log_ratio[3])) == score.time[3]
+    slow = DriveTimeScore(5.0, 15.0, points=4, max_time=0.5)
+    assert np.all(np.isinf(slow.time))
+
+
+@pytest.mark.parametrize('stage_counts', [[1], [2], [3], [1, 2, 3]])
+def test_search_matches_brute_force(stage_counts):
+    search = GearSearch(6.0, 11.0, SMALL_CATALOG, score=near_eight)
+    designs = search.search(12, stage_counts)
+    expected = brute_force(SMALL_CATALOG, 6.0, 11.0, near_eight,
+                           stage_counts)[:12]
+    assert len(designs) == len(expected)
+    assert np.allclose(designs['score'], [row[0] for row in expected])
+    assert designs['total_teeth'].tolist() == [row[1] for row in expected]
+    for _, design in designs.iterrows():
+        assert design['stages'] == len(design['gears'])
+        assert design['mechanical_advantage'] == pytest.approx(
+            gear_ratio(design['gears']))
+        assert design['score'] == pytest.approx(
+            near_eight(design['mechanical_advantage']))
+
+
+@pytest.mark.parametrize('target', [7.3, 8.77, 9.123])
+def test_search_sharp_score(target):
+    # Dips between any sample points, so must not be pruned on samples
+    def sharp(mechanical_advantage):
+        return np.abs(np.log(mechanical_advantage) - np.log(target))**0.5
+
+    designs = GearSearch(6.0, 11.0, SMALL_CATALOG, score=sharp).search(5)
+    expected = brute_force(SMALL_CATALOG, 6.0, 11.0, sharp, [1, 2, 3])[:5]
+    assert np.allclose(designs['score'], [row[0] for row in expected])
+    assert designs['total_teeth'].tolist() == [row[1] for row in expected]
+
+
+def test_search_tabulated_matches_brute_force():
+    score = TabulatedNearEight()
+    designs = GearSearch(6.0, 11.0, SMALL_CATALOG, score=score).search(12)
+    expected = brute_force(SMALL_CATALOG, 6.0, 11.0, score, [1, 2, 3])[:12]
+    assert np.allclose(designs['score'], [row[0] for row in expected])
+    assert designs['total_teeth'].tolist() == [row[1] for row in expected]
+
+
+def test_search_prunes(caplog):
+    caplog.set_level(logging.DEBUG, logger='frc_rekt.gearing')
+    designs = GearSearch(6.0, 11.0, score=LowestRatio()).search(5)
+    assert len(designs) == 5
+    assert np.allclose(designs['mechanical_advantage'], 6.0)
+    messages = [
+        record.getMessage() for record in caplog.records
+        if 'expanded' in record.getMessage()
+    ]
+    assert len(messages) == len(CATALOG)
+    expanded, total = [
+        int(word) for word in messages[-1].split() if word.isdigit()
+    ][1:]
+    assert expanded < total / 100
+
+
+def test_search_drive_time(score):
+    designs = GearSearch(5.0, 15.0, SMALL_CATALOG[:2], score=score).search(3)
+    # Faster robots first
+    assert np.all(np.diff(designs['score']) >= 0)
+    best = brute_force(SMALL_CATALOG[:2], 5.0, 15.0, score, [1, 2])[0][0]
+    assert designs['score'][0] == pytest.approx(best)
+    default = GearSearch(5.0, 15.0, SMALL_CATALOG[:1])
+    assert isinstance(default.score, DriveTimeScore)
+
+
+def test_search_unreachable():
+    designs = GearSearch(100.0, 200.0, SMALL_CATALOG[:1],
+                         score=near_eight).search()
+    assert designs.empty
+    assert list(designs.columns) == [
+        'gears', 'stages', 'mechanical_advantage', 'total_teeth', 'score'
+    ]
@@ -0,0 +1,48 @@
+# -*- coding: UTF-8 -*-
+
+import subprocess
+import sys
+
+import pytest
+
+# Milliseconds, on top of numpy and pandas
+IMPORT_BUDGET = 150
+
+SLOW_MODULES = ['matplotlib', 'scipy', 'magic']
+
+
+def import_times(module):
+    """Cumulative import time in us of everything imported by module."""
+    output = subprocess.run(
+        [
+            sys.executable, '-X', 'importtime', '-c',
+            'import numpy, pandas; import {0}'.format(module)
+        ],
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True).stderr
+    times = {}
+    for line in output.splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+@pytest.fixture(params=['frc_rekt.motor', 'frc_rekt.main_breaker'])
+def module(request):
+    return request.param
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason='-X importtime needs python 3.7')
+def test_slow_modules_deferred(module):
+    imported = import_times(module)
+    for slow_module in SLOW_MODULES:
+        assert slow_module not in imported
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason='-X importtime needs python 3.7')
+def test_import_budget(module):
+    assert import_times(module)[module] < IMPORT_BUDGET * 1000
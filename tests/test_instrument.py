@@ -0,0 +1,148 @@
+# -*- coding: UTF-8 -*-
+
+import json
+import logging
+import threading
+
+import pytest
+
+from frc_rekt import instrument
+from frc_rekt.instrument import SpanCollector, span, timed
+from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.motor import MOTOR_CACHE, Motor
+
+
+@timed()
+def outer():
+    with span('inner'):
+        pass
+    return 'done'
+
+
+@timed('named')
+def named():
+    pass
+
+
+def test_nothing_collected_by_default():
+    assert instrument._COLLECTORS == []
+    assert outer() == 'done'
+    with span('ignored'):
+        pass
+
+
+def test_spans_nest():
+    with SpanCollector() as collector:
+        outer()
+        named()
+    assert instrument._COLLECTORS == []
+    names = [finished.name for finished in collector.spans]
+    assert names == ['inner', 'outer', 'named']
+    inner, outer_span, _ = collector.spans
+    assert inner.stack == ('outer', 'inner')
+    assert outer_span.stack == ('outer', )
+    assert outer_span.duration >= inner.duration
+    assert outer_span.self_time == pytest.approx(
+        outer_span.duration - inner.duration)
+
+
+def test_span_exception():
+    with SpanCollector() as collector:
+        with pytest.raises(ValueError):
+            with span('failing'):
+                raise ValueError()
+        with span('after'):
+            pass
+    assert [finished.stack for finished in collector.spans] == [
+        ('failing', ), ('after', )
+    ]
+
+
+def test_callback():
+    seen = []
+    instrument.add_collector(seen.append)
+    try:
+        outer()
+    finally:
+        instrument.remove_collector(seen.append)
+    assert [finished.name for finished in seen] == ['inner', 'outer']
+
+
+def test_threads_have_own_stacks():
+    with SpanCollector() as collector:
+        with span('main'):
+            thread = threading.Thread(target=outer)
+            thread.start()
+            thread.join()
+    stacks = {finished.name: finished.stack for finished in collector.spans}
+    assert stacks['outer'] == ('outer', )
+    assert stacks['main'] == ('main', )
+
+
+def test_totals():
+    with SpanCollector() as collector:
+        outer()
+        outer()
+    count, total, self_time = collector.totals()['outer']
+    assert count == 2
+    assert total >= self_time
+
+
+def test_exports(tmpdir):
+    with SpanCollector() as collector:
+        outer()
+        outer()
+    spans = json.loads(collector.to_json(str(tmpdir.join('spans.json'))))
+    assert [entry['name'] for entry in spans] == [
+        'inner', 'outer', 'inner', 'outer'
+    ]
+    assert json.loads(tmpdir.join('spans.json').read()) == spans
+    folded = collector.folded(str(tmpdir.join('spans.folded')))
+    lines = folded.splitlines()
+    assert [line.split(' ')[0] for line in lines] == ['outer;inner', 'outer']
+    assert all(line.split(' ')[1].isdigit() for line in lines)
+    assert tmpdir.join('spans.folded').read() == folded
+
+
+def test_model_construction(monkeypatch):
+    monkeypatch.setattr('frc_rekt.motor.is_fresh', lambda *args: False)
+    MOTOR_CACHE.invalidate()
+    with SpanCollector() as collector:
+        Motor('cim')
+    totals = collector.totals()
+    for name in [
+            'Motor._characterize', 'Motor._get_curve_frame',
+            'Motor._get_stall_frames', 'Motor._generate_functions',
+            'stall_points', 'get_file_encoding'
+    ]:
+        assert name in totals
+    MOTOR_CACHE.invalidate()
+
+
+def test_curve_fit_span(tmpdir, monkeypatch):
+    monkeypatch.setattr(MainBreaker, 'fit_cache_path',
+                        str(tmpdir.join('fit.json')))
+    with SpanCollector() as collector:
+        MainBreaker()
+    stacks = [finished.stack for finished in collector.spans]
+    assert ('MainBreaker._generate_functions', 'MainBreaker._generate_func',
+            'MainBreaker._generate_func_fit',
+            'scipy.optimize.curve_fit') in stacks
+
+
+def test_frames_not_logged_when_off(monkeypatch, caplog, tmpdir):
+    caplog.set_level(logging.INFO)
+    monkeypatch.setattr('frc_rekt.motor.is_fresh', lambda *args: False)
+    MOTOR_CACHE.invalidate()
+    Motor('bag')
+    assert 'Motor Curve' not in caplog.text
+    caplog.set_level(logging.DEBUG)
+    MOTOR_CACHE.invalidate()
+    Motor('bag')
+    assert 'Motor Curve' in caplog.text
+    MOTOR_CACHE.invalidate()
+    monkeypatch.setattr(MainBreaker, 'fit_cache_path',
+                        str(tmpdir.join('fit.json')))
+    MainBreaker()
+    assert 'Opened dataframe' in caplog.text
+    assert 'd_frame to fit' in caplog.text
@@ -1,8 +1,12 @@
 # -*- coding: UTF-8 -*-
 
+import json
+import os
+
+import numpy as np
 import pytest
 
-from frc_rekt.main_breaker import MainBreaker
+from frc_rekt.main_breaker import FIT_CACHE_VERSION, MainBreaker, TripAccumulator
 
 
 def test_init():
@@ -25,3 +29,131 @@ def test_public_functions(main_breaker):
 
     assert main_breaker.temperature_derate(78) == (0.97153542326750275,
                                                    1.2706642035856861)
+
+
+@pytest.fixture
+def fit_cache(tmpdir, monkeypatch):
+    path = str(tmpdir.join('fit.json'))
+    monkeypatch.setattr(MainBreaker, 'fit_cache_path', path)
+    return path
+
+
+def test_fit_cache_skips_curve_fit(fit_cache, monkeypatch):
+    fitted = MainBreaker()
+
+    def curve_fit(*args, **kwargs):
+        raise AssertionError('curve_fit should not run on a cache hit')
+
+    monkeypatch.setattr('scipy.optimize.curve_fit', curve_fit)
+    cached = MainBreaker()
+    assert cached.fit_params == fitted.fit_params
+    assert cached.trip_time(240) == fitted.trip_time(240)
+    assert cached.temperature_derate(78) == fitted.temperature_derate(78)
+
+
+def test_fit_cache_stale(fit_cache):
+    MainBreaker()
+    with open(fit_cache) as cache_file:
+        contents = json.load(cache_file)
+    contents['hash'] = 'stale'
+    contents['fits']['trip_time-min'] = [1, 1, 1, 1, 1]
+    with open(fit_cache, 'w') as cache_file:
+        json.dump(contents, cache_file)
+    refit = MainBreaker()
+    assert refit.fit_params['trip_time-min'] != [1, 1, 1, 1, 1]
+    with open(fit_cache) as cache_file:
+        assert json.load(cache_file)['hash'] != 'stale'
+
+
+def test_fit_cache_replaced_whole(fit_cache, monkeypatch):
+    MainBreaker()
+    replaced = []
+    real_replace = os.replace
+
+    def replace(source, target):
+        # The cache is complete before it is moved into place
+        with open(source) as cache_file:
+            assert json.load(cache_file)['version'] == FIT_CACHE_VERSION
+        replaced.append(target)
+        real_replace(source, target)
+
+    monkeypatch.setattr(os, 'replace', replace)
+    with open(fit_cache, 'w') as cache_file:
+        cache_file.write('not json')
+    MainBreaker()
+    assert replaced == [fit_cache]
+    assert os.listdir(os.path.dirname(fit_cache)) == ['fit.json']
+
+
+def test_fit_cache_corrupt(fit_cache):
+    with open(fit_cache, 'w') as cache_file:
+        cache_file.write('not json')
+    MainBreaker()
+    with open(fit_cache) as cache_file:
+        assert json.load(cache_file)['version'] == FIT_CACHE_VERSION
+
+
+def test_trip_thresholds(main_breaker):
+    assert main_breaker.trip_thresholds['min'] < main_breaker.trip_thresholds[
+        'max']
+
+
+@pytest.fixture
+def accumulator(main_breaker):
+    return TripAccumulator(main_breaker, dt=0.01, ambient_temp=25)
+
+
+def test_accumulator_constant_current(main_breaker, accumulator):
+    accumulator.update(np.full(6000, 240.0))
+    earliest, latest = accumulator.time_to_trip
+    derate = main_breaker.temperature_derate(77)[0]
+    expected = main_breaker.trip_time_min(240 / (120.0 * derate))
+    assert earliest == pytest.approx(expected, abs=0.02)
+    assert np.isnan(latest) or latest > earliest
+    assert 0 < accumulator.trip_probability <= 1
+
+
+def test_accumulator_chunks_match(accumulator, main_breaker):
+    trace = np.abs(np.sin(np.linspace(0, 30, 5000))) * 400
+    whole = TripAccumulator(main_breaker, dt=0.01, ambient_temp=25)
+    whole.update(trace)
+    for chunk in np.array_split(trace, 7):
+        accumulator.update(chunk)
+    accumulator.update([])
+    assert accumulator.heat == pytest.approx(whole.heat)
+    assert accumulator.time_to_trip == pytest.approx(
+        whole.time_to_trip, nan_ok=True)
+    assert accumulator.elapsed == pytest.approx(50.0)
+
+
+def test_accumulator_cools(main_breaker):
+    accumulator = TripAccumulator(main_breaker, dt=0.5, cooling_time=0.5)
+    # block size smaller than the trace exercises the block splitting
+    assert accumulator._block_size < 400
+    accumulator.update(np.full(10, 200.0))
+    heated = accumulator.heat[0]
+    assert 0 < heated < 1
+    accumulator.update(np.zeros(400))
+    assert accumulator.heat[0] == pytest.approx(heated * np.exp(-400))
+    assert accumulator.trip_probability == 0.0
+    assert np.isnan(accumulator.time_to_trip[0])
+
+
+def test_accumulator_certain_trip(main_breaker):
+    accumulator = TripAccumulator(main_breaker, dt=0.01)
+    accumulator.update(np.full(20000, 500.0))
+    assert accumulator.trip_probability == 1.0
+    accumulator.reset()
+    assert accumulator.heat == (0.0, 0.0)
+
+
+def test_accumulator_default_breaker():
+    assert TripAccumulator().update(10.0).heat == (0.0, 0.0)
+
+
+def test_frames(main_breaker):
+    assert sorted(main_breaker.trip_time_frames) == ['max', 'min']
+    assert sorted(main_breaker.temp_derate_frames) == ['max', 'min']
+    frame = main_breaker.trip_time_frames['min']
+    assert main_breaker.trip_thresholds['min'] == frame[str(
+        frame.columns[0])].min()
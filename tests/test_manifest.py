@@ -0,0 +1,161 @@
+# -*- coding: UTF-8 -*-
+
+import json
+import os
+import sys
+
+import pytest
+
+from frc_rekt import manifest
+from frc_rekt.helpers import get_file_encoding
+
+
+@pytest.fixture
+def data_folder(tmpdir, monkeypatch):
+    manifest.clear()
+    folder = tmpdir.mkdir('data')
+    monkeypatch.setattr(manifest, 'DATA_ROOT', str(folder))
+    folder.join('curve.csv').write_binary(
+        'Speed (RPM),Torque (N·m)\n1,2\n'.encode('utf-8'))
+    folder.mkdir('sheets').join('sheet.csv').write('# comment\nx,y\n1,2\n')
+    folder.join('notes.txt').write('not data')
+    yield folder
+    manifest.clear()
+
+
+@pytest.mark.parametrize('data,encoding', [
+    (b'x,y\n', 'us-ascii'),
+    ('x,N·m\n'.encode('utf-8'), 'utf-8'),
+    ('x,N·m\n'.encode('latin-1'), 'iso-8859-1'),
+    ('x\n'.encode('utf-16le').join([b'\xff\xfe', b'']), 'utf-16le'),
+    (b'\xfe\xff\x00x', 'utf-16be'),
+])
+def test_sniff_encoding(data, encoding):
+    assert manifest.sniff_encoding(data) == encoding
+
+
+def test_file_entry(data_folder):
+    entry = manifest.file_entry(str(data_folder.join('sheets', 'sheet.csv')))
+    assert entry['encoding'] == 'us-ascii'
+    assert entry['columns'] == ['x', 'y']
+    assert entry['size'] == 18
+    assert len(entry['sha256']) == 64
+
+
+def test_file_entry_without_magic(data_folder, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'magic', None)
+    entry = manifest.file_entry(str(data_folder.join('curve.csv')))
+    assert entry['encoding'] == 'utf-8'
+    assert entry['columns'] == ['Speed (RPM)', 'Torque (N·m)']
+
+
+def test_file_entry_undecodable(data_folder, monkeypatch):
+    monkeypatch.setattr(manifest, '_detect_encoding',
+                        lambda file_path, data: 'binary')
+    entry = manifest.file_entry(str(data_folder.join('curve.csv')))
+    assert entry['encoding'] == 'binary'
+    assert entry['columns'] == []
+
+
+def test_build_manifest(data_folder):
+    entries = manifest.build_manifest(str(data_folder))
+    assert sorted(entries) == ['curve.csv', 'sheets/sheet.csv']
+    with open(str(data_folder.join(manifest.MANIFEST_NAME))) as manifest_file:
+        assert json.load(manifest_file)['files'] == entries
+
+
+def test_lookup_uses_manifest(data_folder, monkeypatch):
+    manifest.build_manifest(str(data_folder))
+    manifest.clear()
+
+    def file_entry(file_path):
+        raise AssertionError('{0} should come from the manifest'.format(
+            file_path))
+
+    monkeypatch.setattr(manifest, 'file_entry', file_entry)
+    sheet = str(data_folder.join('sheets', 'sheet.csv'))
+    assert get_file_encoding(sheet) == 'us-ascii'
+    assert manifest.lookup(sheet)['columns'] == ['x', 'y']
+
+
+def test_lookup_stale(data_folder):
+    manifest.build_manifest(str(data_folder))
+    manifest.clear()
+    data_folder.join('curve.csv').write('a,b,c\n')
+    entry = manifest.lookup(str(data_folder.join('curve.csv')))
+    assert entry['columns'] == ['a', 'b', 'c']
+    assert entry['encoding'] == 'us-ascii'
+
+
+def test_lookup_same_size_edit(data_folder):
+    manifest.build_manifest(str(data_folder))
+    manifest.clear()
+    sheet = data_folder.join('sheets', 'sheet.csv')
+    stamp = os.path.getmtime(str(sheet))
+    sheet.write('# comment\nu,v\n1,2\n')
+    os.utime(str(sheet), (stamp + 10, stamp + 10))
+    entry = manifest.lookup(str(sheet))
+    assert entry['columns'] == ['u', 'v']
+    assert entry['mtime'] == stamp + 10
+
+
+def test_lookup_touched(data_folder, monkeypatch):
+    manifest.build_manifest(str(data_folder))
+    manifest.clear()
+    sheet = str(data_folder.join('sheets', 'sheet.csv'))
+    stamp = os.path.getmtime(sheet)
+    os.utime(sheet, (stamp + 10, stamp + 10))
+    monkeypatch.setattr(manifest, 'file_entry', None)
+    # Same contents, so the entry stands with the new mtime
+    assert manifest.lookup(sheet)['columns'] == ['x', 'y']
+    assert manifest.lookup(sheet)['mtime'] == stamp + 10
+
+
+def test_lookup_stops_at_data_root(data_folder, tmpdir):
+    # A manifest above the data root is not this data's
+    tmpdir.join(manifest.MANIFEST_NAME).write(
+        json.dumps({'version': manifest.MANIFEST_VERSION, 'files': {
+            'data/curve.csv': {'size': 0}
+        }}))
+    entry = manifest.lookup(str(data_folder.join('curve.csv')))
+    assert entry['encoding'] == 'utf-8'
+    assert str(tmpdir) not in manifest._MANIFESTS
+
+
+def test_lookup_outside_data_root(data_folder, tmpdir):
+    outside = tmpdir.mkdir('outside')
+    outside.mkdir('nested').join('other.csv').write('p,q\n')
+    outside.join(manifest.MANIFEST_NAME).write(
+        json.dumps({'version': manifest.MANIFEST_VERSION, 'files': {}}))
+    entry = manifest.lookup(str(outside.join('nested', 'other.csv')))
+    assert entry['columns'] == ['p', 'q']
+    assert str(outside) not in manifest._MANIFESTS
+
+
+def test_lookup_without_manifest(data_folder, monkeypatch):
+    sheet = str(data_folder.join('sheets', 'sheet.csv'))
+    assert manifest.lookup(sheet)['columns'] == ['x', 'y']
+    monkeypatch.setattr(manifest, 'file_entry', None)
+    # Memoized for the rest of the process
+    assert manifest.lookup(sheet)['columns'] == ['x', 'y']
+    assert not data_folder.join('sheets', manifest.MANIFEST_NAME).check()
+
+
+@pytest.mark.parametrize('contents', [
+    'not json',
+    json.dumps({'version': manifest.MANIFEST_VERSION + 1, 'files': {
+        'curve.csv': {'size': 0}
+    }}),
+])
+def test_lookup_bad_manifest(data_folder, contents):
+    data_folder.join(manifest.MANIFEST_NAME).write(contents)
+    entry = manifest.lookup(str(data_folder.join('curve.csv')))
+    assert entry['encoding'] == 'utf-8'
+
+
+def test_data_sheets_manifest():
+    manifest.clear()
+    entry = manifest.lookup(
+        'data/data_sheets/120-main-breaker-trip_time-min.csv')
+    assert entry == manifest.file_entry(
+        'data/data_sheets/120-main-breaker-trip_time-min.csv')
@@ -0,0 +1,90 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+import pytest
+
+from frc_rekt.battery import Battery
+from frc_rekt.drivetrain import Drivetrain
+from frc_rekt.motion import MotionProfiler
+from frc_rekt.simulation import GRAVITY
+from frc_rekt.sweep import drive_to_distance
+from frc_rekt.wheel import Wheel
+
+
+@pytest.fixture(scope='module')
+def profiler():
+    return MotionProfiler()
+
+
+def test_limits(profiler):
+    assert profiler.velocity[0] == 0.0
+    assert np.all(profiler.max_acceleration >= 0)
+    assert np.all(np.diff(profiler.max_acceleration) <= 1e-9)
+    # Traction bounds both
+    traction = 1.3 * GRAVITY
+    assert profiler.max_acceleration[0] == pytest.approx(traction)
+    assert np.all(profiler.max_deceleration <= traction + 1e-9)
+
+
+def test_profile(profiler):
+    profile = profiler.generate(5.0)
+    assert profile.position.shape == (201, )
+    assert profile.position[-1] == 5.0
+    assert profile.velocity[0] == 0.0 and profile.velocity[-1] == 0.0
+    assert np.all(profile.velocity <= profiler.velocity[-1])
+    assert np.all(np.diff(profile.time) > 0)
+    assert profile.acceleration.shape == (200, )
+    # Accelerate as hard as allowed, then brake as hard as allowed
+    limit = np.interp(profile.velocity[:-1], profiler.velocity,
+                      profiler.max_acceleration)
+    assert np.all(profile.acceleration <= limit + 1e-9)
+    braking = np.interp(profile.velocity[1:], profiler.velocity,
+                        profiler.max_deceleration)
+    assert np.all(-profile.acceleration <= braking + 1e-9)
+
+
+def test_matches_simulation(profiler):
+    # With nothing to stop for, the profile is full throttle
+    profile = profiler.generate(5.0, steps=1000, end_velocity=None)
+    simulated = drive_to_distance(profiler.plant, 5.0, dt=0.001)[0]
+    assert profile.time[-1] == pytest.approx(simulated[0], rel=0.01)
+
+
+def test_batch(profiler):
+    distance = np.array([0.0, 0.5, 3.0, 8.0])
+    batch = profiler.generate(
+        distance, steps=50, start_velocity=[0, 1, 0, 2], max_velocity=2.5)
+    assert batch.velocity.shape == (51, 4)
+    assert batch.time[-1, 0] == 0.0
+    assert np.all(batch.velocity <= 2.5)
+    for index in range(1, 4):
+        single = profiler.generate(
+            distance[index],
+            steps=50,
+            start_velocity=[0, 1, 0, 2][index],
+            max_velocity=2.5)
+        assert np.allclose(batch.velocity[:, index], single.velocity)
+        assert np.allclose(batch.time[:, index], single.time)
+    # Longer drives take longer
+    assert np.all(np.diff(batch.time[-1]) > 0)
+
+
+def test_traction_and_brownout():
+    slick = MotionProfiler(Drivetrain(wheel=Wheel(cof=0.6)))
+    assert slick.max_acceleration[0] == pytest.approx(0.6 * GRAVITY)
+    worn = MotionProfiler(battery=Battery(internal_resistance=0.03))
+    # The brownout envelope holds back a worn battery
+    assert worn.max_acceleration[0] < 1.3 * GRAVITY
+    assert worn.generate(5.0).time[-1] > MotionProfiler().generate(
+        5.0).time[-1]
+
+
+def test_brownout_limit_at_speed():
+    worn = MotionProfiler(battery=Battery(internal_resistance=0.03))
+    # The pwm limit is the envelope's at each velocity, not at stall
+    motor_speed = worn.velocity * worn.plant.speed_ratio
+    pwm = worn.envelope.solve(motor_speed=motor_speed)
+    limited = np.flatnonzero((pwm < 1.0) & (worn.velocity > 0.5))
+    assert len(limited) and pwm[limited[0]] > pwm[0]
+    bus_voltage = worn.envelope.battery.voltage(0.0)
+    expected = worn.plant.step(worn.velocity, pwm, bus_voltage, 8)[0]
+    assert np.allclose(worn.max_acceleration, np.maximum(expected, 0.0))
@@ -1,8 +1,11 @@
 # -*- coding: UTF-8 -*-
 # pragma: no cover
+import numpy as np
+import pandas as pd
 import pytest
 
-from frc_rekt.motor import Motor
+from frc_rekt.motor import (MOTOR_CACHE, Motor, motor_current, stall_points,
+                            motor_current_slope, stack_coefficients)
 
 
 @pytest.fixture(params=['cim', 'mini-cim', 'bag', '775pro'])
@@ -37,3 +40,149 @@ def test_get_voltage_scaled_current(motor):
 
 def test_get_voltage_scaled_torque(motor):
     motor._gen_voltage_scaled_func('torque', plot=True)
+
+
+def test_voltage_scaled_frame_predict(motor, monkeypatch):
+    # DataFrame.append is gone from pandas 2
+    monkeypatch.delattr(pd.DataFrame, 'append', raising=False)
+    frame, percent_label = motor.voltage_scaled_frame('current', predict=True)
+    assert frame['voltage'].tolist()[-2:] == [13, 14]
+    assert frame[percent_label].isnull().tolist()[-2:] == [True, True]
+    assert len(frame) == len(motor.stall_points) + 2
+
+
+def test_characterization_shared(motor_types):
+    first = Motor(motor_types)
+    second = Motor(motor_types)
+    assert first.current_func is second.current_func
+    assert first.stall_frames is second.stall_frames
+
+
+def test_characterization_invalidated(motor_types):
+    first = Motor(motor_types)
+    MOTOR_CACHE.invalidate(motor_types)
+    second = Motor(motor_types)
+    assert first.torque_func is not second.torque_func
+
+
+def test_evaluate(motor):
+    speed = motor.curve_frame['speed'].values
+    points = motor.evaluate(speed, np.full(len(speed), 12.0))
+    scale = motor.voltage_scaled_current(12.0)
+    assert np.allclose(points.current, motor.current_func(speed) * scale)
+    assert np.allclose(points.supplied_power, points.current * 12.0)
+    assert np.allclose(points.power_dissipation,
+                       points.supplied_power - points.output_power)
+    assert points.efficiency.max() < 1.0
+
+
+def test_evaluate_unpowered(motor):
+    points = motor.evaluate([0.0, 10.0], [0.0, 0.0])
+    for values in points:
+        assert np.all(values == 0.0)
+
+
+def test_scalar_matches_array(motor):
+    points = motor.evaluate([20.0], [6.0])
+    assert np.isclose(motor.current(20.0, 6.0), points.current[0])
+    assert np.isclose(motor.torque(20.0, 6.0), points.torque[0])
+    assert isinstance(motor.current(20.0, 6.0), float)
+
+
+def test_stack_coefficients():
+    motors = [Motor('cim'), Motor('bag')]
+    stacked = stack_coefficients([m.coefficients for m in motors])
+    speed = np.array([10.0, 10.0])
+    voltage = np.array([9.0, 9.0])
+    current = motor_current(stacked, speed, voltage)
+    assert current[0] == pytest.approx(motors[0].current(10.0, 9.0))
+    assert current[1] == pytest.approx(motors[1].current(10.0, 9.0))
+
+
+def test_current_slope(motor):
+    current, slope = motor_current_slope(motor.coefficients, 30.0, 8.0)
+    assert current == pytest.approx(motor.current(30.0, 8.0))
+    numeric = (motor.current(30.0, 8.0 + 1e-5) -
+               motor.current(30.0, 8.0 - 1e-5)) / 2e-5
+    assert slope == pytest.approx(numeric, rel=1e-4)
+
+
+def test_tabulated(motor_types):
+    motor = Motor(motor_types)
+    tabulated = Motor(motor_types, tabulated=True, tolerance=1e-6)
+    voltage = np.linspace(0.0, 24.0, 97)
+    assert np.allclose(
+        tabulated.voltage_scaled_current(voltage),
+        motor.voltage_scaled_current(voltage),
+        atol=1e-5)
+    assert np.isclose(
+        tabulated.voltage_scaled_torque(6.5),
+        motor.voltage_scaled_torque(6.5),
+        atol=1e-5)
+    assert tabulated.coefficients == motor.coefficients
+    # Arrays are left to the fits, the tables only pay off on scalars
+    assert tabulated.voltage_scaled_current.scalars_only
+
+
+def iterrows_stall_points(stall_frames):
+    # The original row by row search of rows 1 to 9
+    rows = [[0, 0.0, 0.0, 0.0, 0.0]]
+    for test_v in sorted(stall_frames):
+        head = stall_frames[test_v].iloc[1:10]
+        max_power_index = 0
+        max_power = 0
+        for index, row in head.iterrows():
+            power = row['current'] * row['voltage']
+            if power > max_power:
+                max_power_index = index
+                max_power = power
+        picked = stall_frames[test_v].iloc[max_power_index]
+        rows.append([test_v] + [
+            picked[column]
+            for column in ['time', 'current', 'voltage', 'torque']
+        ])
+    return np.array(rows, dtype=float)
+
+
+def test_stall_points(motor):
+    points = motor.stall_points
+    assert list(points.columns) == [
+        'test_voltage', 'time', 'current', 'voltage', 'torque'
+    ]
+    assert np.allclose(points.values,
+                       iterrows_stall_points(motor.stall_frames))
+    assert motor.stall_points is points
+
+
+def test_stall_points_window(motor):
+    frames = motor.stall_frames
+    first_rows = stall_points(frames, window=(0, 1))
+    assert np.allclose(first_rows['current'].values[1:],
+                       [frames[v]['current'].iloc[0] for v in sorted(frames)])
+    # Windows past the end of a test only search the rows it has
+    whole = stall_points(frames, window=(0, 100000))
+    assert np.allclose(whole['current'].values[1:], [
+        frames[v]['current'].iloc[(frames[v]['current'] * frames[v]['voltage']
+                                   ).values.argmax()] for v in sorted(frames)
+    ])
+
+
+def test_stall_points_no_power(motor):
+    frames = {
+        voltage: frame.assign(current=0.0)
+        for voltage, frame in motor.stall_frames.items()
+    }
+    points = stall_points(frames)
+    assert np.allclose(points['time'].values[1:],
+                       [frames[v]['time'].iloc[0] for v in sorted(frames)])
+
+
+def test_stall_window(motor_types):
+    default = Motor(motor_types)
+    windowed = Motor(motor_types, stall_window=(1, 4))
+    assert windowed.stall_window == (1, 4)
+    assert Motor(motor_types).current_func is default.current_func
+    assert windowed.voltage_scaled_current is not (
+        default.voltage_scaled_current)
+    with pytest.raises(ValueError):
+        windowed.compile_profile()
@@ -0,0 +1,106 @@
+# -*- coding: UTF-8 -*-
+import os
+
+import numpy as np
+import pytest
+
+from frc_rekt.motor import MOTOR_CACHE, Motor
+from frc_rekt.profile import PROFILE_VERSION, is_fresh, load_profile, save_profile
+
+
+@pytest.fixture
+def motor():
+    return Motor('cim')
+
+
+def characterization(motor):
+    characterization = {
+        'curve_frame': motor.curve_frame,
+        'stall_frames': motor.stall_frames
+    }
+    for name in motor._function_names:
+        characterization[name] = getattr(motor, name)
+    return characterization
+
+
+def test_round_trip(motor, tmpdir):
+    path = str(tmpdir.join('cim-profile.npz'))
+    save_profile(path, characterization(motor))
+    loaded = load_profile(path)
+    curve_frame = loaded['curve_frame']()
+    assert np.allclose(curve_frame.values, motor.curve_frame.values)
+    assert list(curve_frame.columns) == list(motor.curve_frame.columns)
+    stall_frames = loaded['stall_frames']()
+    for voltage, frame in motor.stall_frames.items():
+        columns = stall_frames[voltage].columns
+        assert np.allclose(stall_frames[voltage].values, frame[columns].values)
+    assert np.allclose(loaded['voltage_scaled_torque'].coef,
+                       motor.voltage_scaled_torque.coef)
+
+
+def test_stale_version(motor, tmpdir, monkeypatch):
+    path = str(tmpdir.join('cim-profile.npz'))
+    save_profile(path, characterization(motor))
+    monkeypatch.setattr('frc_rekt.profile.PROFILE_VERSION',
+                        PROFILE_VERSION + 1)
+    assert load_profile(path) is None
+
+
+def test_is_fresh(tmpdir):
+    data_file = tmpdir.join('data.csv')
+    data_file.write('a,b\n')
+    profile = tmpdir.join('profile.npz')
+    assert not is_fresh(str(profile), [str(data_file)])
+    profile.write('')
+    stamp = os.stat(str(data_file)).st_mtime
+    os.utime(str(profile), (stamp + 10, stamp + 10))
+    assert is_fresh(str(profile), [str(data_file)])
+    os.utime(str(data_file), (stamp + 20, stamp + 20))
+    assert not is_fresh(str(profile), [str(data_file)])
+
+
+def test_motor_loads_profile(motor, tmpdir, monkeypatch):
+    # Compiled into tmpdir, so the data folder's own profile is untouched
+    path = os.path.join(str(tmpdir), 'cim-profile.npz')
+    monkeypatch.setattr('frc_rekt.motor.profile_path',
+                        lambda motor_type, data_folder: path)
+    assert motor.compile_profile() == path
+    MOTOR_CACHE.invalidate('cim')
+    loaded = Motor('cim')
+    assert loaded.current_func is not motor.current_func
+    assert np.allclose(loaded.current_func.coef, motor.current_func.coef)
+    assert np.allclose(loaded.curve_frame.values, motor.curve_frame.values)
+    assert loaded.stall_frames.keys() == motor.stall_frames.keys()
+    MOTOR_CACHE.invalidate('cim')
+
+
+def test_motor_skips_truncated_profile(motor, tmpdir, monkeypatch):
+    path = os.path.join(str(tmpdir), 'cim-profile.npz')
+    monkeypatch.setattr('frc_rekt.motor.profile_path',
+                        lambda motor_type, data_folder: path)
+    motor.compile_profile()
+    with open(path, 'rb') as profile_file:
+        data = profile_file.read()
+    with open(path, 'wb') as profile_file:
+        profile_file.write(data[:len(data) // 2])
+    MOTOR_CACHE.invalidate('cim')
+    loaded = Motor('cim')
+    assert np.allclose(loaded.current_func.coef, motor.current_func.coef)
+    MOTOR_CACHE.invalidate('cim')
+
+
+def test_save_profile_replaced_whole(motor, tmpdir, monkeypatch):
+    path = str(tmpdir.join('cim-profile.npz'))
+    replaced = []
+
+    def replace(source, destination):
+        replaced.append((source, destination))
+        os.rename(source, destination)
+
+    monkeypatch.setattr('frc_rekt.profile.os.replace', replace)
+    save_profile(path, characterization(motor))
+    (source, destination), = replaced
+    assert destination == path
+    assert os.path.dirname(source) == str(tmpdir)
+    assert tmpdir.listdir() == [tmpdir.join('cim-profile.npz')]
+    assert load_profile(path)['curve_frame']().shape == motor.curve_frame.shape
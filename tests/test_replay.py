@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frc_rekt.battery import Battery
+from frc_rekt.motor import Motor
+from frc_rekt.replay import (LogReplay, ReplayEvent, _motor_current,
+                             read_columns, read_csv, read_log, replay,
+                             write_columns)
+
+SAMPLES = 3000
+
+
+@pytest.fixture(scope='module')
+def cim():
+    return Motor('cim')
+
+
+@pytest.fixture(scope='module')
+def log(cim):
+    """A minute of one motor, with a brownout in the middle."""
+    time = 10.0 + np.arange(SAMPLES) * 0.02
+    speed = np.linspace(0.0, 80.0, SAMPLES)
+    voltage = np.where(np.arange(SAMPLES) % 500 < 250, 12.0, -6.0)
+    current = _motor_current(cim, speed, voltage) + 0.5
+    battery = Battery().voltage(current) - 0.1
+    battery[1000:1100] = 6.0
+    return pd.DataFrame({
+        'time': time,
+        'battery_voltage': battery,
+        'drive_current': current,
+        'drive_speed': speed,
+        'drive_voltage': voltage,
+    })
+
+
+@pytest.fixture
+def csv_log(log, tmpdir):
+    path = os.path.join(str(tmpdir), 'log.csv')
+    log.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def columns_log(log, tmpdir):
+    path = os.path.join(str(tmpdir), 'log')
+    windows = frame_windows(log, 700)
+    assert write_columns(windows, path) == SAMPLES
+    return path
+
+
+def frame_windows(frame, window):
+    for start in range(0, len(frame), window):
+        chunk = frame.iloc[start:start + window]
+        yield {name: chunk[name].values for name in chunk.columns}
+
+
+def test_read_csv(csv_log, log):
+    windows = list(read_csv(csv_log, 1000, ['time', 'drive_current']))
+    assert [len(window['time']) for window in windows] == [1000] * 3
+    assert list(windows[0]) == ['time', 'drive_current']
+    assert np.allclose(
+        np.concatenate([window['drive_current'] for window in windows]),
+        log['drive_current'])
+
+
+def test_read_columns(columns_log, log):
+    windows = list(read_columns(columns_log, 1024))
+    assert [len(window['time']) for window in windows] == [1024, 1024, 952]
+    assert sorted(windows[0]) == sorted(log.columns)
+    # Windows are views into the memory mapped files
+    assert isinstance(windows[0]['time'], np.memmap)
+    assert np.array_equal(
+        np.concatenate([window['time'] for window in windows]), log['time'])
+    assert not [
+        name for name in os.listdir(columns_log) if name.endswith('.raw')
+    ]
+
+
+def test_read_columns_lengths(columns_log):
+    np.save(os.path.join(columns_log, 'extra.npy'), np.zeros(3))
+    with pytest.raises(ValueError):
+        list(read_columns(columns_log))
+    assert len(list(read_columns(columns_log, columns=['time']))) == 1
+
+
+def test_read_log(csv_log, columns_log):
+    csv_windows = list(read_log(csv_log, 1000))
+    columns_windows = list(read_log(columns_log, 1000))
+    for csv_window, columns_window in zip(csv_windows, columns_windows):
+        for name in csv_window:
+            assert np.allclose(csv_window[name], columns_window[name])
+
+
+def test_motor_current(cim):
+    # Reverse voltage mirrors forward
+    assert np.isclose(
+        _motor_current(cim, -20.0, -12.0), -cim.current(20.0, 12.0))
+    assert _motor_current(cim, 0.0, 0.0) == 0.0
+
+
+def test_replay(log, cim):
+    log_replay = LogReplay(motors={'drive': cim})
+    results = list(log_replay.run(frame_windows(log, 512)))
+    residuals = pd.concat([result.residuals for result in results])
+    assert list(residuals.columns) == [
+        'time', 'battery_voltage', 'drive_current'
+    ]
+    assert len(residuals) == SAMPLES
+    assert np.allclose(residuals['drive_current'], 0.5)
+    normal = np.ones(SAMPLES, dtype=bool)
+    normal[1000:1100] = False
+    assert np.allclose(residuals['battery_voltage'][normal], -0.1)
+    summary = log_replay.summary
+    assert list(summary.index) == ['battery_voltage', 'drive_current']
+    assert summary.loc['drive_current', 'count'] == SAMPLES
+    assert np.isclose(summary.loc['drive_current', 'mean'], 0.5)
+    assert np.isclose(summary.loc['drive_current', 'rms'], 0.5)
+    events = [event for result in results for event in result.events]
+    assert events == [ReplayEvent('brownout', 30.0, 32.0, 6.0)]
+
+
+def test_replay_window_invariant(log, cim):
+    # Carried state makes the results independent of the window size
+    results = []
+    for window in [7, 100, SAMPLES]:
+        log_replay = LogReplay(motors={'drive': cim})
+        events = [
+            event for result in log_replay.run(frame_windows(log, window))
+            for event in result.events
+        ]
+        results.append((log_replay.summary, events))
+    for summary, events in results[1:]:
+        assert np.allclose(summary.values, results[0][0].values)
+        assert events == results[0][1]
+
+
+def test_replay_trip():
+    # A stalled drivetrain, then coasting, with no voltage logged
+    current = np.concatenate([np.full(1000, 400.0), np.zeros(200)])
+    log_replay = LogReplay(battery=Battery(internal_resistance=0.001))
+    events = []
+    for start in range(0, len(current), 256):
+        window = {
+            'left_current': current[start:start + 256] / 2,
+            'right_current': current[start:start + 256] / 2
+        }
+        events.extend(log_replay.process(window).events)
+    events.extend(log_replay.finish())
+    kinds = [event.kind for event in events]
+    assert kinds == ['trip_conservative', 'trip_optimistic']
+    earliest, latest = log_replay.accumulator.time_to_trip
+    assert np.isclose(events[0].start, earliest - 0.02)
+    assert np.isclose(events[1].start, latest - 0.02)
+    assert events[0].value == 400.0
+    # Residuals need a voltage or a motor to compare against
+    assert log_replay.summary.empty
+
+
+def test_replay_open_brownout():
+    log_replay = LogReplay()
+    window = {
+        'time': np.arange(10) * 0.02,
+        'total_current': np.zeros(10),
+        'battery_voltage': np.linspace(12.0, 3.0, 10)
+    }
+    # Split so the brownout deepens in the second window
+    for part in [slice(0, 7), slice(7, 10)]:
+        assert log_replay.process(
+            {name: values[part]
+             for name, values in window.items()}).events == []
+    event, = log_replay.finish()
+    assert event.kind == 'brownout'
+    assert np.isclose(event.start, 0.12) and np.isclose(event.end, 0.2)
+    assert event.value == 3.0
+    assert log_replay.finish() == []
+
+
+def test_replay_no_current():
+    with pytest.raises(ValueError):
+        LogReplay().process({'time': np.zeros(3)})
+
+
+def test_replay_file(csv_log, columns_log, cim):
+    csv_summary, csv_events = replay(csv_log, 1000, motors={'drive': cim})
+    columns_summary, columns_events = replay(
+        columns_log, 999, motors={'drive': cim})
+    assert np.allclose(csv_summary.values, columns_summary.values)
+    assert csv_events == columns_events
+    assert len(csv_events) == 1
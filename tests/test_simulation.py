@@ -0,0 +1,49 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+import pytest
+
+from frc_rekt.simulation import GRAVITY, DrivetrainSimulation, clamp
+
+
+def test_clamp():
+    assert clamp(5.0, 2.0) == 2.0
+    assert clamp(-5.0, 2.0) == -2.0
+    assert clamp(1.5, 2.0) == 1.5
+    assert np.allclose(clamp(np.array([-3.0, 0.5, 3.0]), 1.0), [-1, 0.5, 1])
+
+
+@pytest.fixture
+def simulation():
+    return DrivetrainSimulation()
+
+
+def test_init(simulation):
+    assert simulation.mass == pytest.approx(154)
+
+
+def test_full_throttle(simulation):
+    run = simulation.run(np.ones(3000))
+    assert list(run.columns) == DrivetrainSimulation.columns
+    assert np.all(np.diff(run['velocity']) >= 0)
+    assert run['acceleration'].max() <= simulation.drivetrain.wheel.cof * GRAVITY + 1e-9
+    assert run['battery_voltage'].min() < simulation.battery.voltage()
+    # The solved bus voltage is consistent with the current drawn
+    assert np.allclose(
+        simulation.battery.voltage(run['total_current'].values),
+        run['battery_voltage'].values,
+        atol=1e-3)
+    assert run['acceleration'].iloc[-1] == pytest.approx(0, abs=1e-3)
+
+
+def test_idle(simulation):
+    run = simulation.run(np.zeros(100))
+    assert np.all(run['velocity'] == 0)
+    assert np.all(run['total_current'] == 0)
+    assert np.all(run['battery_voltage'] == simulation.battery.voltage())
+
+
+def test_reverse(simulation):
+    forward = simulation.run(np.ones(1000))
+    reverse = simulation.run(-np.ones(1000))
+    assert np.allclose(reverse['velocity'], -forward['velocity'])
+    assert np.allclose(reverse['total_current'], forward['total_current'])
@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+import pytest
+
+from frc_rekt.drivetrain import Drivetrain
+from frc_rekt.gearbox import Gearbox
+from frc_rekt.motor import Motor
+from frc_rekt.simulation import DrivetrainSimulation
+from frc_rekt.sweep import PARAMETERS, RESULTS, sweep
+from frc_rekt.wheel import Wheel
+
+
+@pytest.fixture(scope='module')
+def results():
+    return sweep(
+        gears=[[(14, 50), (16, 48)], [(12, 60)]],
+        wheel_diameters=[4, 6],
+        motors_per_side=[2, 3],
+        masses=[120, 154],
+        motor_types=['cim', 'mini-cim'],
+        distance=10,
+        chunk_size=7)
+
+
+def test_tidy(results):
+    assert len(results) == 2 * 2 * 2 * 2 * 2
+    for column in PARAMETERS + RESULTS:
+        assert column in results.columns
+    assert results[PARAMETERS].drop_duplicates().shape[0] == len(results)
+    assert results['time_to_distance'].notnull().all()
+    assert (results['min_battery_voltage'] < 13.2).all()
+
+
+def test_matches_simulation(results):
+    row = results[(results['gears'] == str([(12, 60)]))
+                  & (results['wheel_diameter'] == 6)
+                  & (results['motors_per_side'] == 2)
+                  & (results['mass'] == 120)
+                  & (results['motor_type'] == 'mini-cim')].iloc[0]
+    motor = Motor('mini-cim')
+    drivetrain = Drivetrain(
+        wheel=Wheel(diameter=6),
+        motor=motor,
+        gearbox=Gearbox(motors=[motor, motor], gears=[(12, 60)]))
+    run = DrivetrainSimulation(drivetrain, mass=120).run(
+        np.ones(2000), dt=0.005)
+    reached = run[run['position'] >= 10 * 0.3048].iloc[0]
+    assert row['time_to_distance'] == pytest.approx(reached['time'], abs=0.01)
+    assert row['peak_current'] == pytest.approx(run['total_current'].max())
+
+
+def test_not_reached():
+    results = sweep(distance=1000, max_time=0.5)
+    assert np.isnan(results['time_to_distance'].iloc[0])
+
+
+def test_backends_agree(results):
+    parallel = sweep(
+        gears=[[(14, 50), (16, 48)], [(12, 60)]],
+        wheel_diameters=[4, 6],
+        motors_per_side=[2, 3],
+        masses=[120, 154],
+        motor_types=['cim', 'mini-cim'],
+        distance=10,
+        chunk_size=7,
+        backend='process',
+        workers=2)
+    assert parallel.equals(results)
@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+
+import numpy as np
+import pytest
+
+from frc_rekt.tabulate import TabulatedFunction
+
+POLY = np.polynomial.polynomial
+
+
+def power_func(x):
+    return 3.0 * ((0.5 * (x + 0.2))**-1.7) + 1.0
+
+
+@pytest.fixture(params=['linear', 'cubic'])
+def kind(request):
+    return request.param
+
+
+def test_within_tolerance(kind):
+    table = TabulatedFunction(power_func, 1.0, 10.0, kind=kind, tolerance=1e-5)
+    x = np.linspace(1.0, 10.0, 10001)
+    scale = np.abs(power_func(x)).max()
+    assert np.abs(table(x) - power_func(x)).max() <= 1e-5 * scale
+    assert table.max_error <= 1e-5 * scale
+
+
+def test_refines(kind):
+    coarse = TabulatedFunction(
+        power_func, 1.0, 10.0, points=16, kind=kind, tolerance=1e-2)
+    fine = TabulatedFunction(
+        power_func, 1.0, 10.0, points=16, kind=kind, tolerance=1e-8)
+    assert fine.points > coarse.points
+
+
+def test_cubic_needs_fewer_points():
+    linear = TabulatedFunction(power_func, 1.0, 10.0, tolerance=1e-6)
+    cubic = TabulatedFunction(power_func, 1.0, 10.0, kind='cubic',
+                              tolerance=1e-6)
+    assert cubic.points < linear.points
+
+
+def test_scalar_matches_array(kind):
+    table = TabulatedFunction(power_func, 1.0, 10.0, kind=kind)
+    x = [1.0, 2.5, 9.99, 10.0, 0.5, 20.0, 3]
+    assert np.allclose([table(value) for value in x], table(np.array(x)))
+
+
+def test_outside_uses_func(kind):
+    table = TabulatedFunction(power_func, 1.0, 10.0, kind=kind)
+    assert table(20.0) == power_func(20.0)
+    assert table(np.array([0.5]))[0] == power_func(0.5)
+    assert table(20) == power_func(20.0)
+
+
+def test_exact_on_polynomials():
+    poly = POLY.Polynomial([0.0, 1.0, -0.5, 0.25])
+    table = TabulatedFunction(poly, 0.0, 24.0, points=16, kind='cubic')
+    assert table.points == 16
+    assert np.isclose(table(7.3), poly(7.3))
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        TabulatedFunction(power_func, 1.0, 10.0, kind='spline')
+
+
+def test_too_many_points():
+    with pytest.raises(ValueError):
+        TabulatedFunction(power_func, 1.0, 10.0, tolerance=1e-12,
+                          max_points=1000)
+
+
+def test_scalars_only():
+    table = TabulatedFunction(power_func, 1.0, 10.0, scalars_only=True)
+    x = np.linspace(1.0, 10.0, 7)
+    assert np.array_equal(table(x), power_func(x))
+    assert np.isclose(table(5.37), power_func(5.37))
+    assert table.max_error > 0
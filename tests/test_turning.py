@@ -0,0 +1,114 @@
+# -*- coding: UTF-8 -*-
+import numpy as np
+import pytest
+
+from frc_rekt.drivetrain import Drivetrain
+from frc_rekt.simulation import GRAVITY
+from frc_rekt.turning import SkidSteerSimulation
+
+
+@pytest.fixture(scope='module')
+def simulation():
+    return SkidSteerSimulation()
+
+
+@pytest.fixture(scope='module')
+def plant(simulation):
+    return simulation.turning
+
+
+def test_init(plant):
+    mass = 154 * 0.453592
+    assert plant.length == pytest.approx(34 * 0.0254)
+    assert plant.width == pytest.approx(28 * 0.0254)
+    assert plant.motors_per_side == 3
+    assert plant.scrub_moment == pytest.approx(
+        1.3 * mass * GRAVITY * plant.length / 4)
+
+
+def test_side_velocities(plant):
+    left, right = plant.side_velocities(1.0, 2.0)
+    assert (left + right) / 2 == pytest.approx(1.0)
+    assert (right - left) / plant.width == pytest.approx(2.0)
+
+
+def test_point_turn(plant):
+    state = plant.turn(0.0, 3.0)
+    assert state['feasible']
+    assert state['left_pwm'] == pytest.approx(-state['right_pwm'])
+    assert 0 < state['right_pwm'] < 1
+    assert state['battery_voltage'] == pytest.approx(
+        plant.battery.voltage(state['total_current']))
+
+
+def test_straight(plant):
+    state = plant.turn(1.5, 0.0)
+    assert state['feasible']
+    # Both sides run at free speed, drawing only the free current
+    assert state['left_pwm'] == pytest.approx(state['right_pwm'])
+    assert 0 < state['total_current'] < 20
+
+
+def test_grid(plant):
+    velocity = np.linspace(0.0, 2.5, 20)[:, np.newaxis]
+    radius = np.array([0.25, 0.5, 1.0, 2.0, np.inf])
+    state = plant.turn(velocity, velocity / radius)
+    assert state['feasible'].shape == (20, 5)
+    # Slow turns are fine, fast tight ones are not
+    assert np.all(state['feasible'][:5])
+    assert not np.any(state['feasible'][-1, :2])
+    # Gentler turns stay feasible to higher speeds
+    assert np.all(np.diff(state['feasible'].sum(axis=0)) >= 0)
+    # Friction can not hold a fast tight circle
+    lateral = plant.turn(2.0, 2.0 / 0.3)
+    assert 2.0 * 2.0 / 0.3 > plant.cof * GRAVITY
+    assert not lateral['feasible']
+
+
+def test_long_robot():
+    # Longer than twice its width, the sides slip before it can turn
+    long_robot = SkidSteerSimulation(Drivetrain(length=40, width=15))
+    assert not long_robot.turning.turn(0.0, 1.0)['feasible']
+    assert long_robot.turning.turn(1.0, 0.0)['feasible']
+
+
+def test_brownout(plant):
+    state = plant.turn(0.0, 3.0)
+    assert not plant.turn(0.0, 3.0, min_voltage=12.0)['feasible']
+    assert state['battery_voltage'] < 12.0
+
+
+def test_run_tank_straight(simulation):
+    straight = simulation.run(np.ones(1000))
+    tank = simulation.run_tank(np.ones(1000), 1.0)
+    assert list(tank.columns) == simulation.tank_columns
+    assert np.allclose(tank['velocity'], straight['velocity'])
+    assert np.allclose(tank['total_current'], straight['total_current'])
+    assert np.all(tank['yaw_rate'] == 0)
+    assert np.allclose(tank['x'].iloc[-1], straight['position'].iloc[-1],
+                       rtol=1e-2)
+
+
+def test_run_tank_point_turn(simulation, plant):
+    run = simulation.run_tank(np.full(3000, -0.5), np.full(3000, 0.5))
+    assert np.allclose(run['velocity'], 0)
+    assert np.allclose(run['x'], 0) and np.allclose(run['y'], 0)
+    assert np.allclose(run['left_current'], -run['right_current'])
+    yaw_rate = run['yaw_rate'].iloc[-1]
+    assert yaw_rate > 0
+    assert run['heading'].iloc[-1] > 0
+    # Settles where the steady state says pwm 0.5 holds it
+    state = plant.turn(0.0, yaw_rate)
+    assert state['right_pwm'] == pytest.approx(0.5, abs=1e-3)
+
+
+def test_run_tank_scrub(simulation):
+    # Too little difference to overcome scrub, the robot drives straight
+    run = simulation.run_tank(np.full(500, 0.3), np.full(500, 0.35))
+    assert np.all(run['yaw_rate'] == 0)
+    # Scrub stops a turn once the sides agree again
+    commands = np.concatenate([np.full(500, 0.8), np.full(1500, 0.0)])
+    run = simulation.run_tank(-commands, commands)
+    assert run['yaw_rate'].max() > 0
+    assert run['yaw_rate'].iloc[-1] == 0
+    assert run['yaw_rate'].min() >= 0